@@ -1,7 +1,6 @@
 import os
 import sys
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import tempfile
 
 
 # Ensure the backend package is importable
@@ -11,58 +10,144 @@ if BACKEND_PATH not in sys.path:
     sys.path.insert(0, BACKEND_PATH)
 
 
-# Now import the project modules
-import database as database
-
-
-# Create an in-memory SQLite engine for testing
-TEST_SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(TEST_SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
+# Point the app at a throwaway SQLite file before importing the project
+# modules: database.py builds its engines from QUICKTASK_* settings at import
+# time. A file (instead of :memory:) lets the sync session used by the tests
+# and the async read/write pools used by the endpoints share one database.
+# Under pytest-xdist every worker is its own process and imports this module,
+# so each worker gets its own file and engines (`pytest -n auto`).
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "main")
+TEST_DB_DIR = tempfile.TemporaryDirectory()
+TEST_DB_PATH = os.path.join(TEST_DB_DIR.name, f"test_tasks_{WORKER_ID}.db")
+os.environ["QUICKTASK_DATABASE_URL"] = f"sqlite:///{TEST_DB_PATH}"
 
-# Replace the engine and SessionLocal in the project's database module so
-# FastAPI / SQLAlchemy objects use the in-memory DB during tests.
-database.engine = engine
-database.SessionLocal = TestingSessionLocal
 
+# Now import the project modules
+import database as database  # noqa: E402
 
-# Import models (they rely on database.Base)
-import models  # noqa: E402
+TestingSessionLocal = database.SessionLocal
 
 
-# Create all tables in the in-memory DB
-database.Base.metadata.create_all(bind=engine)
+# Apply the schema migrations (importing the app does no DB I/O), then
+# import the FastAPI app
+import migrations  # noqa: E402
 
+migrations.migrate(database.engine)
 
-# Import the FastAPI app after the DB has been configured
 import main as main  # noqa: E402
 
 
-def override_get_db():
-    """Yield a database session for FastAPI dependency override."""
-    db = TestingSessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-# Override the dependency used by the app (main.get_db)
-main.app.dependency_overrides[main.get_db] = override_get_db
-
-
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session
 import pytest
 
 
 @pytest.fixture(scope="session")
-def client():
-    """Provide a TestClient instance configured to use the in-memory DB."""
+def app_client():
+    """Start the app once per worker and share its TestClient."""
     with TestClient(main.app) as c:
         yield c
 
 
+def reset_database():
+    """
+    Delete every row committed by a test, leaving the worker's database as
+    the migrations created it (the change counter keeps growing, as in
+    production).
+    """
+    with database.engine.begin() as conn:
+        for table in reversed(database.Base.metadata.sorted_tables):
+            if table.name != "sync_state":
+                conn.execute(table.delete())
+        conn.exec_driver_sql("UPDATE sync_state SET purged_version = 0")
+        conn.exec_driver_sql("DELETE FROM sqlite_sequence")
+
+
+@pytest.fixture
+def committed_client(app_client):
+    """
+    Provide the worker's TestClient with real commits, deleting the rows
+    they leave behind at teardown.
+
+    For tests that need data committed on the shared engines: change stream
+    notifications, the write batcher, the archiver, statement counting.
+    """
+    main.task_cache.clear()
+    try:
+        yield app_client
+    finally:
+        main.task_cache.clear()
+        reset_database()
+
+
+class Transaction:
+    """
+    One connection of the write pool inside a transaction rolled back at
+    teardown. Request sessions join it with a SAVEPOINT, so their commits
+    and rollbacks work as usual but never reach the database file.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.connection = client.portal.call(self._begin)
+        self.sessionmaker = async_sessionmaker(
+            self.connection, join_transaction_mode="create_savepoint", autoflush=False, expire_on_commit=False
+        )
+
+    @staticmethod
+    async def _begin():
+        connection = await database.async_write_engine.connect()
+        await connection.begin()
+        # The sqlite3 driver defers BEGIN until the first write, so the first
+        # SAVEPOINT would open (and its RELEASE commit) the transaction
+        await connection.exec_driver_sql("BEGIN")
+        return connection
+
+    def run_sync(self, fn, *args):
+        """Run ``fn(session, *args)`` with a sync Session on the test's connection."""
+
+        def call(sync_connection):
+            with Session(sync_connection, join_transaction_mode="create_savepoint") as session:
+                return fn(session, *args)
+
+        return self.client.portal.call(self.connection.run_sync, call)
+
+    def close(self):
+        async def rollback():
+            await self.connection.rollback()
+            await self.connection.close()
+
+        self.client.portal.call(rollback)
+
+
+@pytest.fixture
+def transaction(app_client, monkeypatch):
+    """
+    Wrap the test in a transaction: every request of ``client`` (write and
+    read sessions alike) runs on one connection and is rolled back at
+    teardown, so no state leaks into the next test.
+    """
+    tx = Transaction(app_client)
+    monkeypatch.setattr(database, "AsyncWriteSessionLocal", tx.sessionmaker)
+    monkeypatch.setattr(database, "AsyncReadSessionLocal", tx.sessionmaker)
+    # The task cache outlives the transaction (and IDs are reused after it)
+    main.task_cache.clear()
+    try:
+        yield tx
+    finally:
+        main.task_cache.clear()
+        tx.close()
+
+
+@pytest.fixture
+def client(transaction):
+    """Provide a TestClient whose changes are rolled back after the test."""
+    return transaction.client
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """Provide a clean DB session for tests that need direct DB access."""
@@ -71,3 +156,31 @@ def db_session():
         yield session
     finally:
         session.close()
+
+
+@pytest.fixture
+def count_statements():
+    """
+    Count the SQL statements sent through the async engines used by the API.
+
+    Usage: ``with count_statements() as statements: ...`` then inspect
+    ``statements`` (a list of SQL strings; triggers are not included).
+    """
+    engines = [database.async_write_engine.sync_engine, database.async_read_engine.sync_engine]
+
+    @contextmanager
+    def _count():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            for engine in engines:
+                event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return _count
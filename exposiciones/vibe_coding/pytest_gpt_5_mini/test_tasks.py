@@ -1,5 +1,12 @@
+import json
+import os
+import subprocess
+import sys
+
 import pytest
 
+import database
+
 
 def test_create_task(client):
     payload = {
@@ -58,14 +65,947 @@ def test_delete_task(client):
     assert r2.status_code == 404
 
 
-def test_integration_db_direct(db_session, client):
+def test_integration_db_direct(transaction, client):
     # Crear vía API
     created = client.post("/tasks", json={"title": "Integración DB"}).json()
 
-    # Comprobar directamente en la sesión de SQLAlchemy
+    # Comprobar directamente en una sesión de SQLAlchemy (misma transacción)
     from models import Task
 
-    record = db_session.query(Task).filter(Task.id == created["id"]).first()
-    assert record is not None
-    assert record.title == "Integración DB"
-    assert record.is_deleted is False
+    def load(session):
+        record = session.query(Task).filter(Task.id == created["id"]).first()
+        return record and (record.title, record.is_deleted)
+
+    assert transaction.run_sync(load) == ("Integración DB", False)
+
+
+def test_list_cursor_pagination(client):
+    created = [client.post("/tasks", json={"title": f"Cursor {i}", "priority": "low"}).json()["id"] for i in range(5)]
+
+    # Recorrer todo el listado con el cursor de la cabecera X-Next-Cursor
+    seen = []
+    r = client.get("/tasks", params={"limit": 2})
+    while True:
+        assert r.status_code == 200
+        seen.extend(t["id"] for t in r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        r = client.get("/tasks", params={"limit": 2, "after": cursor})
+
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen))
+    assert set(created) <= set(seen)
+
+    # La paginación clásica con skip sigue funcionando y usa el mismo orden
+    page = client.get("/tasks", params={"skip": 2, "limit": 2}).json()
+    assert [t["id"] for t in page] == seen[2:4]
+
+
+def test_list_cursor_invalid(client):
+    for i in range(2):
+        client.post("/tasks", json={"title": f"Cursor inválido {i}"})
+    assert client.get("/tasks", params={"after": "no-es-un-cursor"}).status_code == 400
+
+    cursor = client.get("/tasks", params={"limit": 1}).headers["X-Next-Cursor"]
+    assert client.get("/tasks", params={"after": cursor, "skip": 1}).status_code == 400
+
+
+def test_sqlite_storage_profile(db_session):
+    from sqlalchemy import text
+
+    assert db_session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+    assert db_session.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+    assert db_session.execute(text("PRAGMA busy_timeout")).scalar() > 0
+
+
+def test_read_only_connections_reject_writes():
+    import sqlite3
+
+    conn = sqlite3.connect(database.settings.database_url.replace("sqlite:///", ""))
+    try:
+        database.apply_sqlite_pragmas(conn, read_only=True)
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO tasks (title) VALUES ('no permitido')")
+    finally:
+        conn.close()
+
+
+def test_bulk_create_reports_item_errors(client):
+    payload = [
+        {"title": "Masiva 1", "priority": "high"},
+        {"title": "", "priority": "high"},
+        {"title": "Masiva 3", "due_date": "2025-12-01"},
+        {"title": "Masiva 4", "priority": "urgente"},
+    ]
+
+    r = client.post("/tasks/bulk", json=payload)
+    assert r.status_code == 201
+    body = r.json()
+    assert len(body["created_ids"]) == 2
+    assert [e["index"] for e in body["errors"]] == [1, 3]
+
+    first, third = (client.get(f"/tasks/{task_id}").json() for task_id in body["created_ids"])
+    assert first["title"] == "Masiva 1"
+    assert third["due_date"] == "2025-12-01"
+
+
+def test_bulk_create_max_items(client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main.settings, "bulk_max_items", 2)
+    r = client.post("/tasks/bulk", json=[{"title": f"Exceso {i}"} for i in range(3)])
+    assert r.status_code == 413
+
+
+def test_bulk_create_documents_item_schema(client):
+    body = client.get("/openapi.json").json()["paths"]["/tasks/bulk"]["post"]["requestBody"]
+    schema = body["content"]["application/json"]["schema"]
+    assert schema["type"] == "array"
+    assert schema["items"] == {"$ref": "#/components/schemas/TaskCreate"}
+
+
+def test_bulk_update_delete_restore(client):
+    ids = client.post("/tasks/bulk", json=[
+        {"title": "Lote A", "priority": "low", "due_date": "2031-01-10"},
+        {"title": "Lote B", "priority": "low", "due_date": "2031-01-20"},
+        {"title": "Lote C", "priority": "low", "due_date": "2031-03-01"},
+    ]).json()["created_ids"]
+
+    # Por lista de IDs
+    r = client.patch("/tasks/bulk", json={"ids": ids[:2], "changes": {"status": "completed"}})
+    assert r.status_code == 200
+    assert r.json() == {"affected": 2}
+    assert [client.get(f"/tasks/{i}").json()["status"] for i in ids] == ["completed", "completed", "pending"]
+
+    # Por filtro de rango de fechas
+    selector = {"filter": {"due_after": "2031-01-01", "due_before": "2031-01-31"}}
+    assert client.post("/tasks/bulk-delete", json=selector).json() == {"affected": 2}
+    assert client.get(f"/tasks/{ids[0]}").status_code == 404
+    assert client.get(f"/tasks/{ids[2]}").status_code == 200
+
+    assert client.post("/tasks/bulk-restore", json={"ids": ids}).json() == {"affected": 2}
+    assert client.get(f"/tasks/{ids[0]}").status_code == 200
+
+
+def test_bulk_selector_validation(client):
+    assert client.post("/tasks/bulk-delete", json={}).status_code == 422
+    assert client.post("/tasks/bulk-delete", json={"filter": {}}).status_code == 422
+    assert client.post("/tasks/bulk-delete", json={"ids": [1], "filter": {"status": "pending"}}).status_code == 422
+
+
+def test_export_ndjson_and_csv(client):
+    created = client.post("/tasks", json={"title": "Exportar, con coma", "due_date": "2030-05-05"}).json()
+    deleted = client.post("/tasks", json={"title": "Exportar eliminada"}).json()
+    client.delete(f"/tasks/{deleted['id']}")
+
+    r = client.get("/tasks/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = {row["id"]: row for row in map(json.loads, r.text.splitlines())}
+    assert rows[created["id"]]["title"] == "Exportar, con coma"
+    assert rows[created["id"]]["created_at"] == created["created_at"]
+    assert deleted["id"] not in rows
+
+    r = client.get("/tasks/export", params={"format": "csv"})
+    assert r.status_code == 200
+    lines = r.text.splitlines()
+    assert lines[0] == "id,title,description,status,priority,due_date,created_at,updated_at"
+    assert f'{created["id"]},"Exportar, con coma",,pending,medium,2030-05-05' in r.text
+    assert len(lines) == len(rows) + 1
+
+
+@pytest.mark.skipif(not os.environ.get("QUICKTASK_SLOW_TESTS"), reason="Define QUICKTASK_SLOW_TESTS=1 para ejecutarla")
+def test_export_one_million_rows_constant_memory():
+    script = os.path.join(os.path.dirname(database.__file__), "benchmarks", "bench_export.py")
+    out = subprocess.run(
+        [sys.executable, script, "--rows", "1000000"],
+        check=True, capture_output=True, text=True, timeout=600,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    assert result["status"] == 200
+    assert result["lines"] == 1_000_000
+    # El RSS pico no debe crecer con el número de filas exportadas
+    assert result["peak_rss_mb_after"] - result["peak_rss_mb_before"] < 64
+
+
+def test_import_ndjson_chunks_and_resume(client):
+    lines = [
+        json.dumps({"title": "Importada 0"}),
+        json.dumps({"title": "Importada 1", "priority": "high"}),
+        json.dumps({"title": ""}),
+        "{no es json",
+        json.dumps({"title": "Importada 4", "due_date": "2030-01-01"}),
+    ]
+
+    # Primer intento: solo llegan las tres primeras líneas
+    r = client.post("/tasks/import", params={"import_id": "imp-test", "chunk_size": 2}, content="\n".join(lines[:3]))
+    assert r.status_code == 200
+    first = r.json()
+    assert (first["imported"], first["failed"], first["resume_offset"]) == (2, 1, 3)
+    assert [e["line"] for e in first["errors"]] == [2]
+
+    progress = client.get("/tasks/import/imp-test").json()
+    assert progress["lines_committed"] == 3
+
+    # Reanudar reenviando el archivo completo: las líneas confirmadas se omiten
+    r = client.post("/tasks/import", params={"import_id": "imp-test", "chunk_size": 2}, content="\n".join(lines) + "\n")
+    second = r.json()
+    assert (second["skipped"], second["imported"], second["failed"]) == (3, 1, 1)
+    assert second["resume_offset"] == 5 and second["completed"]
+    assert [e["line"] for e in second["errors"]] == [3]
+
+    progress = client.get("/tasks/import/imp-test").json()
+    assert (progress["imported"], progress["failed"], progress["status"]) == (3, 2, "completed")
+
+
+def test_import_offset_gap_rejected(client):
+    r = client.post("/tasks/import", params={"import_id": "imp-gap", "offset": 10}, content=json.dumps({"title": "x"}))
+    assert r.status_code == 409
+    assert client.get("/tasks/import/no-existe").status_code == 404
+
+
+def test_get_task_cache_hits_and_invalidation(client):
+    import main
+
+    t = client.post("/tasks", json={"title": "Caché"}).json()
+    before = client.get("/cache/stats").json()
+
+    assert client.get(f"/tasks/{t['id']}").json()["title"] == "Caché"
+    assert client.get(f"/tasks/{t['id']}").json()["title"] == "Caché"
+    stats = client.get("/cache/stats").json()
+    assert stats["misses"] == before["misses"] + 1
+    assert stats["hits"] == before["hits"] + 1
+
+    # Cada escritura invalida la entrada de esa tarea
+    client.patch(f"/tasks/{t['id']}", json={"title": "Caché editada"})
+    assert client.get(f"/tasks/{t['id']}").json()["title"] == "Caché editada"
+    client.post("/tasks/bulk-delete", json={"ids": [t["id"]]})
+    assert client.get(f"/tasks/{t['id']}").status_code == 404
+    client.post(f"/tasks/{t['id']}/restore")
+    assert client.get(f"/tasks/{t['id']}").status_code == 200
+
+    # Una lectura que empezó antes de una invalidación no guarda su valor
+    generation = main.task_cache.generation()
+    main.task_cache.invalidate(t["id"])
+    main.task_cache.put(t["id"], b"{}", generation)
+    assert main.task_cache.get(t["id"]) is None
+
+
+def test_task_cache_lru_ttl_and_switch():
+    from cache import TaskCache
+
+    cache = TaskCache(max_entries=2, ttl=60)
+    for task_id in (1, 2):
+        cache.put(task_id, b"x", cache.generation())
+    cache.get(1)
+    cache.put(3, b"x", cache.generation())
+    assert cache.get(2) is None and cache.get(1) == b"x"
+    assert cache.stats()["evictions"] == 1
+
+    expired = TaskCache(ttl=0)
+    expired.put(1, b"x", expired.generation())
+    assert expired.get(1) is None
+
+    disabled = TaskCache(enabled=False)
+    disabled.put(1, b"x", disabled.generation())
+    assert disabled.get(1) is None and disabled.stats()["size"] == 0
+
+
+def test_etag_conditional_get(client):
+    t = client.post("/tasks", json={"title": "ETag"}).json()
+
+    r = client.get(f"/tasks/{t['id']}")
+    tag = r.headers["ETag"]
+    assert client.get(f"/tasks/{t['id']}", headers={"If-None-Match": tag}).status_code == 304
+
+    page = client.get("/tasks", params={"limit": 1000})
+    list_tag = page.headers["ETag"]
+    r = client.get("/tasks", params={"limit": 1000}, headers={"If-None-Match": list_tag})
+    assert r.status_code == 304 and r.content == b""
+    # Otros parámetros dan otro ETag
+    assert client.get("/tasks", params={"limit": 999}).headers["ETag"] != list_tag
+
+    # Una escritura cambia el ETag de la tarea y del listado
+    client.patch(f"/tasks/{t['id']}", json={"priority": "high"})
+    assert client.get(f"/tasks/{t['id']}", headers={"If-None-Match": tag}).status_code == 200
+    assert client.get("/tasks", params={"limit": 1000}, headers={"If-None-Match": list_tag}).status_code == 200
+
+
+def test_if_match_optimistic_concurrency(client):
+    t = client.post("/tasks", json={"title": "If-Match"}).json()
+    tag = client.get(f"/tasks/{t['id']}").headers["ETag"]
+
+    r = client.put(f"/tasks/{t['id']}", json={"title": "Primera"}, headers={"If-Match": tag})
+    assert r.status_code == 200
+    new_tag = r.headers["ETag"]
+    assert new_tag != tag
+
+    # Escribir con el ETag anterior falla y no modifica la tarea
+    assert client.patch(f"/tasks/{t['id']}", json={"title": "Perdida"}, headers={"If-Match": tag}).status_code == 412
+    assert client.delete(f"/tasks/{t['id']}", headers={"If-Match": tag}).status_code == 412
+    assert client.get(f"/tasks/{t['id']}").json()["title"] == "Primera"
+
+    # Las operaciones masivas también cambian la versión
+    client.patch("/tasks/bulk", json={"ids": [t["id"]], "changes": {"status": "completed"}})
+    assert client.delete(f"/tasks/{t['id']}", headers={"If-Match": new_tag}).status_code == 412
+    current = client.get(f"/tasks/{t['id']}").headers["ETag"]
+    assert client.delete(f"/tasks/{t['id']}", headers={"If-Match": current}).status_code == 204
+
+
+def test_search_tasks_fts(client):
+    ids = client.post("/tasks/bulk", json=[
+        {"title": "Informe trimestral", "description": "Revisar cifras de ventas"},
+        {"title": "Llamar al proveedor", "description": "Pedir el informe de envíos"},
+        {"title": "Canción de cumpleaños", "description": "Ensayar"},
+    ]).json()["created_ids"]
+
+    hits = client.get("/tasks/search", params={"q": "informe"}).json()
+    # El título pesa más que la descripción en bm25
+    assert [h["id"] for h in hits][:2] == [ids[0], ids[1]]
+    assert "<mark>" in hits[0]["snippet"]
+
+    # Sin tildes, por prefijo y con caracteres especiales de FTS5
+    assert [h["id"] for h in client.get("/tasks/search", params={"q": "cancion"}).json()] == [ids[2]]
+    assert ids[1] in [h["id"] for h in client.get("/tasks/search", params={"q": "provee*"}).json()]
+    assert client.get("/tasks/search", params={"q": 'informe" OR -'}).status_code == 200
+
+    # El índice sigue las actualizaciones y el soft-delete
+    client.patch(f"/tasks/{ids[2]}", json={"title": "Canción de despedida"})
+    assert client.get("/tasks/search", params={"q": "despedida"}).json()[0]["id"] == ids[2]
+    client.delete(f"/tasks/{ids[2]}")
+    assert client.get("/tasks/search", params={"q": "despedida"}).json() == []
+
+    page = client.get("/tasks/search", params={"q": "informe", "limit": 1, "skip": 1}).json()
+    assert [h["id"] for h in page] == [ids[1]]
+
+
+def test_search_snippet_is_html_escaped(client):
+    client.post("/tasks", json={"title": "<script>alert(1)</script> reporte & <b>notas</b>"})
+
+    hit = client.get("/tasks/search", params={"q": "reporte"}).json()[0]
+    assert "<script>" not in hit["snippet"] and "<b>" not in hit["snippet"]
+    assert "&lt;script&gt;" in hit["snippet"]
+    assert "<mark>reporte</mark> &amp; &lt;b&gt;" in hit["snippet"]
+    # El título sigue tal cual en el campo de datos
+    assert hit["title"].startswith("<script>")
+
+
+def test_statements_per_write_request(committed_client, count_statements):
+    client = committed_client
+    # Cada escritura es una única sentencia con RETURNING (sin SELECT previo
+    # ni refresh posterior). Si este número crece, revisar el camino de escritura.
+    with count_statements() as statements:
+        created = client.post("/tasks", json={"title": "Una sentencia"})
+    assert created.status_code == 201
+    assert len(statements) == 1 and "RETURNING" in statements[0]
+    task_id = created.json()["id"]
+
+    with count_statements() as statements:
+        r = client.put(f"/tasks/{task_id}", json={"title": "Una sentencia (PUT)"})
+    assert r.status_code == 200 and r.json()["title"] == "Una sentencia (PUT)"
+    assert len(statements) == 1 and "RETURNING" in statements[0]
+
+    with count_statements() as statements:
+        assert client.patch(f"/tasks/{task_id}", json={"priority": "low"}, headers={"If-Match": r.headers["ETag"]}).status_code == 200
+        assert client.delete(f"/tasks/{task_id}").status_code == 204
+        assert client.post(f"/tasks/{task_id}/restore").status_code == 200
+    assert len(statements) == 3
+
+    # Lectura: una sentencia al fallar la caché y ninguna al acertar
+    with count_statements() as statements:
+        client.get(f"/tasks/{task_id}")
+        client.get(f"/tasks/{task_id}")
+    assert len(statements) == 1
+
+
+def test_list_fast_serialization_matches_schema(client, transaction):
+    import main
+    import schemas
+    from models import Task
+
+    client.post("/tasks", json={"title": "Serialización ñ", "description": "Con acentos", "due_date": "2025-12-31"})
+
+    # Mismo JSON que la serialización de pydantic a partir de los objetos ORM
+    fast = client.get("/tasks", params={"limit": 1000}).json()
+    expected = transaction.run_sync(lambda session: [
+        schemas.TaskResponse.model_validate(task).model_dump(mode="json")
+        for task in session.query(Task).filter(Task.is_deleted == False).order_by(Task.id).limit(1000)
+    ])
+    assert fast == expected
+
+    # El esquema de OpenAPI (TaskProjection) tiene los mismos campos, en el mismo orden
+    assert list(schemas.TaskProjection.model_fields) == list(schemas.TaskResponse.model_fields) == main.TASK_FIELDS
+
+
+def test_list_records_and_field_projection(client, transaction):
+    import crud
+
+    client.post("/tasks", json={"title": "Proyección", "description": "No se pide"})
+
+    # Registros inmutables, fuera del identity map de la sesión
+    records, identity_map_size = transaction.run_sync(
+        lambda session: (crud.get_tasks(session, limit=1000), len(session.identity_map))
+    )
+    assert not hasattr(records[0], "__dict__")
+    with pytest.raises(AttributeError):
+        records[0].title = "inmutable"
+    assert identity_map_size == 0
+
+    page = client.get("/tasks", params={"fields": "id,title,status", "limit": 1000})
+    assert page.status_code == 200
+    assert all(list(task) == ["id", "title", "status"] for task in page.json())
+    assert page.headers["ETag"] != client.get("/tasks", params={"limit": 1000}).headers["ETag"]
+
+    # id y version se leen aunque no se pidan (cursor y ETag)
+    first = client.get("/tasks", params={"fields": "title", "limit": 1})
+    assert list(first.json()[0]) == ["title"] and "X-Next-Cursor" in first.headers
+
+    assert client.get("/tasks", params={"fields": "title,password"}).status_code == 400
+
+    # El esquema publicado admite respuestas proyectadas (ningún campo obligatorio)
+    openapi = client.get("/openapi.json").json()
+    items = openapi["paths"]["/tasks"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]["items"]
+    assert items == {"$ref": "#/components/schemas/TaskProjection"}
+    assert "required" not in openapi["components"]["schemas"]["TaskProjection"]
+
+
+def test_task_stats_counters_and_rebuild(committed_client):
+    client = committed_client
+    import stats
+    from sqlalchemy import text
+
+    def current():
+        return client.get("/tasks/stats").json()
+
+    before = current()
+    t = client.post("/tasks", json={"title": "Stats", "priority": "high", "due_date": "2000-01-01"}).json()
+    after_create = current()
+    assert after_create["total"] == before["total"] + 1
+    assert after_create["by_priority"]["high"] == before["by_priority"]["high"] + 1
+    assert after_create["overdue"] == before["overdue"] + 1
+
+    # Completarla la saca de pendientes y de vencidas; eliminarla, del total
+    client.patch(f"/tasks/{t['id']}", json={"status": "completed"})
+    s = current()
+    assert s["by_status"]["completed"] == before["by_status"]["completed"] + 1
+    assert s["overdue"] == before["overdue"]
+    client.post("/tasks/bulk-delete", json={"ids": [t["id"]]})
+    assert current() == before
+    client.post(f"/tasks/{t['id']}/restore")
+    assert current()["total"] == before["total"] + 1
+
+    # Los contadores coinciden con un recuento completo
+    assert stats.rebuild_counters(database.engine, apply=False) == []
+
+    # Una desviación (escritura que salta los triggers) se detecta y corrige
+    with database.engine.begin() as conn:
+        conn.execute(text("UPDATE task_counters SET count = count + 5 WHERE status = 'completed' AND priority = 'high' AND due_date = '2000-01-01'"))
+    drift = stats.rebuild_counters(database.engine)
+    assert [(d["stored"] - d["actual"]) for d in drift] == [5]
+    assert stats.rebuild_counters(database.engine, apply=False) == []
+
+
+def test_changes_feed_since_and_tombstones(client):
+    head = client.get("/tasks/changes", params={"since": 0, "limit": 5000}).json()
+    since = head["next_since"]
+    assert client.get("/tasks/changes", params={"since": since}).json() == {
+        "changes": [], "next_since": since, "has_more": False,
+    }
+
+    a = client.post("/tasks", json={"title": "Sync A"}).json()
+    b = client.post("/tasks", json={"title": "Sync B"}).json()
+    client.patch(f"/tasks/{a['id']}", json={"status": "completed"})
+    client.delete(f"/tasks/{b['id']}")
+
+    page = client.get("/tasks/changes", params={"since": since}).json()
+    # Cada tarea aparece una vez, con su último cambio; versiones crecientes
+    assert [c["id"] for c in page["changes"]] == [a["id"], b["id"]]
+    versions = [c["change_version"] for c in page["changes"]]
+    assert versions == sorted(versions) and versions[0] > since
+    assert page["changes"][0]["task"]["status"] == "completed"
+    assert page["changes"][1] == {"change_version": versions[1], "id": b["id"], "deleted": True, "task": None}
+    assert page["next_since"] == versions[1]
+
+    # Paginación con limit
+    first = client.get("/tasks/changes", params={"since": since, "limit": 1}).json()
+    assert first["has_more"] is True and [c["id"] for c in first["changes"]] == [a["id"]]
+    rest = client.get("/tasks/changes", params={"since": first["next_since"], "limit": 1}).json()
+    assert [c["id"] for c in rest["changes"]] == [b["id"]]
+
+
+def test_changes_stream_pushes_new_commits(client):
+    import changes
+    import crud_async
+    import main
+    import schemas
+
+    since = client.get("/tasks/changes", params={"since": 0, "limit": 5000}).json()["next_since"]
+
+    async def collect():
+        stream = changes.stream_changes(since, main.TASK_FIELDS, page_size=100, wait_seconds=0.05)
+        # Sin cambios pendientes: keep-alive al vencer la espera
+        assert await stream.__anext__() == b": keep-alive\n\n"
+        async with database.AsyncWriteSessionLocal() as db:
+            task = await crud_async.create_task(db, schemas.TaskCreate(title="Live"))
+        event = await stream.__anext__()
+        await stream.aclose()
+        return task, event
+
+    task, event = client.portal.call(collect)
+    header, data = event.split(b"\ndata: ")
+    assert header.startswith(b"id: ") and header.endswith(b"\nevent: change")
+    change = json.loads(data)
+    assert change["id"] == task.id and change["task"]["title"] == "Live"
+    assert int(header.split(b"\n")[0][4:]) == change["change_version"] > since
+
+
+def test_write_batcher_group_commit_isolates_failures(committed_client, monkeypatch):
+    client = committed_client
+    import asyncio
+    import crud
+    import crud_async
+    import schemas
+    from batcher import WriteBatcher
+    from models import Task
+
+    from sqlalchemy import event, insert, select
+
+    t = client.post("/tasks", json={"title": "Batch base"}).json()
+
+    def write_then_fail(db):
+        # Falla a mitad de la operación, antes de su commit
+        db.execute(insert(Task).values(title="Batch rollback", status="pending", priority="low"))
+        raise RuntimeError("falla tras escribir")
+
+    commits = []
+
+    async def run():
+        batcher = WriteBatcher(database.async_write_engine, max_batch=64, max_delay=0.05)
+        monkeypatch.setattr(crud_async, "write_batcher", batcher)
+        listener = lambda conn: commits.append(1)  # noqa: E731
+        event.listen(database.async_write_engine.sync_engine, "commit", listener)
+        try:
+            results = await asyncio.gather(
+                *[crud_async.create_task(None, schemas.TaskCreate(title=f"Batch {i}")) for i in range(5)],
+                crud_async.update_task(None, t["id"], schemas.TaskUpdate(status="completed"), expected_versions={999}),
+                batcher.submit(write_then_fail),
+                crud_async.delete_task(None, t["id"]),
+                return_exceptions=True,
+            )
+        finally:
+            event.remove(database.async_write_engine.sync_engine, "commit", listener)
+            await batcher.close()
+        return results, batcher.stats()
+
+    results, stats = client.portal.call(run)
+
+    # Una transacción para las 8 operaciones; cada una con su propio resultado
+    assert stats == {"batches": 1, "operations": 8, "ops_per_batch": 8.0}
+    assert len(commits) == 1
+    created = results[:5]
+    assert [row.title for row in created] == [f"Batch {i}" for i in range(5)]
+    assert isinstance(results[5], crud.PreconditionFailed)
+    assert isinstance(results[6], RuntimeError)
+    assert results[7] is True
+
+    with database.SessionLocal() as db:
+        titles = set(db.scalars(select(Task.title).where(Task.title.like("Batch %"))))
+        assert "Batch rollback" not in titles and {f"Batch {i}" for i in range(5)} <= titles
+        assert db.get(Task, t["id"]).is_deleted is True
+
+
+def test_write_batcher_worker_ignores_first_request_context(tmp_path):
+    import asyncio
+    import crud
+    import metrics
+    import migrations
+    import schemas
+    from batcher import WriteBatcher
+
+    engine, write_engine, read_engine = database.create_engines(f"sqlite:///{tmp_path / 'batcher.db'}")
+    migrations.migrate(engine)
+
+    async def run():
+        batcher = WriteBatcher(write_engine, max_delay=0)
+        first_request = [0, 0.0]
+        token = metrics._request_sql.set(first_request)
+        try:
+            await batcher.submit(crud.create_task, schemas.TaskCreate(title="Primera"))
+        finally:
+            metrics._request_sql.reset(token)
+        counted = first_request[0]
+        # El BEGIN IMMEDIATE de los lotes siguientes no es de la primera petición
+        await batcher.submit(crud.create_task, schemas.TaskCreate(title="Segunda"))
+        await batcher.close()
+        await write_engine.dispose()
+        await read_engine.dispose()
+        return counted, first_request[0]
+
+    counted, after = asyncio.run(run())
+    engine.dispose()
+    assert counted >= 1
+    assert after == counted
+
+
+def test_sharded_tenants_isolation_fan_out_and_split(client, monkeypatch, tmp_path):
+    import zlib
+    import shards
+
+    router = shards.ShardRouter(str(tmp_path), shard_count=2)
+    monkeypatch.setattr(database, "shard_router", router)
+    by_shard = {0: [], 1: []}
+    for i in range(20):
+        by_shard[zlib.crc32(f"t{i}".encode()) % 2].append(f"t{i}")
+    a, b = by_shard[0][:2]  # mismo shard
+    c = by_shard[1][0]      # otro shard
+
+    def as_tenant(tenant):
+        return {"X-Tenant-ID": tenant}
+
+    ids = {}
+    for tenant in (a, b, c):
+        ids[tenant] = client.post("/tasks", json={"title": f"De {tenant}"}, headers=as_tenant(tenant)).json()["id"]
+    client.post("/tasks", json={"title": f"Otra de {a}", "priority": "high"}, headers=as_tenant(a))
+
+    # Cada inquilino solo ve lo suyo, aunque compartan shard
+    assert [t["title"] for t in client.get("/tasks", headers=as_tenant(b)).json()] == [f"De {b}"]
+    assert client.get(f"/tasks/{ids[b]}", headers=as_tenant(a)).status_code == 404
+    assert client.patch(f"/tasks/{ids[b]}", json={"status": "completed"}, headers=as_tenant(a)).status_code == 404
+    assert client.get("/tasks/stats", headers=as_tenant(a)).json()["total"] == 2
+    assert client.get("/tasks/search", params={"q": "De"}, headers=as_tenant(c)).json()[0]["title"] == f"De {c}"
+    assert client.get("/tasks", headers=as_tenant("no valido/x")).status_code == 400
+
+    # El directorio se relee como mucho una vez por intervalo, fuera del event loop
+    import threading
+
+    loop_thread = client.portal.call(threading.get_ident)
+    refreshes = []
+    refresh = router.directory.refresh
+    router.directory.refresh = lambda: refreshes.append(threading.get_ident()) or refresh()
+    router.directory._checked = None
+    for _ in range(3):
+        client.get("/tasks", headers=as_tenant(b))
+    del router.directory.refresh
+    assert len(refreshes) == 1 and refreshes[0] != loop_thread
+
+    # Listados de administración sobre todos los shards
+    summary = {s["shard"]: s for s in client.get("/admin/shards").json()}
+    assert summary[0]["tasks"] == 3 and summary[0]["tenants"] == 2 and summary[1]["tasks"] == 1
+    everyone = client.get("/admin/tasks").json()
+    assert {(t["tenant_id"], t["shard"]) for t in everyone} == {(a, 0), (b, 0), (c, 1)}
+
+    # Repartir el shard 0: el inquilino mayor pasa a un shard nuevo con sus IDs
+    before = client.get(f"/tasks/{ids[a]}", headers=as_tenant(a))
+    seen = client.get("/tasks/changes", headers=as_tenant(a)).json()["next_since"]
+    plan = shards.split_shard(router, 0)
+    assert plan == {"source": 0, "target": 2, "tenants": [a], "tasks": 2}
+    assert router.shard_id_for(a) == 2
+    after = client.get(f"/tasks/{ids[a]}", headers=as_tenant(a))
+    assert after.json() == before.json() and after.headers["ETag"] == before.headers["ETag"]
+    assert client.get("/tasks/stats", headers=as_tenant(a)).json()["total"] == 2
+    # El feed de cambios del shard nuevo continúa después de lo ya visto
+    moved = client.get("/tasks/changes", params={"since": seen}, headers=as_tenant(a)).json()["changes"]
+    assert len(moved) == 2 and ids[a] in {change["id"] for change in moved}
+    assert client.get("/tasks/search", params={"q": "Otra"}, headers=as_tenant(a)).json()[0]["title"] == f"Otra de {a}"
+    report = {r["shard"]: r for r in shards.shard_report(router)}
+    assert report[0]["tasks"] == 1 and report[2]["tasks"] == 2
+    assert not any(r["misplaced"] for r in report.values())
+
+    # Escrituras que resolvieron el shard 0 antes del cambio: se repiten en el nuevo
+    import crud
+    import schemas
+    from sqlalchemy import text
+
+    def write_as(tenant, fn, *args):
+        async def run():
+            token = database.current_tenant.set(tenant)
+            try:
+                return await router.write(fn, *args)
+            finally:
+                database.current_tenant.reset(token)
+        return client.portal.call(run)
+
+    resolve = router.shard_id_for
+    stale = []
+    monkeypatch.setattr(router, "shard_id_for", lambda tenant: stale.pop() if stale else resolve(tenant))
+    stale.append(0)
+    late = write_as(a, crud.create_task, schemas.TaskCreate(title="Tardía"))
+    assert not stale
+    assert client.get(f"/tasks/{late.id}", headers=as_tenant(a)).json()["title"] == "Tardía"
+    stale.append(0)
+    assert write_as(a, crud.update_task, ids[a], schemas.TaskUpdate(status="completed")).status == "completed"
+    with router.open_sync(0).engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM tasks WHERE tenant_id = :t"), {"t": a}).scalar() == 0
+
+    # Si el directorio no se puede actualizar, las tareas vuelven al origen
+    d = by_shard[1][1]
+    client.post("/tasks", json={"title": f"De {d}"}, headers=as_tenant(d))
+
+    def broken_assign(tenants, shard_id):
+        raise RuntimeError("directorio no disponible")
+
+    monkeypatch.setattr(router.directory, "assign", broken_assign)
+    with pytest.raises(RuntimeError):
+        shards.split_shard(router, 1)
+    report = {r["shard"]: r for r in shards.shard_report(router)}
+    assert report[1]["tasks"] == 2 and report[3]["tasks"] == 0
+    with router.open_sync(1).engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM moved_tenants")).scalar() == 0
+    assert [t["title"] for t in client.get("/tasks", headers=as_tenant(c)).json()] == [f"De {c}"]
+
+    client.portal.call(router.close)
+
+
+def test_archive_restore_and_purge(committed_client, db_session):
+    client = committed_client
+    import archive
+    from sqlalchemy import text
+
+    def backdate(table, column, task_id):
+        db_session.execute(
+            text(f"UPDATE {table} SET {column} = datetime('now', '-40 days') WHERE id = :id"), {"id": task_id}
+        )
+        db_session.commit()
+
+    def run_pass(**options):
+        return client.portal.call(lambda: archive.run_pass(database.async_write_engine, 30, **options))
+
+    old, recent = (client.post("/tasks", json={"title": title}).json() for title in ("Archivar", "Reciente"))
+    client.post("/tasks", json={"title": "Tope de IDs"})
+    client.delete(f"/tasks/{old['id']}")
+    client.delete(f"/tasks/{recent['id']}")
+    backdate("tasks", "deleted_at", old["id"])
+    seen = client.get("/tasks/changes", params={"since": 0, "limit": 5000}).json()["next_since"]
+
+    # Solo se archiva lo eliminado hace más de 30 días
+    assert run_pass()["archived"] == 1
+    archived_ids = {row.id for row in db_session.execute(text("SELECT id FROM tasks_archive"))}
+    assert old["id"] in archived_ids and recent["id"] not in archived_ids
+    storage = client.get("/admin/storage").json()[0]
+    assert storage["archived"] >= 1 and any(o["name"] == "tasks_archive" for o in storage["objects"])
+
+    # Restaurar desde el archivo conserva el ID y avanza la versión (ETag)
+    restored = client.post(f"/tasks/{old['id']}/restore")
+    assert restored.status_code == 200 and restored.json()["title"] == "Archivar"
+    assert client.get(f"/tasks/{old['id']}").headers["ETag"] == f"\"{old['id']}-3\""
+    assert old["id"] not in {row.id for row in db_session.execute(text("SELECT id FROM tasks_archive"))}
+    feed = client.get("/tasks/changes", params={"since": seen}).json()["changes"]
+    assert [(c["id"], c["deleted"]) for c in feed] == [(old["id"], False)]
+
+    # El feed entrega los archivados como tombstones; la purga invalida los since anteriores
+    client.delete(f"/tasks/{old['id']}")
+    backdate("tasks", "deleted_at", old["id"])
+    run_pass()
+    tombstone = client.get("/tasks/changes", params={"since": seen}).json()["changes"][-1]
+    assert tombstone["id"] == old["id"] and tombstone["deleted"] is True
+    backdate("tasks_archive", "archived_at", old["id"])
+    assert run_pass(purge_after_days=30)["purged"] >= 1
+    assert client.get("/tasks/changes", params={"since": seen}).status_code == 410
+    assert client.get("/tasks/changes", params={"since": 0}).status_code == 200
+
+
+def test_due_date_filters_sorts_and_cursor(committed_client, db_session):
+    client = committed_client
+    import migrations
+    from sqlalchemy import text
+
+    assert client.post("/tasks", json={"title": "Imposible", "due_date": "2099-02-30"}).status_code == 422
+    specs = [("2099-03-05", "low"), ("2099-03-01", "high"), ("2099-03-03", "medium"), ("2099-03-03", "high")]
+    ids = [
+        client.post("/tasks", json={"title": f"Vence {due}", "due_date": due, "priority": prio}).json()["id"]
+        for due, prio in specs
+    ]
+    window = {"due_after": "2099-03-01", "due_before": "2099-03-31"}
+
+    def listed(**params):
+        return [t["id"] for t in client.get("/tasks", params={**window, **params}).json()]
+
+    assert listed(sort="due_date") == [ids[1], ids[2], ids[3], ids[0]]
+    assert listed(sort="due_date", due_before="2099-03-03") == [ids[1], ids[2], ids[3]]
+    assert listed(sort="priority") == [ids[1], ids[3], ids[2], ids[0]]
+    assert listed(sort="created_at") == ids
+
+    # El cursor recorre los tramos del orden (prioridad por rango)
+    for sort in ("due_date", "priority", "created_at"):
+        pages, after = [], None
+        while True:
+            params = {**window, "sort": sort, "limit": 1, **({"after": after} if after else {})}
+            response = client.get("/tasks", params=params)
+            pages += [t["id"] for t in response.json()]
+            after = response.headers.get("X-Next-Cursor")
+            if not after:
+                break
+        assert pages == listed(sort=sort)
+    cursor = client.get("/tasks", params={**window, "sort": "priority", "limit": 1}).headers["X-Next-Cursor"]
+    assert client.get("/tasks", params={"sort": "due_date", "after": cursor}).status_code == 400
+
+    # Vencidas: pendientes con fecha pasada; sin fecha al final del orden por fecha
+    late = client.post("/tasks", json={"title": "Atrasada", "due_date": "1999-06-01"}).json()
+    done = client.post("/tasks", json={"title": "Hecha", "due_date": "1999-06-02"}).json()
+    client.patch(f"/tasks/{done['id']}", json={"status": "completed"})
+    old = {"due_after": "1999-01-01", "due_before": "1999-12-31"}
+    assert [t["id"] for t in client.get("/tasks", params={**old, "overdue": True}).json()] == [late["id"]]
+    everything = client.get("/tasks", params={"sort": "due_date", "limit": 1000}).json()
+    dated = [t["due_date"] is not None for t in everything]
+    assert dated == sorted(dated, reverse=True)
+
+    # Migración: fechas imposibles heredadas de la columna de texto pasan a NULL
+    db_session.execute(text("UPDATE tasks SET due_date = '2099-02-30' WHERE id = :id"), {"id": ids[0]})
+    db_session.commit()
+    assert migrations.normalize_due_dates(database.engine) == 1
+    task = client.get(f"/tasks/{ids[0]}")
+    assert task.json()["due_date"] is None and task.headers["ETag"] == f"\"{ids[0]}-2\""
+
+
+def test_migrations_run_once_and_import_does_no_io(tmp_path):
+    import migrations
+    from sqlalchemy import create_engine, text
+
+    # Importar la aplicación no crea ni abre la base de datos
+    path = tmp_path / "fresh.db"
+    env = {**os.environ, "QUICKTASK_DATABASE_URL": f"sqlite:///{path}"}
+    subprocess.run(
+        [sys.executable, "-c", "import main"],
+        cwd=os.path.dirname(database.__file__), env=env, check=True, capture_output=True, timeout=60,
+    )
+    assert not path.exists()
+
+    engine = create_engine(f"sqlite:///{path}")
+    assert [m.version for m in migrations.pending(engine)] == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.migrate(engine) == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.migrate(engine) == [] and migrations.pending(engine) == []
+
+    # Backfill por lotes: cada lote en su transacción, hasta agotar las filas
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (n INTEGER, done INTEGER DEFAULT 0)"))
+        conn.execute(text("INSERT INTO items (n) VALUES " + ", ".join(f"({i})" for i in range(25))))
+    assert migrations.backfill(engine, "items", "done = 1", "done = 0", batch_size=10) == 25
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM items WHERE done = 0")).scalar() == 0
+    engine.dispose()
+
+
+def test_metrics_endpoint_routes_sql_and_pool(client):
+    import metrics
+
+    created = client.post("/tasks", json={"title": "Medida"}).json()
+    before = metrics.http_requests.value("GET", "/tasks/{task_id}", "404")
+    statements = metrics.http_statements.count("POST", "/tasks")
+    client.get("/tasks/999999999")
+    client.post("/tasks", json={"title": "Medida 2"})
+
+    # Series por plantilla de ruta (no por URL), estado y método
+    assert metrics.http_requests.value("GET", "/tasks/{task_id}", "404") == before + 1
+    assert metrics.http_statements.count("POST", "/tasks") == statements + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE quicktask_http_request_duration_seconds histogram" in body
+    assert 'quicktask_http_request_duration_seconds_bucket{method="POST",route="/tasks",le="+Inf"}' in body
+    assert f"/tasks/{created['id']}" not in body
+    assert 'quicktask_sql_statement_duration_seconds_count{engine="write"}' in body
+    assert 'quicktask_db_pool_wait_seconds_count{engine="read"}' in body
+
+    # Una escritura = una sentencia, contada en la petición
+    series = [line for line in body.splitlines()
+              if line.startswith('quicktask_http_request_sql_statements_bucket{method="POST",route="/tasks",le="1"}')]
+    assert len(series) == 1 and int(series[0].split()[-1]) >= 1
+
+
+def test_diagnostics_slow_queries_and_repeated_statements(tmp_path):
+    script = """
+import migrations, database, diagnostics, main
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from models import Task
+migrations.migrate(database.engine)
+with TestClient(main.app) as client:
+    ids = [client.post("/tasks", json={"title": f"Diagnóstico {i}"}).json()["id"] for i in range(3)]
+    client.get("/tasks", params={"status": "pending"})
+# N+1: una consulta por tarea (las listas IN de distinto tamaño son la misma forma)
+with diagnostics.track({"type": "http", "method": "GET"}), database.engine.connect() as conn:
+    for n in range(1, 4):
+        conn.execute(select(Task.title).where(Task.id.in_(ids[:n]))).all()
+"""
+    env = {
+        **os.environ,
+        "QUICKTASK_DATABASE_URL": f"sqlite:///{tmp_path / 'diag.db'}",
+        "QUICKTASK_DIAGNOSTICS_ENABLED": "true",
+        "QUICKTASK_DIAGNOSTICS_SLOW_QUERY_MS": "0",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(database.__file__), env=env, check=True, capture_output=True, text=True, timeout=60,
+    )
+    records = [json.loads(line) for line in out.stderr.splitlines() if line.startswith("{")]
+    slow = [r for r in records if r["event"] == "slow_query"]
+
+    # Cada sentencia (umbral 0 ms) con su plan y la ruta que la ejecutó
+    inserts = [r for r in slow if r["sql"].startswith("INSERT INTO tasks ")]
+    assert len(inserts) == 3
+    assert {(r["engine"], r["method"], r["route"]) for r in inserts} == {("write", "POST", "/tasks")}
+    listing = [r for r in slow if r["route"] == "/tasks" and r["method"] == "GET"]
+    assert listing and any("USING INDEX" in step for step in listing[0]["plan"])
+
+    # Solo se marca la petición que repitió la misma forma de sentencia
+    flagged = [r for r in records if r["event"] == "request_statements"]
+    assert len(flagged) == 1 and flagged[0]["statements"] == 3
+    assert flagged[0]["repeated"][0]["count"] == 3 and "IN (?)" in flagged[0]["repeated"][0]["sql"]
+
+
+def test_loadgen_weighted_mix_reports_percentiles(tmp_path):
+    script = os.path.join(os.path.dirname(database.__file__), "benchmarks", "loadgen.py")
+    output = tmp_path / "carga.json"
+    subprocess.run(
+        [sys.executable, script, "--in-process", "--mix", "write-heavy", "polling", "--concurrency", "4",
+         "--duration", "1", "--ramp-up", "0.2", "--seed-tasks", "5", "--output", str(output)],
+        check=True, capture_output=True, text=True, timeout=120,
+    )
+    report = json.loads(output.read_text(encoding="utf-8"))
+
+    assert [run["mix"] for run in report["runs"]] == ["write-heavy", "polling"]
+    writes, polling = report["runs"]
+    assert "POST /tasks" in writes["endpoints"] and "GET /tasks/changes" in polling["endpoints"]
+    for run in report["runs"]:
+        total = run["total"]
+        assert total["requests"] > 0 and total["errors"] == 0
+        assert total["p50_ms"] <= total["p95_ms"] <= total["p99_ms"] <= total["max_ms"]
+        assert sum(e["requests"] for e in run["endpoints"].values()) == total["requests"]
+
+
+def test_microbench_baseline_and_regression_gate(tmp_path):
+    script = os.path.join(os.path.dirname(database.__file__), "benchmarks", "microbench.py")
+    baseline = tmp_path / "baselines.json"
+    command = [sys.executable, script, "--sizes", "2000", "--repeat", "3", "--only", "serialize.",
+               "--baseline", str(baseline)]
+
+    saved = subprocess.run(command + ["--save-baseline"], capture_output=True, text=True, timeout=300)
+    assert saved.returncode == 0, saved.stderr
+    stored = json.loads(baseline.read_text(encoding="utf-8"))
+    assert set(stored) == {"2000/serialize.pydantic_orm", "2000/serialize.fast_path"}
+
+    # Una línea base 100 veces más rápida convierte cada benchmark en una regresión
+    baseline.write_text(json.dumps({name: ms / 100 for name, ms in stored.items()}), encoding="utf-8")
+    checked = subprocess.run(command + ["--min-delta-ms", "0"], capture_output=True, text=True, timeout=300)
+    assert checked.returncode == 1
+    regressions = [json.loads(line) for line in checked.stdout.splitlines() if line.startswith("{")]
+    assert {r["name"] for r in regressions} == set(stored)
+
+
+def test_requests_run_in_rolled_back_transaction(client, db_session):
+    from models import Task
+
+    created = client.post("/tasks", json={"title": "Solo en esta prueba"}).json()
+    assert client.patch(f"/tasks/{created['id']}", json={"status": "completed"}).status_code == 200
+    assert client.get(f"/tasks/{created['id']}").json()["status"] == "completed"
+
+    # Los commits de las peticiones liberan un SAVEPOINT: otra conexión no
+    # ve la tarea y el rollback del final de la prueba la descarta
+    assert db_session.get(Task, created["id"]) is None
+    # Las pruebas con commits reales borran sus filas al terminar
+    assert db_session.query(Task).count() == 0
+    assert os.path.basename(database.engine.url.database).startswith("test_tasks_")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""
+archive.py
+
+Separación caliente/frío de las tareas eliminadas.
+
+Las tareas eliminadas (soft-delete) siguen ocupando la tabla `tasks` y sus
+índices, y todas las consultas deben filtrarlas. El archivador mueve a
+`tasks_archive` las que llevan más de `QUICKTASK_ARCHIVE_AFTER_DAYS` días
+eliminadas, por lotes pequeños (`QUICKTASK_ARCHIVE_BATCH_SIZE`): cada lote es
+una transacción corta con el escritor único, de modo que las peticiones se
+intercalan entre lotes.
+
+- `crud.restore_task` devuelve una tarea archivada a `tasks` con su ID.
+- El feed de cambios sigue entregando las tareas archivadas como tombstones.
+- Purga opcional (`QUICKTASK_PURGE_AFTER_DAYS` > 0): borra definitivamente
+  las tareas archivadas hace más de N días. Su versión de cambio más alta
+  queda en `sync_state.purged_version`; un cliente del feed con un `since`
+  anterior recibe 410 y debe resincronizar desde cero.
+
+La aplicación ejecuta una pasada cada `QUICKTASK_ARCHIVE_INTERVAL_SECONDS`.
+Una pasada a mano (todos los shards):
+    python archive.py [--after-days 30] [--purge-after-days 90]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from sqlalchemy import delete, func, insert, select, update
+import database
+import migrations
+import shards
+from models import SyncState, Task, TaskArchive
+
+logger = logging.getLogger(__name__)
+
+# Columnas comunes a `tasks` y `tasks_archive`
+_COLUMNS = tuple(column.name for column in Task.__table__.columns)
+
+
+def _cutoff(days: int):
+    """Instante de hace `days` días, en el formato de `CURRENT_TIMESTAMP`."""
+    return func.datetime("now", f"-{int(days)} days")
+
+
+def archive_batch(connection, after_days: int, batch_size: int) -> int:
+    """
+    Mueve al archivo un lote de tareas eliminadas hace más de `after_days`
+    días, dentro de la transacción de `connection`.
+
+    Las tareas eliminadas antes de existir `deleted_at` usan `updated_at`.
+    La tarea de mayor ID nunca se archiva: en tablas sin AUTOINCREMENT
+    (anteriores al archivo) SQLite reutilizaría su ID para la siguiente
+    tarea y chocaría con la archivada al restaurarla.
+
+    Args:
+        connection (Connection): Conexión síncrona con la transacción abierta.
+        after_days (int): Días desde la eliminación.
+        batch_size (int): Tareas máximas del lote.
+
+    Returns:
+        int: Tareas archivadas.
+    """
+    deleted_at = func.coalesce(Task.deleted_at, Task.updated_at)
+    ids = connection.scalars(
+        select(Task.id)
+        .where(
+            Task.is_deleted == True,
+            deleted_at < _cutoff(after_days),
+            Task.id < select(func.max(Task.id)).scalar_subquery(),
+        )
+        .limit(batch_size)
+    ).all()
+    if not ids:
+        return 0
+    source = select(*(Task.__table__.c[name] for name in _COLUMNS)).where(Task.id.in_(ids))
+    connection.execute(insert(TaskArchive.__table__).from_select(_COLUMNS, source))
+    connection.execute(delete(Task.__table__).where(Task.id.in_(ids)))
+    return len(ids)
+
+
+def purge_batch(connection, after_days: int, batch_size: int) -> int:
+    """
+    Borra definitivamente un lote de tareas archivadas hace más de
+    `after_days` días y avanza `sync_state.purged_version`.
+
+    Returns:
+        int: Tareas purgadas.
+    """
+    archive = TaskArchive.__table__
+    rows = connection.execute(
+        select(archive.c.id, archive.c.change_version)
+        .where(archive.c.archived_at < _cutoff(after_days))
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+    connection.execute(delete(archive).where(archive.c.id.in_([row.id for row in rows])))
+    connection.execute(
+        update(SyncState.__table__)
+        .where(SyncState.__table__.c.id == 1)
+        .values(purged_version=func.max(SyncState.__table__.c.purged_version, max(row.change_version for row in rows)))
+    )
+    return len(rows)
+
+
+async def run_pass(async_engine, after_days: int, purge_after_days: int = 0, batch_size: int = 500) -> dict:
+    """
+    Archiva (y purga, si `purge_after_days` > 0) todo lo pendiente de una
+    base de datos, un lote por transacción.
+
+    Cada lote toma la conexión del escritor único (`BEGIN IMMEDIATE`) y la
+    devuelve al pool al confirmar.
+
+    Args:
+        async_engine (AsyncEngine): Engine de escritura de la base (o shard).
+        after_days (int): Días desde la eliminación para archivar.
+        purge_after_days (int): Días desde el archivado para purgar (0 = nunca).
+        batch_size (int): Tareas por transacción.
+
+    Returns:
+        dict: archived y purged.
+    """
+    steps = [("archived", archive_batch, after_days)]
+    if purge_after_days > 0:
+        steps.append(("purged", purge_batch, purge_after_days))
+    totals = {"archived": 0, "purged": 0}
+    for key, step, days in steps:
+        while True:
+            async with async_engine.connect() as conn:
+                await conn.exec_driver_sql("BEGIN IMMEDIATE")
+                moved = await conn.run_sync(step, days, batch_size)
+                await conn.commit()
+            totals[key] += moved
+            if moved < batch_size:
+                break
+            await asyncio.sleep(0)
+    return totals
+
+
+async def run_periodically(get_shards, interval: float, **options):
+    """
+    Ejecuta `run_pass` sobre todos los shards cada `interval` segundos.
+
+    Args:
+        get_shards (callable): Corrutina que devuelve los shards (ver
+            `main._admin_shards`).
+        interval (float): Segundos entre pasadas.
+        **options: after_days, purge_after_days y batch_size de `run_pass`.
+    """
+    while True:
+        for shard in await get_shards():
+            try:
+                totals = await run_pass(shard.async_write_engine, **options)
+            except Exception:
+                # Un fallo (bloqueo, disco) no detiene el archivador
+                logger.exception("Archivado del shard %s fallido", shard.id)
+            else:
+                if totals["archived"] or totals["purged"]:
+                    logger.info("Shard %s: %s", shard.id, json.dumps(totals))
+        await asyncio.sleep(interval)
+
+
+def main_cli():
+    settings = database.settings
+    parser = argparse.ArgumentParser(description="Archiva (y purga) las tareas eliminadas hace tiempo")
+    parser.add_argument("--after-days", type=int, default=settings.archive_after_days, help="Días desde la eliminación")
+    parser.add_argument(
+        "--purge-after-days", type=int, default=settings.purge_after_days, help="Días desde el archivado (0 = no purgar)"
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size, help="Tareas por transacción")
+    args = parser.parse_args()
+
+    if settings.shard_count > 0:
+        router = shards.ShardRouter(settings.shard_dir, settings.shard_count)
+        targets = [router.open_sync(shard_id) for shard_id in router.existing_shard_ids()]
+    else:
+        migrations.migrate(database.engine)
+        targets = [shards.Shard(0, database.engine.url.database, database.engine,
+                                database.async_write_engine, database.async_read_engine)]
+
+    async def run():
+        for shard in targets:
+            totals = await run_pass(shard.async_write_engine, args.after_days, args.purge_after_days, args.batch_size)
+            print(json.dumps({"shard": shard.id, **totals}))
+            await shard.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,193 @@
+"""
+batcher.py
+
+Agrupación de escrituras ("group commit") sobre el escritor único de SQLite.
+
+Sin agrupar, cada mutación abre su transacción y hace su propio COMMIT, de
+modo que el throughput de escritura queda limitado por el coste de cada
+commit (fsync con `synchronous=FULL`, escritura del WAL con `NORMAL`), haya
+los clientes que haya. `WriteBatcher` recoge las mutaciones que llegan
+durante una ventana corta (`max_delay` o `max_batch` operaciones), las
+ejecuta en una sola transacción y responde a cada petición al confirmar.
+
+Cada operación corre dentro de su propio SAVEPOINT: si falla (404, 412,
+restricción violada...) solo se deshace esa operación y su petición recibe
+la excepción; las demás siguen adelante. Las funciones de `crud.py` no
+cambian: su `db.commit()` libera el SAVEPOINT (`join_transaction_mode=
+"create_savepoint"`) y el COMMIT real lo hace el agrupador.
+"""
+
+import asyncio
+import contextvars
+from dataclasses import dataclass, field
+from sqlalchemy.orm import Session
+
+
+@dataclass
+class _Operation:
+    """
+    Mutación pendiente: función de `crud.py`, argumentos, futuro y el
+    contexto de la petición (p. ej. el inquilino actual).
+    """
+    fn: callable
+    args: tuple
+    kwargs: dict
+    future: asyncio.Future = field(default=None)
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+
+
+class WriteBatcher:
+    """
+    Tarea única de escritura que confirma las mutaciones por lotes.
+
+    La ventana solo se aplica si el lote anterior tuvo más de una operación:
+    con un único cliente no hay nada que agrupar y esperar solo añadiría
+    latencia. Las operaciones que ya están en cola se agrupan siempre.
+
+    Args:
+        engine (AsyncEngine): Engine asíncrono del escritor único.
+        max_batch (int): Operaciones máximas por transacción.
+        max_delay (float): Segundos que se espera a más operaciones tras la
+            primera de un lote (0 = solo las que ya estén en cola).
+    """
+
+    def __init__(self, engine, max_batch: int = 256, max_delay: float = 0.005):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = None
+        self._worker = None
+        self._batches = 0
+        self._operations = 0
+        self._last_size = 0
+
+    async def submit(self, fn, *args, **kwargs):
+        """
+        Encola `fn(session, *args, **kwargs)` y espera a que su lote se confirme.
+
+        Args:
+            fn (callable): Función síncrona de `crud.py` cuyo primer argumento
+                es la sesión.
+
+        Returns:
+            Lo que devuelva `fn`, una vez confirmada la transacción.
+
+        Raises:
+            Exception: La excepción de `fn` (solo se deshace esta operación) o
+                la del COMMIT del lote.
+        """
+        if self._worker is None:
+            # Se crea en el primer uso, dentro del event loop de la aplicación,
+            # con un contexto vacío: no hereda las variables de la petición
+            # que la arranca (métricas, diagnóstico). Cada operación se
+            # ejecuta en el contexto de su propia petición (`op.context`).
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run(), context=contextvars.Context())
+        op = _Operation(fn, args, kwargs, asyncio.get_running_loop().create_future())
+        self._queue.put_nowait(op)
+        return await op.future
+
+    async def close(self):
+        """Espera a que se confirmen las operaciones en cola y detiene la tarea."""
+        if self._worker is None:
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def stats(self) -> dict:
+        """
+        Devuelve contadores de uso.
+
+        Returns:
+            dict: batches, operations y ops_per_batch (media).
+        """
+        return {
+            "batches": self._batches,
+            "operations": self._operations,
+            "ops_per_batch": round(self._operations / self._batches, 2) if self._batches else 0.0,
+        }
+
+    async def _collect(self) -> list:
+        """Espera la primera operación y reúne las siguientes durante la ventana."""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.max_delay if self._last_size > 1 else 0)
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch: list):
+        """Ejecuta el lote en una transacción y resuelve el futuro de cada operación."""
+        outcomes = []
+        try:
+            async with self.engine.connect() as conn:
+                # BEGIN explícito: el driver sqlite3 no emite BEGIN antes de un
+                # SAVEPOINT, y RELEASE del primero confirmaría la transacción.
+                # IMMEDIATE toma el bloqueo de escritura desde el principio.
+                await conn.exec_driver_sql("BEGIN IMMEDIATE")
+                outcomes = await conn.run_sync(_apply, batch)
+                await conn.commit()
+        except Exception as exc:
+            # Falló el lote entero (conexión, bloqueo, COMMIT): nada se confirmó
+            outcomes = [(None, exc)] * len(batch)
+
+        self._batches += 1
+        self._operations += len(batch)
+        self._last_size = len(batch)
+        for op, (result, error) in zip(batch, outcomes):
+            if op.future.done():  # petición cancelada (cliente desconectado)
+                continue
+            if error is not None:
+                op.future.set_exception(error)
+            else:
+                op.future.set_result(result)
+
+
+def _apply(connection, batch: list) -> list:
+    """
+    Ejecuta cada operación del lote en su propio SAVEPOINT.
+
+    Returns:
+        list[tuple]: (resultado, excepción) por operación, en orden.
+    """
+    outcomes = []
+    for op in batch:
+        session = Session(
+            bind=connection,
+            join_transaction_mode="create_savepoint",
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        try:
+            outcomes.append((op.context.run(op.fn, session, *op.args, **op.kwargs), None))
+        except Exception as exc:
+            outcomes.append((None, exc))
+        finally:
+            # Si la operación falló, close() vuelve a su SAVEPOINT
+            session.close()
+    return outcomes
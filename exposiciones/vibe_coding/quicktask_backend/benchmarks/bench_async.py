@@ -0,0 +1,170 @@
+"""
+bench_async.py
+
+Compara el throughput del camino asíncrono (endpoints `async def` + pools
+aiosqlite de lectura/escritura) con el camino síncrono original (endpoints
+`def` + `SessionLocal`, ejecutados en el threadpool) con 50, 200 y 1000
+clientes concurrentes.
+
+Ejecutar desde quicktask_backend/:
+    python benchmarks/bench_async.py
+    python benchmarks/bench_async.py --clients 50 200 --requests 20 --tasks 5000
+
+Las peticiones se envían en proceso con `httpx.ASGITransport`: se mide la
+aplicación (planificación, threadpool, acceso a BD) y no la red. La mezcla es
+de solo lectura (80% GET /tasks/{id}, 20% GET /tasks?limit=20) para no medir
+la contención del bloqueo de escritura de SQLite.
+
+En el camino síncrono la sesión se abre y se cierra dentro del endpoint. Con
+la dependencia generadora `get_db`, la conexión solo vuelve al pool cuando
+FastAPI ejecuta la salida de la dependencia; a partir de ~200 clientes los
+hilos del threadpool quedan esperando conexiones que nadie libera hasta el
+`pool_timeout` (30 s), y el benchmark mediría ese bloqueo y no el throughput.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
+
+# Base de datos temporal compartida por ambos caminos (configurada antes de
+# importar database.py, que crea los engines a partir de QUICKTASK_*)
+BENCH_DIR = tempfile.TemporaryDirectory()
+BENCH_DB_PATH = os.path.join(BENCH_DIR.name, "bench_tasks.db")
+os.environ["QUICKTASK_DATABASE_URL"] = f"sqlite:///{BENCH_DB_PATH}"
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, HTTPException, Query  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+import database  # noqa: E402
+import crud  # noqa: E402
+import models  # noqa: E402
+import schemas  # noqa: E402
+import main  # noqa: E402
+import migrations  # noqa: E402
+
+
+def build_sync_app() -> FastAPI:
+    """
+    Reconstruye los endpoints de lectura tal como eran antes del camino async.
+
+    Returns:
+        FastAPI: Aplicación con endpoints `def` que usan `crud` síncrono.
+    """
+    app = FastAPI()
+
+    @app.get("/tasks", response_model=list[schemas.TaskResponse])
+    def list_tasks(limit: int = Query(100, ge=1, le=1000)):
+        with database.SessionLocal() as db:
+            return crud.get_tasks(db, limit=limit)
+
+    @app.get("/tasks/{task_id}", response_model=schemas.TaskResponse)
+    def get_task(task_id: int):
+        with database.SessionLocal() as db:
+            db_task = crud.get_task(db, task_id=task_id)
+        if db_task is None:
+            raise HTTPException(status_code=404, detail="Tarea no encontrada")
+        return db_task
+
+    return app
+
+
+def seed(n_tasks: int):
+    """Inserta `n_tasks` tareas sintéticas en una sola transacción."""
+    rows = [
+        {
+            "title": f"Tarea {i}",
+            "description": "Descripción de prueba " * 4,
+            "priority": random.choice(["low", "medium", "high"]),
+            "status": random.choice(["pending", "completed"]),
+            "due_date": f"2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+            "is_deleted": False,
+        }
+        for i in range(n_tasks)
+    ]
+    with database.SessionLocal() as db:
+        db.execute(insert(models.Task), rows)
+        db.commit()
+
+
+async def run_load(app: FastAPI, clients: int, requests_per_client: int, n_tasks: int) -> dict:
+    """
+    Lanza `clients` corrutinas que envían peticiones concurrentes a `app`.
+
+    Returns:
+        dict: Throughput (req/s), latencias p50/p95 (ms) y errores.
+    """
+    latencies = []
+    errors = 0
+
+    async def client_loop(http: httpx.AsyncClient):
+        nonlocal errors
+        for _ in range(requests_per_client):
+            if random.random() < 0.8:
+                url = f"/tasks/{random.randint(1, n_tasks)}"
+            else:
+                url = "/tasks?limit=20"
+            start = time.perf_counter()
+            response = await http.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    # ASGITransport no ejecuta los eventos de arranque de la app
+    await main.warm_up_async_engines()
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    # Las conexiones aiosqlite quedan ligadas al event loop de esta corrida
+    await database.async_read_engine.dispose()
+    await database.async_write_engine.dispose()
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark camino síncrono vs asíncrono")
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000], help="Niveles de concurrencia")
+    parser.add_argument("--requests", type=int, default=10, help="Peticiones por cliente")
+    parser.add_argument("--tasks", type=int, default=10_000, help="Tareas sembradas en la BD")
+    args = parser.parse_args()
+
+    migrations.migrate(database.engine)
+    seed(args.tasks)
+
+    sync_app = build_sync_app()
+    async_app = main.app
+
+    print(f"{'clientes':>8} | {'camino':>6} | {'req/s':>9} | {'p50 ms':>8} | {'p95 ms':>8} | {'errores':>7}")
+    print("-" * 62)
+    for clients in args.clients:
+        for label, app in (("sync", sync_app), ("async", async_app)):
+            result = asyncio.run(run_load(app, clients, args.requests, args.tasks))
+            print(
+                f"{clients:>8} | {label:>6} | {result['rps']:>9.1f} | "
+                f"{result['p50_ms']:>8.2f} | {result['p95_ms']:>8.2f} | {result['errors']:>7}",
+                flush=True,
+            )
+
+
+if __name__ == "__main__":
+    main_cli()
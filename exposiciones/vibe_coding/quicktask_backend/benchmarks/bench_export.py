@@ -0,0 +1,150 @@
+"""
+bench_export.py
+
+Mide el tiempo y la memoria pico (RSS) de `GET /tasks/export` sobre una base
+de datos temporal con N tareas.
+
+Ejecutar desde quicktask_backend/:
+    python benchmarks/bench_export.py --rows 1000000
+    python benchmarks/bench_export.py --rows 100000 --format csv
+
+La respuesta se consume llamando directamente a la aplicación ASGI y
+descartando cada bloque: `TestClient` y `httpx.ASGITransport` acumulan el
+cuerpo completo en memoria y falsearían la medición. Imprime un objeto JSON
+con filas, bytes, segundos y el RSS pico antes y después de exportar.
+
+Salvo que se indique otra cosa en el entorno, se desactiva el mmap de SQLite
+y se reduce su caché de páginas: las páginas mapeadas del archivo cuentan
+como RSS y ocultarían la memoria real del proceso.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BACKEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
+
+# Base de datos temporal (configurada antes de importar database.py)
+BENCH_DIR = tempfile.TemporaryDirectory()
+BENCH_DB_PATH = os.path.join(BENCH_DIR.name, "bench_export.db")
+os.environ["QUICKTASK_DATABASE_URL"] = f"sqlite:///{BENCH_DB_PATH}"
+os.environ.setdefault("QUICKTASK_SQLITE_MMAP_SIZE", "0")
+os.environ.setdefault("QUICKTASK_SQLITE_CACHE_SIZE_KIB", "2048")
+
+from sqlalchemy import text  # noqa: E402
+
+import database  # noqa: E402
+import main  # noqa: E402
+import migrations  # noqa: E402
+
+# Esquema de la base temporal (tablas, índices, FTS5, triggers)
+migrations.migrate(database.engine)
+
+
+def peak_rss_mb() -> float:
+    """RSS pico del proceso en MiB (ru_maxrss está en KiB en Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def seed(n_rows: int):
+    """
+    Inserta `n_rows` tareas con un CTE recursivo, sin materializarlas en Python.
+    """
+    with database.engine.begin() as conn:
+        conn.execute(text("""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :n)
+            INSERT INTO tasks (title, description, status, priority, due_date, is_deleted)
+            SELECT 'Tarea ' || n,
+                   'Descripción de la tarea número ' || n,
+                   CASE n % 2 WHEN 0 THEN 'pending' ELSE 'completed' END,
+                   CASE n % 3 WHEN 0 THEN 'low' WHEN 1 THEN 'medium' ELSE 'high' END,
+                   printf('2025-%02d-%02d', n % 12 + 1, n % 28 + 1),
+                   0
+            FROM seq
+        """), {"n": n_rows})
+
+
+async def drain_export(fmt: str) -> dict:
+    """
+    Ejecuta `GET /tasks/export` contra la app ASGI y descarta el cuerpo.
+
+    Returns:
+        dict: Estado HTTP, bytes recibidos y líneas recibidas.
+    """
+    received = {"status": None, "bytes": 0, "lines": 0}
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/tasks/export",
+        "raw_path": b"/tasks/export",
+        "query_string": f"format={fmt}".encode(),
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        # Primero el cuerpo (vacío) de la petición; después el cliente sigue
+        # conectado hasta que termina la respuesta.
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            received["bytes"] += len(body)
+            received["lines"] += body.count(b"\n")
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await main.warm_up_async_engines()
+    await main.app(scope, receive, send)
+    return received
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de la exportación en streaming")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Tareas sembradas en la BD")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson", help="Formato de exportación")
+    args = parser.parse_args()
+
+    seed(args.rows)
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    received = asyncio.run(drain_export(args.format))
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "rows": args.rows,
+        "format": args.format,
+        "status": received["status"],
+        "bytes": received["bytes"],
+        "lines": received["lines"],
+        "seconds": round(elapsed, 2),
+        "peak_rss_mb_before": round(rss_before, 1),
+        "peak_rss_mb_after": round(peak_rss_mb(), 1),
+    }))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,143 @@
+"""
+bench_search.py
+
+Compara la búsqueda FTS5 (`crud.search_tasks`) con un recorrido
+`LIKE '%término%'` sobre título y descripción, con 100k y 1M tareas.
+
+Ejecutar desde quicktask_backend/:
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --rows 100000 --repeat 20
+
+Para cada tamaño se siembra una base temporal nueva y se miden dos consultas
+por término (mediana de `--repeat` ejecuciones, en ms):
+- `page`: primera página de 20 resultados (lo que hace el endpoint).
+- `count`: total de coincidencias (obliga a LIKE a recorrer toda la tabla).
+
+Los términos tienen distinta selectividad: `comun` aparece en todas las
+tareas, `grupo7x` en el 10% y `clave123x` en el 0,1%. Con un término común
+LIKE encuentra 20 filas enseguida; la diferencia aparece con términos poco
+frecuentes y al contar.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
+
+# Base de datos temporal (configurada antes de importar database.py)
+BENCH_DIR = tempfile.TemporaryDirectory()
+BENCH_DB_PATH = os.path.join(BENCH_DIR.name, "bench_search.db")
+os.environ["QUICKTASK_DATABASE_URL"] = f"sqlite:///{BENCH_DB_PATH}"
+
+from sqlalchemy import func, or_, select, text  # noqa: E402
+
+import database  # noqa: E402
+import crud  # noqa: E402
+import main  # noqa: E402, F401
+import migrations  # noqa: E402
+import search  # noqa: E402
+from models import Task  # noqa: E402
+
+# Esquema de la base temporal (tablas, índices, FTS5, triggers)
+migrations.migrate(database.engine)
+
+TERMS = ("comun", "grupo7x", "clave123x")
+PAGE_SIZE = 20
+
+
+def seed(n_rows: int):
+    """
+    Vacía la tabla e inserta `n_rows` tareas con un CTE recursivo.
+
+    Los triggers de FTS5 indexan cada fila en la misma sentencia.
+    """
+    with database.engine.begin() as conn:
+        conn.execute(text("DELETE FROM tasks"))
+        conn.execute(text("""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :n)
+            INSERT INTO tasks (title, description, status, priority, is_deleted)
+            SELECT 'Tarea ' || n || ' grupo' || (n % 10) || 'x',
+                   'Descripción comun de la tarea con clave' || (n % 1000) || 'x',
+                   'pending', 'medium', 0
+            FROM seq
+        """), {"n": n_rows})
+
+
+def like_conditions(term: str):
+    """Condición `LIKE '%término%'` sobre título o descripción."""
+    pattern = f"%{term}%"
+    return [Task.is_deleted == False, or_(Task.title.like(pattern), Task.description.like(pattern))]
+
+
+def like_page(db, term: str):
+    stmt = select(Task).where(*like_conditions(term)).order_by(Task.id).limit(PAGE_SIZE)
+    return db.execute(stmt).all()
+
+
+def like_count(db, term: str):
+    return db.scalar(select(func.count()).select_from(Task).where(*like_conditions(term)))
+
+
+def fts_page(db, term: str):
+    return crud.search_tasks(db, term, limit=PAGE_SIZE)
+
+
+def fts_count(db, term: str):
+    stmt = (
+        select(func.count())
+        .select_from(search.tasks_fts)
+        .where(search.match_condition(search.build_match_query(term)))
+    )
+    return db.scalar(stmt)
+
+
+def median_ms(fn, db, term: str, repeat: int) -> float:
+    """Mediana en milisegundos de `repeat` ejecuciones de `fn(db, term)`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(db, term)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda FTS5 frente a LIKE")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000], help="Tamaños de la tabla")
+    parser.add_argument("--repeat", type=int, default=10, help="Ejecuciones por medición")
+    args = parser.parse_args()
+
+    results = []
+    for n_rows in args.rows:
+        start = time.perf_counter()
+        seed(n_rows)
+        seed_seconds = time.perf_counter() - start
+        print(f"# {n_rows} tareas sembradas e indexadas en {seed_seconds:.1f} s", flush=True)
+
+        with database.SessionLocal() as db:
+            for term in TERMS:
+                result = {
+                    "rows": n_rows,
+                    "term": term,
+                    "matches": fts_count(db, term),
+                    "like_page_ms": round(median_ms(like_page, db, term, args.repeat), 2),
+                    "fts_page_ms": round(median_ms(fts_page, db, term, args.repeat), 2),
+                    "like_count_ms": round(median_ms(like_count, db, term, args.repeat), 2),
+                    "fts_count_ms": round(median_ms(fts_count, db, term, args.repeat), 2),
+                }
+                assert result["matches"] == like_count(db, term)
+                results.append(result)
+                print(json.dumps(result), flush=True)
+
+    return results
+
+
+if __name__ == "__main__":
+    main_cli()
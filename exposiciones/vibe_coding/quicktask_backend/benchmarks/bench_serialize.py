@@ -0,0 +1,156 @@
+"""
+bench_serialize.py
+
+Mide el coste por fila de generar el cuerpo de `GET /tasks` antes y después
+del camino rápido (registros Core + orjson), y la memoria asignada al leer
+una página.
+
+Ejecutar desde quicktask_backend/:
+    python benchmarks/bench_serialize.py
+    python benchmarks/bench_serialize.py --page-sizes 100 1000 --repeat 50
+
+- antes: objetos ORM (`session.query(Task)`) validados con
+  `list[TaskResponse]` (`from_attributes`), volcados a tipos JSON y
+  codificados con `json.dumps`, que es lo que hacen FastAPI
+  (`response_model`) y `JSONResponse`.
+- después: registros inmutables de `crud.get_tasks` codificados con orjson
+  (`export.encode_json_array`), con todas las columnas y con la proyección
+  `fields=id,title,status`.
+
+Para cada tamaño de página se mide solo la serialización (datos ya leídos) y
+la consulta más la serialización, en microsegundos por fila (mediana de
+`--repeat` ejecuciones), y el pico de memoria asignada (tracemalloc) al leer
+la página.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BACKEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
+
+# Base de datos temporal (configurada antes de importar database.py)
+BENCH_DIR = tempfile.TemporaryDirectory()
+BENCH_DB_PATH = os.path.join(BENCH_DIR.name, "bench_serialize.db")
+os.environ["QUICKTASK_DATABASE_URL"] = f"sqlite:///{BENCH_DB_PATH}"
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+import database  # noqa: E402
+import crud  # noqa: E402
+import export  # noqa: E402
+import main  # noqa: E402
+import migrations  # noqa: E402
+import schemas  # noqa: E402
+from models import Task  # noqa: E402
+
+# Esquema de la base temporal (tablas, índices, FTS5, triggers)
+migrations.migrate(database.engine)
+
+PROJECTION = ("id", "title", "status")
+RESPONSE_ADAPTER = TypeAdapter(list[schemas.TaskResponse])
+
+
+def seed(n_rows: int):
+    """Inserta `n_rows` tareas con un CTE recursivo."""
+    with database.engine.begin() as conn:
+        conn.execute(text("""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :n)
+            INSERT INTO tasks (title, description, status, priority, due_date, is_deleted)
+            SELECT 'Tarea ' || n,
+                   'Descripción de la tarea número ' || n,
+                   'pending', 'medium', '2025-10-30', 0
+            FROM seq
+        """), {"n": n_rows})
+
+
+def serialize_before(tasks) -> bytes:
+    """`response_model=list[TaskResponse]` + `JSONResponse.render`."""
+    validated = RESPONSE_ADAPTER.validate_python(tasks, from_attributes=True)
+    content = RESPONSE_ADAPTER.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def serialize_after(rows, fields=None) -> bytes:
+    return export.encode_json_array(rows, fields or main.TASK_FIELDS)
+
+
+def load_before(db, limit: int):
+    # Sesión limpia: el identity map no debe reutilizar objetos de otra pasada
+    db.expunge_all()
+    return db.query(Task).filter(Task.is_deleted == False).order_by(Task.id).limit(limit).all()
+
+
+def load_after(db, limit: int, fields=None):
+    return crud.get_tasks(db, limit=limit, fields=fields)
+
+
+def peak_kib(fn) -> float:
+    """Pico de memoria asignada (KiB) mientras se ejecuta `fn()`."""
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak / 1024
+
+
+def median_us_per_row(fn, repeat: int, n_rows: int) -> float:
+    """Mediana, en microsegundos por fila, de `repeat` ejecuciones de `fn()`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) / n_rows * 1_000_000
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Coste por fila de la serialización del listado")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[100, 1000], help="Tamaños de página")
+    parser.add_argument("--repeat", type=int, default=30, help="Ejecuciones por medición")
+    args = parser.parse_args()
+
+    seed(max(args.page_sizes))
+    print(f"{'filas':>6} {'medición':<26} {'antes':>10} {'después':>10} {'fields':>10}")
+    with database.SessionLocal() as db:
+        for limit in args.page_sizes:
+            tasks, rows = load_before(db, limit), load_after(db, limit)
+            projected = load_after(db, limit, PROJECTION)
+            # Ambos caminos deben producir exactamente el mismo JSON
+            assert json.loads(serialize_before(tasks)) == json.loads(serialize_after(rows))
+
+            measurements = {
+                "serialización (µs/fila)": (
+                    lambda: serialize_before(tasks),
+                    lambda: serialize_after(rows),
+                    lambda: serialize_after(projected, PROJECTION),
+                ),
+                "consulta + serial. (µs/fila)": (
+                    lambda: serialize_before(load_before(db, limit)),
+                    lambda: serialize_after(load_after(db, limit)),
+                    lambda: serialize_after(load_after(db, limit, PROJECTION), PROJECTION),
+                ),
+            }
+            for name, fns in measurements.items():
+                cells = [median_us_per_row(fn, args.repeat, limit) for fn in fns]
+                print(f"{limit:>6} {name:<26} " + " ".join(f"{cell:>10.2f}" for cell in cells), flush=True)
+
+            cells = [
+                peak_kib(lambda: load_before(db, limit)),
+                peak_kib(lambda: load_after(db, limit)),
+                peak_kib(lambda: load_after(db, limit, PROJECTION)),
+            ]
+            print(f"{limit:>6} {'memoria al leer (KiB)':<26} " + " ".join(f"{cell:>10.0f}" for cell in cells), flush=True)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,143 @@
+"""
+bench_write_batch.py
+
+Compara el throughput de escritura con y sin agrupación de commits
+(`batcher.WriteBatcher`) con varios niveles de clientes concurrentes.
+
+Ejecutar desde quicktask_backend/:
+    python benchmarks/bench_write_batch.py
+    python benchmarks/bench_write_batch.py --clients 1 64 --requests 50 --synchronous FULL
+
+Cada cliente envía `--requests` peticiones de escritura en proceso
+(`httpx.ASGITransport`, sin red): 70% `POST /tasks` y 30% `PATCH
+/tasks/{id}` sobre tareas ya creadas. Se mide con `PRAGMA synchronous`
+NORMAL (perfil por defecto: sin fsync por commit con WAL) y FULL (un fsync
+por commit), que es donde el coste de cada commit pesa más.
+
+- individual: cada petición confirma su propia transacción.
+- agrupado: las peticiones concurrentes se confirman juntas (ventana de
+  `--max-delay-ms` o `--max-ops` operaciones).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
+
+# Base de datos temporal (configurada antes de importar database.py)
+BENCH_DIR = tempfile.TemporaryDirectory()
+BENCH_DB_PATH = os.path.join(BENCH_DIR.name, "bench_write_batch.db")
+os.environ["QUICKTASK_DATABASE_URL"] = f"sqlite:///{BENCH_DB_PATH}"
+
+import httpx  # noqa: E402
+
+import database  # noqa: E402
+import crud_async  # noqa: E402
+import main  # noqa: E402
+import migrations  # noqa: E402
+from batcher import WriteBatcher  # noqa: E402
+
+# Esquema de la base temporal (tablas, índices, FTS5, triggers)
+migrations.migrate(database.engine)
+
+PRIORITIES = ("low", "medium", "high")
+
+
+async def run_load(clients: int, requests_per_client: int, batcher: WriteBatcher = None) -> dict:
+    """
+    Lanza `clients` corrutinas que envían escrituras concurrentes.
+
+    Returns:
+        dict: Throughput (ops/s), latencias p50/p99 (ms), errores y
+            operaciones por transacción.
+    """
+    latencies = []
+    errors = 0
+    created = []
+    crud_async.write_batcher = batcher
+
+    async def client_loop(http: httpx.AsyncClient):
+        nonlocal errors
+        for i in range(requests_per_client):
+            start = time.perf_counter()
+            if created and random.random() < 0.3:
+                response = await http.patch(
+                    f"/tasks/{random.choice(created)}", json={"priority": random.choice(PRIORITIES)}
+                )
+            else:
+                response = await http.post("/tasks", json={"title": f"Tarea {i}", "description": "Escritura"})
+                if response.status_code == 201:
+                    created.append(response.json()["id"])
+            latencies.append(time.perf_counter() - start)
+            if response.status_code not in (200, 201):
+                errors += 1
+
+    # ASGITransport no ejecuta los eventos de arranque de la app
+    await main.warm_up_async_engines()
+
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    if batcher is not None:
+        await batcher.close()
+    crud_async.write_batcher = None
+    # Las conexiones aiosqlite quedan ligadas al event loop de esta corrida
+    await database.async_read_engine.dispose()
+    await database.async_write_engine.dispose()
+
+    latencies.sort()
+    return {
+        "ops_s": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000,
+        "errors": errors,
+        "ops_per_tx": batcher.stats()["ops_per_batch"] if batcher else 1.0,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark de escrituras con y sin group commit")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 16, 64, 256], help="Niveles de concurrencia")
+    parser.add_argument("--requests", type=int, default=20, help="Peticiones por cliente")
+    parser.add_argument("--synchronous", nargs="+", default=["NORMAL", "FULL"], help="Valores de PRAGMA synchronous")
+    parser.add_argument("--max-ops", type=int, default=256, help="Operaciones máximas por transacción agrupada")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0, help="Ventana de agrupación (ms)")
+    args = parser.parse_args()
+
+    print(
+        f"{'sync':>6} | {'clientes':>8} | {'modo':>10} | {'ops/s':>9} | "
+        f"{'p50 ms':>8} | {'p99 ms':>8} | {'ops/tx':>6} | {'errores':>7}"
+    )
+    print("-" * 84)
+    for synchronous in args.synchronous:
+        # El pragma se aplica al abrir cada conexión; los engines se vacían tras cada corrida
+        database.settings.sqlite_synchronous = synchronous
+        for clients in args.clients:
+            for label in ("individual", "agrupado"):
+                batcher = None
+                if label == "agrupado":
+                    batcher = WriteBatcher(
+                        database.async_write_engine, max_batch=args.max_ops, max_delay=args.max_delay_ms / 1000
+                    )
+                result = asyncio.run(run_load(clients, args.requests, batcher))
+                print(
+                    f"{synchronous:>6} | {clients:>8} | {label:>10} | {result['ops_s']:>9.1f} | "
+                    f"{result['p50_ms']:>8.2f} | {result['p99_ms']:>8.2f} | "
+                    f"{result['ops_per_tx']:>6.1f} | {result['errors']:>7}",
+                    flush=True,
+                )
+
+
+if __name__ == "__main__":
+    main_cli()
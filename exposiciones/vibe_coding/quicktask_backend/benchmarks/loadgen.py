@@ -0,0 +1,343 @@
+"""
+loadgen.py
+
+Generador de carga concurrente para la API: repite los escenarios CRUD de
+`run_demo.py` y `test_api.py` (crear, listar, filtrar, paginar, leer,
+actualizar, completar, eliminar, restaurar) como mezclas ponderadas, con
+muchos clientes a la vez sobre un pool de conexiones HTTP.
+
+Ejecutar desde quicktask_backend/ con el servidor arrancado:
+    python benchmarks/loadgen.py --mix read-heavy --concurrency 64 --duration 30
+    python benchmarks/loadgen.py --mix write-heavy polling --ramp-up 5 --output carga.json
+    python benchmarks/loadgen.py --mix read-heavy --compare carga.json
+
+O sin servidor, contra la aplicación en proceso y una base temporal:
+    python benchmarks/loadgen.py --in-process --duration 10
+
+Mezclas (`MIXES`):
+- read-heavy: sobre todo `GET /tasks` (con filtros y paginación) y
+  `GET /tasks/{id}`.
+- write-heavy: sobre todo `POST /tasks` y `PATCH /tasks/{id}`, con
+  eliminaciones y restauraciones.
+- polling: clientes que sincronizan con `GET /tasks/changes?since=...` y
+  consultan `GET /tasks/stats`.
+
+Los clientes arrancan repartidos a lo largo de `--ramp-up` segundos y se
+detienen al cumplirse `--duration`. Por endpoint se informa throughput,
+p50/p95/p99 y errores (excepciones de red y respuestas 5xx). `--output`
+guarda los resultados en JSON; `--compare` muestra la variación de p95 y
+throughput respecto de un JSON anterior.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+BASE_URL = "http://localhost:8000"
+PRIORITIES = ("low", "medium", "high")
+
+# Mezclas: escenario -> peso relativo
+MIXES = {
+    "read-heavy": {
+        "list": 25, "list_by_status": 15, "list_page": 10, "get": 35,
+        "create": 5, "update": 5, "complete": 3, "get_missing": 2,
+    },
+    "write-heavy": {
+        "create": 35, "update": 25, "complete": 10, "delete": 10, "restore": 5,
+        "get": 10, "list": 5,
+    },
+    "polling": {
+        "changes": 60, "stats": 15, "get": 15, "create": 10,
+    },
+}
+
+
+class LoadState:
+    """
+    Estado compartido por los clientes de una corrida.
+
+    Atributos:
+        ids (list): Tareas vivas (para leer, actualizar y eliminar).
+        deleted (list): Tareas eliminadas (para restaurar).
+        samples (dict): Endpoint -> latencias (s) de cada petición.
+        statuses (dict): Endpoint -> {código: peticiones}.
+        errors (dict): Endpoint -> peticiones fallidas.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.deleted = []
+        self.samples = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, endpoint: str, elapsed: float, status):
+        self.samples.setdefault(endpoint, []).append(elapsed)
+        codes = self.statuses.setdefault(endpoint, {})
+        codes[str(status)] = codes.get(str(status), 0) + 1
+        if status is None or status >= 500:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+# ============================================================================
+# ESCENARIOS
+# ============================================================================
+# Cada escenario devuelve (endpoint, corrutina de la petición) o None si no
+# puede ejecutarse todavía (p. ej. no hay tareas eliminadas que restaurar).
+
+def _new_task(rng):
+    return {
+        "title": f"Carga {rng.randrange(1_000_000)}",
+        "description": "Tarea generada por loadgen",
+        "priority": rng.choice(PRIORITIES),
+        "due_date": f"2099-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+    }
+
+
+def _scenario(name: str, http: httpx.AsyncClient, state: LoadState, rng, client: dict):
+    if name == "list":
+        return "GET /tasks", http.get("/tasks", params={"limit": 50})
+    if name == "list_by_status":
+        return "GET /tasks?status", http.get("/tasks", params={"status": rng.choice(("pending", "completed"))})
+    if name == "list_page":
+        return "GET /tasks?skip&limit", http.get("/tasks", params={"skip": rng.randrange(0, 200), "limit": 20})
+    if name == "get_missing":
+        return "GET /tasks/{task_id}", http.get("/tasks/999999999")
+    if name == "stats":
+        return "GET /tasks/stats", http.get("/tasks/stats")
+    if name == "create":
+        return "POST /tasks", http.post("/tasks", json=_new_task(rng))
+    if name == "restore":
+        if not state.deleted:
+            return None
+        task_id = state.deleted.pop(rng.randrange(len(state.deleted)))
+        state.ids.append(task_id)
+        return "POST /tasks/{task_id}/restore", http.post(f"/tasks/{task_id}/restore")
+    if name == "changes":
+        return "GET /tasks/changes", http.get("/tasks/changes", params={"since": client["since"], "limit": 100})
+    if not state.ids:
+        return None
+    task_id = rng.choice(state.ids)
+    if name == "get":
+        return "GET /tasks/{task_id}", http.get(f"/tasks/{task_id}")
+    if name == "update":
+        body = {"priority": rng.choice(PRIORITIES), "description": f"Actualizada {rng.randrange(1000)}"}
+        return "PATCH /tasks/{task_id}", http.patch(f"/tasks/{task_id}", json=body)
+    if name == "complete":
+        return "PATCH /tasks/{task_id}", http.patch(f"/tasks/{task_id}", json={"status": "completed"})
+    if name == "delete":
+        state.ids.remove(task_id)
+        state.deleted.append(task_id)
+        return "DELETE /tasks/{task_id}", http.delete(f"/tasks/{task_id}")
+    raise ValueError(f"Escenario desconocido: {name}")
+
+
+async def _client_loop(http, state: LoadState, mix: dict, deadline: float, seed: int):
+    """Un cliente: elige escenarios según los pesos hasta el final de la corrida."""
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    client = {"since": 0}
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        chosen = _scenario(name, http, state, rng, client)
+        if chosen is None:
+            await asyncio.sleep(0)
+            continue
+        endpoint, request = chosen
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            state.record(endpoint, time.perf_counter() - start, None)
+            continue
+        state.record(endpoint, time.perf_counter() - start, response.status_code)
+        if name == "create" and response.status_code == 201:
+            state.ids.append(response.json()["id"])
+        elif name == "changes" and response.status_code == 200:
+            client["since"] = response.json()["next_since"]
+
+
+# ============================================================================
+# CORRIDA Y RESULTADOS
+# ============================================================================
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Percentil `q` (0-100) por rango más cercano de una lista ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def _summary(samples: list, errors: int, elapsed: float) -> dict:
+    samples = sorted(samples)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 2),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3) if samples else 0.0,
+    }
+
+
+async def run_mix(http, mix_name: str, concurrency: int, duration: float, ramp_up: float, seed_tasks: int) -> dict:
+    """
+    Ejecuta una mezcla con `concurrency` clientes durante `duration` segundos.
+
+    Args:
+        http (httpx.AsyncClient): Cliente con el pool de conexiones.
+        mix_name (str): Clave de `MIXES`.
+        concurrency (int): Clientes simultáneos.
+        duration (float): Segundos de la corrida (incluida la rampa).
+        ramp_up (float): Segundos en los que arrancan todos los clientes.
+        seed_tasks (int): Tareas creadas antes de medir.
+
+    Returns:
+        dict: Totales y resumen por endpoint.
+    """
+    state = LoadState()
+    for i in range(seed_tasks):
+        response = await http.post("/tasks", json=_new_task(random.Random(i)))
+        response.raise_for_status()
+        state.ids.append(response.json()["id"])
+
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def delayed(index: int):
+        await asyncio.sleep(ramp_up * index / concurrency)
+        await _client_loop(http, state, MIXES[mix_name], deadline, seed=index)
+
+    await asyncio.gather(*(delayed(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    everything = [value for values in state.samples.values() for value in values]
+    return {
+        "mix": mix_name,
+        "elapsed_s": round(elapsed, 3),
+        "total": _summary(everything, sum(state.errors.values()), elapsed),
+        "endpoints": {
+            endpoint: {**_summary(values, state.errors.get(endpoint, 0), elapsed), "statuses": state.statuses[endpoint]}
+            for endpoint, values in sorted(state.samples.items())
+        },
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _in_process_client():
+    """Cliente contra la aplicación ASGI en proceso, con una base temporal."""
+    backend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    if backend_path not in sys.path:
+        sys.path.insert(0, backend_path)
+    tmp = tempfile.mkdtemp()
+    os.environ["QUICKTASK_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'loadgen.db')}"
+    import database
+    import main
+    import migrations
+
+    migrations.migrate(database.engine)
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    return main, httpx.AsyncClient(transport=transport, base_url="http://loadgen")
+
+
+def print_report(result: dict, baseline: dict = None):
+    """Tabla por endpoint; con `baseline`, variación de p95 y throughput."""
+    endpoints = dict(result["endpoints"], TOTAL=result["total"])
+    before = dict(baseline["endpoints"], TOTAL=baseline["total"]) if baseline else {}
+    print(f"\n== {result['mix']} ({result['elapsed_s']} s)")
+    print(
+        f"{'endpoint':<30} | {'req':>7} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | "
+        f"{'p99 ms':>8} | {'errores':>7}" + (f" | {'Δp95':>7} | {'Δreq/s':>7}" if baseline else "")
+    )
+    print("-" * (98 + (20 if baseline else 0)))
+    for endpoint, s in endpoints.items():
+        line = (
+            f"{endpoint:<30} | {s['requests']:>7} | {s['rps']:>8.1f} | {s['p50_ms']:>8.2f} | "
+            f"{s['p95_ms']:>8.2f} | {s['p99_ms']:>8.2f} | {s['errors']:>7}"
+        )
+        if baseline:
+            old = before.get(endpoint)
+            if old and old["p95_ms"] and old["rps"]:
+                line += f" | {s['p95_ms'] / old['p95_ms'] - 1:>+7.0%} | {s['rps'] / old['rps'] - 1:>+7.0%}"
+            else:
+                line += f" | {'-':>7} | {'-':>7}"
+        print(line)
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Generador de carga concurrente para QuickTask")
+    parser.add_argument("--base-url", default=BASE_URL, help="URL de la API")
+    parser.add_argument("--in-process", action="store_true", help="Aplicación en proceso con base temporal")
+    parser.add_argument("--mix", nargs="+", choices=sorted(MIXES), default=["read-heavy"], help="Mezclas a ejecutar")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clientes simultáneos")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos por mezcla (incluida la rampa)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Segundos hasta tener todos los clientes")
+    parser.add_argument("--seed-tasks", type=int, default=100, help="Tareas creadas antes de cada mezcla")
+    parser.add_argument("--output", help="Archivo JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {run["mix"]: run for run in json.load(f)["runs"]}
+
+    async def run():
+        if args.in_process:
+            app_module, http = _in_process_client()
+            # ASGITransport no ejecuta los eventos de arranque de la app
+            await app_module.warm_up_async_engines()
+        else:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            http = httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30.0)
+        runs = []
+        async with http:
+            for mix_name in args.mix:
+                result = await run_mix(http, mix_name, args.concurrency, args.duration, args.ramp_up, args.seed_tasks)
+                print_report(result, baseline.get(mix_name))
+                runs.append(result)
+        return runs
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    runs = asyncio.run(run())
+    report = {
+        "started_at": started_at,
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "target": "in-process" if args.in_process else args.base_url,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "ramp_up_s": args.ramp_up,
+        "runs": runs,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados en {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,295 @@
+"""
+microbench.py
+
+Microbenchmarks de `crud.py`, del camino completo de una petición
+(`TestClient`) y de la serialización de listas de `TaskResponse`, con 10k,
+100k y 1M tareas, comparados con una línea base guardada.
+
+Ejecutar desde quicktask_backend/:
+    python benchmarks/microbench.py --save-baseline          # mide y guarda la línea base
+    python benchmarks/microbench.py                           # compara; sale con 1 si hay regresiones
+    python benchmarks/microbench.py --sizes 10000 --tolerance 0.5 --only crud.
+
+La base temporal se siembra por tramos (10k, luego hasta 100k, luego hasta
+1M) con un CTE recursivo; 1 de cada 20 tareas está eliminada y las fechas,
+estados y prioridades varían. Cada benchmark se ejecuta `--repeat` veces
+tras una de calentamiento y se guarda la mediana en ms.
+
+Las escrituras de `crud.py` se miden dentro de una transacción que se
+deshace al terminar, y las tareas que crean los benchmarks HTTP se borran:
+cada tamaño se mide con exactamente las tareas sembradas.
+
+La línea base (`benchmarks/baselines.json` por defecto) depende de la
+máquina: se guarda y se compara en el mismo equipo (o el mismo runner de CI).
+Un benchmark es una regresión si su mediana supera la de la línea base en
+más de `--tolerance` (25% por defecto) y en más de `--min-delta-ms` (para
+no marcar el ruido de las mediciones de microsegundos).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date
+
+BACKEND_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_PATH not in sys.path:
+    sys.path.insert(0, BACKEND_PATH)
+
+# Base de datos temporal (configurada antes de importar database.py). Sin
+# archivador ni caché de tareas: las mediciones no deben depender de ellos.
+BENCH_DIR = tempfile.TemporaryDirectory()
+BENCH_DB_PATH = os.path.join(BENCH_DIR.name, "microbench.db")
+os.environ["QUICKTASK_DATABASE_URL"] = f"sqlite:///{BENCH_DB_PATH}"
+os.environ.setdefault("QUICKTASK_ARCHIVE_ENABLED", "false")
+os.environ.setdefault("QUICKTASK_TASK_CACHE_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import database  # noqa: E402
+import crud  # noqa: E402
+import export  # noqa: E402
+import main  # noqa: E402
+import migrations  # noqa: E402
+import schemas  # noqa: E402
+from models import Task  # noqa: E402
+
+# Esquema de la base temporal (tablas, índices, FTS5, triggers)
+migrations.migrate(database.engine)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+SIZES = (10_000, 100_000, 1_000_000)
+PAGE_SIZE = 100
+TODAY = date(2099, 6, 1)
+RESPONSE_ADAPTER = TypeAdapter(list[schemas.TaskResponse])
+
+
+def seed(start: int, end: int):
+    """Inserta las tareas `start`..`end` (los triggers de FTS5 y contadores incluidos)."""
+    with database.engine.begin() as conn:
+        conn.execute(text("""
+            WITH RECURSIVE seq(n) AS (SELECT :start UNION ALL SELECT n + 1 FROM seq WHERE n < :end)
+            INSERT INTO tasks (title, description, status, priority, due_date, is_deleted, deleted_at)
+            SELECT 'Tarea ' || n || ' grupo' || (n % 10) || 'x',
+                   'Descripción de la tarea ' || n || ' clave' || (n % 1000) || 'x',
+                   CASE WHEN n % 3 = 0 THEN 'completed' ELSE 'pending' END,
+                   CASE n % 3 WHEN 0 THEN 'low' WHEN 1 THEN 'medium' ELSE 'high' END,
+                   CASE WHEN n % 4 = 0 THEN NULL ELSE date('2099-01-01', '+' || (n % 365) || ' days') END,
+                   n % 20 = 0,
+                   CASE WHEN n % 20 = 0 THEN CURRENT_TIMESTAMP END
+            FROM seq
+        """), {"start": start, "end": end})
+
+
+@contextmanager
+def rolled_back():
+    """
+    Sesión cuyas escrituras se deshacen al salir del bloque.
+
+    Los `db.commit()` de `crud.py` liberan un SAVEPOINT y la transacción
+    exterior se deshace (tareas, contadores e IDs vuelven a como estaban).
+    El BEGIN es explícito: el driver sqlite3 no lo emite antes de un
+    SAVEPOINT y el primer RELEASE confirmaría.
+    """
+    with database.engine.connect() as conn:
+        conn.exec_driver_sql("BEGIN")
+        session = Session(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            yield session
+        finally:
+            session.close()
+            conn.rollback()
+
+
+def discard_new_tasks(n_rows: int):
+    """Borra las tareas creadas tras la siembra y devuelve la secuencia de IDs a `n_rows`."""
+    with database.engine.begin() as conn:
+        conn.execute(text("DELETE FROM tasks WHERE id > :n"), {"n": n_rows})
+        conn.execute(text("UPDATE sqlite_sequence SET seq = :n WHERE name = 'tasks'"), {"n": n_rows})
+
+
+def target_ids(db, n_rows: int) -> list[int]:
+    """IDs de `PAGE_SIZE` tareas no eliminadas del medio de la tabla."""
+    middle = n_rows // 2 + 1
+    return list(db.scalars(
+        select(Task.id).where(Task.id >= middle, Task.is_deleted == False).order_by(Task.id).limit(PAGE_SIZE)
+    ))
+
+
+def benchmarks(db, client, n_rows: int) -> dict:
+    """
+    Lecturas y peticiones HTTP de una base con `n_rows` tareas: nombre ->
+    función sin argumentos.
+
+    Las peticiones de escritura actúan sobre tareas del medio de la tabla.
+    """
+    middle = n_rows // 2 + 1
+    task_id = target_ids(db, n_rows)[0]
+    page = crud.get_tasks(db, limit=PAGE_SIZE)
+    objects = db.query(Task).filter(Task.is_deleted == False).order_by(Task.id).limit(PAGE_SIZE).all()
+
+    return {
+        "crud.get_tasks": lambda: crud.get_tasks(db, limit=PAGE_SIZE),
+        "crud.get_tasks_status": lambda: crud.get_tasks(db, status="completed", limit=PAGE_SIZE),
+        "crud.get_tasks_after": lambda: crud.get_tasks(db, after=(None, middle), limit=PAGE_SIZE),
+        "crud.get_tasks_due_sorted": lambda: crud.get_tasks(db, sort="due_date", limit=PAGE_SIZE),
+        "crud.get_tasks_priority_sorted": lambda: crud.get_tasks(db, sort="priority", limit=PAGE_SIZE),
+        "crud.get_tasks_overdue": lambda: crud.get_tasks(db, overdue=True, today=TODAY, limit=PAGE_SIZE),
+        "crud.get_task": lambda: crud.get_task(db, task_id),
+        "crud.search_tasks": lambda: crud.search_tasks(db, "clave123x"),
+        "crud.get_changes": lambda: crud.get_changes(db, since=n_rows // 2, limit=PAGE_SIZE),
+        "crud.get_task_stats": lambda: crud.get_task_stats(db, today=TODAY),
+        "crud.get_recent_tasks": lambda: crud.get_recent_tasks(db, limit=PAGE_SIZE),
+        "http.list_tasks": lambda: client.get("/tasks", params={"limit": PAGE_SIZE}),
+        "http.list_tasks_due_sorted": lambda: client.get("/tasks", params={"limit": PAGE_SIZE, "sort": "due_date"}),
+        "http.get_task": lambda: client.get(f"/tasks/{task_id}"),
+        "http.create_task": lambda: client.post("/tasks", json={"title": "Nueva", "priority": "high"}),
+        "http.patch_task": lambda: client.patch(f"/tasks/{task_id}", json={"priority": "medium"}),
+        "http.search_tasks": lambda: client.get("/tasks/search", params={"q": "clave123x"}),
+        "http.task_stats": lambda: client.get("/tasks/stats"),
+        "serialize.pydantic_orm": lambda: RESPONSE_ADAPTER.dump_json(
+            RESPONSE_ADAPTER.validate_python(objects, from_attributes=True)
+        ),
+        "serialize.fast_path": lambda: export.encode_json_array(page, main.TASK_FIELDS),
+    }
+
+
+def write_benchmarks(ids: list[int]) -> dict:
+    """
+    Escrituras de `crud.py`: nombre -> función que recibe la sesión.
+
+    Se ejecutan con la sesión de `rolled_back`; las masivas actúan sobre
+    `ids` (o crean `PAGE_SIZE` tareas).
+    """
+    new_task = schemas.TaskCreate(title="Nueva", description="Microbenchmark", priority="high", due_date="2099-03-01")
+    new_tasks = [new_task] * PAGE_SIZE
+    update = schemas.TaskUpdate(priority="low")
+    selector = schemas.TaskBulkSelector(ids=ids)
+
+    def delete_restore(db):
+        crud.delete_task(db, ids[0])
+        crud.restore_task(db, ids[0])
+
+    def delete_restore_bulk(db):
+        crud.delete_tasks(db, selector)
+        crud.restore_tasks(db, selector)
+
+    return {
+        "crud.create_task": lambda db: crud.create_task(db, new_task),
+        "crud.create_tasks": lambda db: crud.create_tasks(db, new_tasks),
+        "crud.import_tasks_chunk": lambda db: crud.import_tasks_chunk(
+            db, new_tasks, import_id="microbench", lines_committed=PAGE_SIZE
+        ),
+        "crud.update_task": lambda db: crud.update_task(db, ids[0], update),
+        "crud.update_tasks": lambda db: crud.update_tasks(db, selector, update),
+        "crud.delete_restore_task": delete_restore,
+        "crud.delete_restore_tasks": delete_restore_bulk,
+    }
+
+
+def median_ms(fn, repeat: int) -> float:
+    """Mediana en ms de `repeat` ejecuciones de `fn`, tras una de calentamiento."""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run(sizes, repeat: int, only: str = None) -> dict:
+    """
+    Siembra cada tamaño y ejecuta los benchmarks.
+
+    Returns:
+        dict: "tamaño/nombre" -> mediana en ms.
+    """
+    results = {}
+    seeded = 0
+    with TestClient(main.app) as client, database.SessionLocal() as db:
+        for n_rows in sorted(sizes):
+            start = time.perf_counter()
+            seed(seeded + 1, n_rows)
+            seeded = n_rows
+            print(f"# {n_rows} tareas sembradas en {time.perf_counter() - start:.1f} s", file=sys.stderr, flush=True)
+            for name, fn in benchmarks(db, client, n_rows).items():
+                if only and not name.startswith(only):
+                    continue
+                results[f"{n_rows}/{name}"] = round(median_ms(fn, repeat), 4)
+                db.rollback()
+                discard_new_tasks(n_rows)
+            ids = target_ids(db, n_rows)
+            db.rollback()
+            for name, fn in write_benchmarks(ids).items():
+                if only and not name.startswith(only):
+                    continue
+                with rolled_back() as session:
+                    results[f"{n_rows}/{name}"] = round(median_ms(lambda: fn(session), repeat), 4)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """
+    Benchmarks que empeoraron respecto de la línea base.
+
+    Returns:
+        list[dict]: name, baseline_ms, ms y ratio de cada regresión.
+    """
+    regressions = []
+    for name, ms in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if ms > before * (1 + tolerance) and ms - before > min_delta_ms:
+            regressions.append({"name": name, "baseline_ms": before, "ms": ms, "ratio": round(ms / before, 2)})
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de QuickTask con línea base")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="Tareas sembradas")
+    parser.add_argument("--repeat", type=int, default=20, help="Ejecuciones por benchmark")
+    parser.add_argument("--only", help="Solo los benchmarks cuyo nombre empieza así (crud., http., serialize.)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Archivo JSON de la línea base")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Empeoramiento relativo admitido")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Empeoramiento absoluto mínimo (ms)")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.only)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"{'benchmark':<42} | {'ms':>10} | {'base ms':>10} | {'ratio':>6}")
+    print("-" * 78)
+    for name, ms in results.items():
+        before = baseline.get(name)
+        ratio = f"{ms / before:>6.2f}" if before else f"{'-':>6}"
+        print(f"{name:<42} | {ms:>10.4f} | {before if before is not None else '-':>10} | {ratio}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+        print(f"\nLínea base guardada en {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    for regression in regressions:
+        print(json.dumps({"event": "regression", **regression}))
+    if not baseline:
+        print(f"\nSin línea base en {args.baseline}: ejecutar con --save-baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,121 @@
+"""
+cache.py
+
+Caché en proceso (LRU con TTL) para las lecturas de una tarea individual.
+
+Guarda el `TaskResponse` ya serializado (bytes JSON) por ID de tarea, de modo
+que un acierto no toca la base de datos ni vuelve a validar el modelo. Las
+escrituras invalidan las entradas afectadas de forma exacta; las operaciones
+masivas por filtro, que no conocen los IDs, vacían la caché.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class TaskCache:
+    """
+    Caché LRU acotada con caducidad por entrada.
+
+    Todas las operaciones se ejecutan en el hilo del event loop, por lo que
+    no necesita bloqueos. Para no guardar un valor obsoleto cuando una
+    escritura termina mientras una lectura estaba en curso, la lectura toma
+    una `generation()` antes de consultar la BD y `put` descarta el valor si
+    hubo alguna invalidación desde entonces.
+
+    Atributos:
+        enabled (bool): Si es False, `get` siempre falla y `put` no guarda nada.
+        max_entries (int): Número máximo de tareas en caché.
+        ttl (float): Segundos que una entrada es válida.
+        hits (int): Lecturas servidas desde la caché.
+        misses (int): Lecturas que tuvieron que ir a la BD.
+        evictions (int): Entradas expulsadas por tamaño o caducidad.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0, enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()
+        self._generation = 0
+
+    def get(self, task_id: int):
+        """
+        Devuelve la respuesta serializada de una tarea si está en caché.
+
+        Args:
+            task_id (int): ID de la tarea.
+
+        Returns:
+            bytes: JSON del `TaskResponse`, o None si no está o caducó.
+        """
+        if not self.enabled:
+            return None
+        entry = self._entries.get(task_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, body = entry
+        if expires_at <= time.monotonic():
+            del self._entries[task_id]
+            self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(task_id)
+        self.hits += 1
+        return body
+
+    def generation(self) -> int:
+        """Contador de invalidaciones; se pasa a `put` para detectar carreras."""
+        return self._generation
+
+    def put(self, task_id: int, body: bytes, generation: int):
+        """
+        Guarda la respuesta serializada de una tarea.
+
+        Args:
+            task_id (int): ID de la tarea.
+            body (bytes): JSON del `TaskResponse`.
+            generation (int): Valor de `generation()` tomado antes de leer la BD.
+        """
+        if not self.enabled or generation != self._generation:
+            return
+        self._entries[task_id] = (time.monotonic() + self.ttl, body)
+        self._entries.move_to_end(task_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *task_ids: int):
+        """
+        Elimina de la caché las tareas indicadas.
+
+        Args:
+            task_ids (int): IDs de las tareas modificadas.
+        """
+        self._generation += 1
+        for task_id in task_ids:
+            self._entries.pop(task_id, None)
+
+    def clear(self):
+        """Vacía la caché (escrituras cuyo alcance no se conoce por ID)."""
+        self._generation += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Devuelve los contadores de la caché.
+
+        Returns:
+            dict: enabled, size, max_entries, ttl_seconds, hits, misses y evictions.
+        """
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
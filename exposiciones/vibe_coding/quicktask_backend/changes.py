@@ -0,0 +1,169 @@
+"""
+changes.py
+
+Feed de cambios de tareas para la sincronización incremental
+(`GET /tasks/changes` y su variante en streaming con Server-Sent Events).
+
+Cada escritura sobre `tasks` recibe una versión de cambio global y creciente
+(`Task.change_version`), asignada por triggers a partir del contador de
+`sync_state`. Como SQLite admite un solo escritor, las versiones se hacen
+visibles en orden: un cliente que guarda la última versión recibida y pide
+`since=<versión>` obtiene exactamente lo que cambió después. Los soft-delete
+también cambian la versión y se entregan como tombstones (`deleted: true`).
+"""
+
+import asyncio
+import orjson
+from sqlalchemy import event, text
+import crud
+import crud_async
+import database
+
+CHANGES_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_tasks_change_version ON tasks (change_version)",
+    # Toda escritura (ORM, UPDATE por lotes, restore...) incrementa `version`
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_changes_ai AFTER INSERT ON tasks BEGIN
+        UPDATE sync_state SET last_version = last_version + 1 WHERE id = 1;
+        UPDATE tasks SET change_version = (SELECT last_version FROM sync_state WHERE id = 1)
+        WHERE id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_changes_au AFTER UPDATE OF version ON tasks BEGIN
+        UPDATE sync_state SET last_version = last_version + 1 WHERE id = 1;
+        UPDATE tasks SET change_version = (SELECT last_version FROM sync_state WHERE id = 1)
+        WHERE id = new.id;
+    END
+    """,
+)
+
+
+def create_change_triggers(engine):
+    """
+    Crea el contador de `sync_state`, el índice y los triggers del feed.
+
+    En una base con tareas anteriores al feed, cada tarea recibe como versión
+    de cambio su ID y el contador empieza en el mayor de ellos.
+
+    Args:
+        engine (Engine): Engine síncrono de la base de datos.
+    """
+    with engine.begin() as conn:
+        initialized = conn.execute(text("SELECT 1 FROM sync_state WHERE id = 1")).first() is not None
+        if not initialized:
+            conn.execute(text("UPDATE tasks SET change_version = id WHERE change_version = 0"))
+            conn.execute(text(
+                "INSERT INTO sync_state (id, last_version) SELECT 1, COALESCE(MAX(change_version), 0) FROM tasks"
+            ))
+        for statement in CHANGES_DDL:
+            conn.execute(text(statement))
+
+
+class ChangeNotifier:
+    """
+    Despierta a los streams SSE cuando el escritor confirma una transacción.
+
+    `watch()` devuelve el `asyncio.Event` vigente y `notify` lo activa y crea
+    uno nuevo. El stream toma el evento *antes* de consultar la BD, así un
+    commit que llegue durante la consulta no se pierde. Solo ve los commits
+    de este proceso: los de otros procesos se detectan al vencer la espera.
+    """
+
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def watch(self) -> asyncio.Event:
+        """Evento que se activará en el próximo commit."""
+        return self._event
+
+    def notify(self):
+        """Marca que hay cambios nuevos."""
+        self._event.set()
+        self._event = asyncio.Event()
+
+    @staticmethod
+    async def wait(watched: asyncio.Event, timeout: float) -> bool:
+        """
+        Espera a que se active `watched` o a que pase `timeout`.
+
+        Returns:
+            bool: True si hubo un commit, False si venció la espera.
+        """
+        try:
+            await asyncio.wait_for(watched.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+notifier = ChangeNotifier()
+
+
+def notify_on_commit(async_engine):
+    """
+    Avisa a `notifier` en cada commit del engine asíncrono de escritura.
+
+    Args:
+        async_engine (AsyncEngine): Engine del escritor único.
+    """
+    event.listen(async_engine.sync_engine, "commit", lambda conn: notifier.notify())
+
+
+def to_change(record, fields: list[str]) -> dict:
+    """
+    Convierte una fila de `crud.get_changes` en un cambio del feed.
+
+    Args:
+        record: Registro con change_version, is_deleted y `EXPORT_COLUMNS`.
+        fields (list[str]): Nombres de `EXPORT_COLUMNS`.
+
+    Returns:
+        dict: change_version, id, deleted y la tarea (None si es un tombstone).
+    """
+    change_version, is_deleted, *values = record
+    return {
+        "change_version": change_version,
+        "id": record.id,
+        "deleted": bool(is_deleted),
+        "task": None if is_deleted else dict(zip(fields, values)),
+    }
+
+
+async def stream_changes(since: int, fields: list[str], page_size: int, wait_seconds: float):
+    """
+    Genera eventos SSE con los cambios posteriores a `since`, indefinidamente.
+
+    Cada ronda abre una sesión de lectura nueva (y por tanto una instantánea
+    nueva de la BD), envía los cambios pendientes y espera al próximo commit.
+    Si en `wait_seconds` no hay commits envía un comentario de keep-alive y
+    vuelve a consultar (cubre escrituras de otros procesos).
+
+    Args:
+        since (int): Última versión de cambio que tiene el cliente.
+        fields (list[str]): Nombres de `EXPORT_COLUMNS`.
+        page_size (int): Cambios leídos por consulta.
+        wait_seconds (float): Espera máxima entre consultas.
+
+    Yields:
+        bytes: Eventos `change` (con `id` = versión, para `Last-Event-ID`),
+            comentarios de keep-alive o un evento final `reset` si los
+            tombstones posteriores a `since` ya se purgaron (el cliente debe
+            resincronizar desde 0).
+    """
+    while True:
+        watched = notifier.watch()
+        try:
+            async with (await database.read_sessionmaker())() as db:
+                records = await crud_async.get_changes(db, since=since, limit=page_size)
+        except crud.ChangesPurged as exc:
+            yield b"event: reset\ndata: %s\n\n" % orjson.dumps({"purged_version": exc.purged_version})
+            return
+        for record in records:
+            change = to_change(record, fields)
+            since = change["change_version"]
+            yield b"id: %d\nevent: change\ndata: %s\n\n" % (since, orjson.dumps(change))
+        if len(records) == page_size:
+            continue
+        if not await notifier.wait(watched, wait_seconds):
+            yield b": keep-alive\n\n"
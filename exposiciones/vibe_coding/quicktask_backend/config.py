@@ -0,0 +1,120 @@
+"""
+config.py
+
+Configuración de la aplicación leída de variables de entorno (prefijo
+`QUICKTASK_`) o de un archivo `.env`.
+
+Ejemplo:
+    QUICKTASK_DATABASE_URL=sqlite:////data/tasks.db
+    QUICKTASK_SQLITE_BUSY_TIMEOUT_MS=10000
+    QUICKTASK_READ_POOL_SIZE=16
+    QUICKTASK_TASK_CACHE_ENABLED=false
+    QUICKTASK_WRITE_BATCH_ENABLED=true
+"""
+
+from functools import lru_cache
+from typing import Literal
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Parámetros de almacenamiento y límites de QuickTask.
+
+    Los valores por defecto forman el perfil de producción para SQLite: WAL
+    (los lectores no bloquean al escritor), `synchronous=NORMAL` (seguro con
+    WAL, sin fsync por commit), caché de páginas y mmap amplios y un
+    `busy_timeout` para esperar el bloqueo en vez de fallar con
+    "database is locked".
+
+    Atributos:
+        database_url (str): URL síncrona de SQLAlchemy (`sqlite:///...`).
+        sqlite_journal_mode (str): Modo de journal ('WAL', 'DELETE', ...).
+        sqlite_synchronous (str): Nivel de `PRAGMA synchronous`.
+        sqlite_busy_timeout_ms (int): Espera máxima por un bloqueo (ms).
+        sqlite_cache_size_kib (int): Tamaño de la caché de páginas por conexión (KiB).
+        sqlite_mmap_size (int): Bytes del archivo mapeados en memoria (0 = desactivado).
+        read_pool_size (int): Conexiones del pool de solo lectura.
+        write_pool_timeout (float): Segundos que una escritura espera al escritor único.
+        bulk_max_items (int): Máximo de tareas por petición de creación masiva.
+        export_batch_size (int): Filas leídas del cursor por lote en la exportación.
+        import_chunk_size (int): Líneas por transacción en la importación NDJSON.
+        task_cache_enabled (bool): Activa la caché de `GET /tasks/{task_id}`.
+        task_cache_max_entries (int): Tareas máximas en la caché.
+        task_cache_ttl_seconds (float): Vigencia de cada entrada de la caché.
+        changes_page_size (int): Cambios máximos por respuesta del feed.
+        changes_stream_wait_seconds (float): Espera máxima del stream SSE entre
+            consultas (también intervalo de keep-alive).
+        write_batch_enabled (bool): Agrupa las mutaciones concurrentes en una
+            sola transacción (group commit).
+        write_batch_max_ops (int): Operaciones máximas por transacción agrupada.
+        write_batch_max_delay_ms (float): Espera máxima a más operaciones tras
+            la primera de un lote (ms).
+        shard_count (int): Shards entre los que se reparten los inquilinos
+            (`X-Tenant-ID`); 0 = sin sharding, todo en `database_url`.
+        shard_dir (str): Carpeta de los archivos de los shards.
+        archive_enabled (bool): Ejecuta el archivador de tareas eliminadas en
+            segundo plano (ver `archive.py`).
+        archive_after_days (int): Días desde el soft-delete para archivar.
+        archive_batch_size (int): Tareas archivadas o purgadas por transacción.
+        archive_interval_seconds (float): Segundos entre pasadas del archivador.
+        purge_after_days (int): Días desde el archivado para borrar
+            definitivamente (0 = nunca).
+        migrate_on_startup (bool): Aplica las migraciones pendientes al
+            arrancar en lugar de fallar (un único proceso, desarrollo).
+        metrics_enabled (bool): Registra latencias por ruta y tiempos SQL y
+            los expone en `GET /metrics` (ver `metrics.py`).
+        diagnostics_enabled (bool): Registra en JSON las sentencias lentas
+            y las peticiones con demasiadas sentencias (ver `diagnostics.py`).
+        diagnostics_slow_query_ms (float): Duración a partir de la cual una
+            sentencia se registra con su plan.
+        diagnostics_max_statements (int): Sentencias por petición a partir
+            de las cuales se registra la petición.
+        diagnostics_max_repeats (int): Repeticiones de una misma forma de
+            sentencia en una petición que se consideran N+1.
+    """
+    model_config = SettingsConfigDict(env_prefix="QUICKTASK_", env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite:///./tasks.db"
+    sqlite_journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"] = "WAL"
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    read_pool_size: int = 8
+    write_pool_timeout: float = 30.0
+    bulk_max_items: int = 1000
+    export_batch_size: int = 1000
+    import_chunk_size: int = 500
+    task_cache_enabled: bool = True
+    task_cache_max_entries: int = 10000
+    task_cache_ttl_seconds: float = 30.0
+    changes_page_size: int = 500
+    changes_stream_wait_seconds: float = 15.0
+    write_batch_enabled: bool = False
+    write_batch_max_ops: int = 256
+    write_batch_max_delay_ms: float = 5.0
+    shard_count: int = 0
+    shard_dir: str = "./shards"
+    archive_enabled: bool = True
+    archive_after_days: int = 30
+    archive_batch_size: int = 500
+    archive_interval_seconds: float = 3600.0
+    purge_after_days: int = 0
+    migrate_on_startup: bool = False
+    metrics_enabled: bool = True
+    diagnostics_enabled: bool = False
+    diagnostics_slow_query_ms: float = 100.0
+    diagnostics_max_statements: int = 10
+    diagnostics_max_repeats: int = 3
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Devuelve la configuración de la aplicación (se lee una sola vez).
+
+    Returns:
+        Settings: Configuración actual.
+    """
+    return Settings()
@@ -4,30 +4,398 @@ crud.py
 Funciones CRUD (Create, Read, Update, Delete) para gestionar tareas.
 """
 
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+from sqlalchemy import String, delete, false, func, insert, literal, null, select, text, tuple_, update
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from models import Task
-from schemas import TaskCreate, TaskUpdate
+from models import PRIORITY_RANK, Task, TaskArchive, ImportJob, SyncState, TaskCounter
+import search
+from schemas import TaskCreate, TaskUpdate, TaskBulkSelector
 
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100, status: str = None):
+class PreconditionFailed(Exception):
+    """La versión de la tarea no coincide con la esperada (`If-Match`)."""
+
+
+class ChangesPurged(Exception):
     """
-    Obtiene todas las tareas (no eliminadas).
+    El `since` del cliente es anterior a tombstones ya purgados del archivo:
+    el cliente debe resincronizar desde cero.
+    """
+
+    def __init__(self, purged_version: int):
+        super().__init__(f"Cambios purgados hasta la versión {purged_version}")
+        self.purged_version = purged_version
+
+
+# Columnas de una tarea en las lecturas por filas (exportación)
+EXPORT_COLUMNS = (
+    Task.id, Task.title, Task.description, Task.status, Task.priority,
+    Task.due_date, Task.created_at, Task.updated_at,
+)
+
+# Columnas de `TaskResponse` más la versión (ETag): las devuelven las
+# escrituras (RETURNING) y el listado
+RESPONSE_COLUMNS = (*EXPORT_COLUMNS, Task.version)
+
+
+# Rango de cada prioridad en el orden `sort=priority` (ver `models.PRIORITY_RANK`)
+PRIORITY_RANKS = {"high": 0, "medium": 1, "low": 2}
+
+# Tramos de cada orden del listado: (condición del tramo, clave de orden).
+# Dentro de un tramo las tareas se ordenan por (clave, id) o solo por id si
+# la clave es None; cada tramo recorre un índice (is_deleted, clave, id) sin
+# ordenar en memoria. Las tareas sin fecha van al final.
+SORT_PARTS = {
+    "id": ((None, None),),
+    "created_at": ((None, Task.created_at),),
+    "due_date": ((Task.due_date.isnot(None), Task.due_date), (Task.due_date.is_(None), None)),
+    "priority": tuple((PRIORITY_RANK == rank, None) for rank in sorted(PRIORITY_RANKS.values())),
+}
+
+@lru_cache(maxsize=None)
+def record_type(fields: tuple):
+    """
+    Devuelve el tipo de registro inmutable (namedtuple) para unas columnas.
+    
+    Args:
+        fields (tuple[str]): Nombres de las columnas, en orden.
+    
+    Returns:
+        type: Subclase de tuple con un atributo por columna y sin `__dict__`.
+    """
+    return namedtuple("TaskRecord", fields)
+
+
+def get_tasks(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    status: str = None,
+    after: tuple = None,
+    fields: tuple = None,
+    sort: str = "id",
+    due_after: date = None,
+    due_before: date = None,
+    overdue: bool = False,
+    today: date = None,
+):
+    """
+    Obtiene todas las tareas (no eliminadas), ordenadas por ID o por `sort`.
+    
+    Las filas se leen con una consulta Core y se devuelven como registros
+    inmutables (`record_type`): no pasan por el identity map ni por el
+    seguimiento de cambios de la sesión.
     
     Args:
         db (Session): Sesión de base de datos.
         skip (int): Número de registros a saltar (para paginación).
         limit (int): Número máximo de registros a retornar.
         status (str): Filtrar por estado ('pending' o 'completed').
+        after (tuple): (valor_de_orden, id) de la última tarea de la página
+            anterior (paginación por cursor; ver `sort_cursor`).
+        fields (tuple[str]): Columnas a leer, de `RESPONSE_COLUMNS` (None =
+            todas). `id`, `version` y la columna de `sort` se añaden siempre
+            al final si faltan (los necesitan el cursor y el ETag).
+        sort (str): Orden: 'id', 'due_date' (sin fecha al final),
+            'priority' (high primero) o 'created_at'; empates por ID.
+        due_after (date): Vencimiento desde esta fecha, inclusive.
+        due_before (date): Vencimiento hasta esta fecha, inclusive.
+        overdue (bool): Solo tareas pendientes con vencimiento anterior a hoy.
+        today (date): Fecha de referencia de `overdue` (por defecto, hoy).
+    
+    Returns:
+        list[TaskRecord]: Registros con las columnas pedidas, en ese orden.
+    """
+    if fields is None:
+        columns = RESPONSE_COLUMNS
+    else:
+        required = [name for name in dict.fromkeys(("id", "version", sort)) if name not in fields]
+        columns = tuple(Task.__table__.c[name] for name in (*fields, *required))
+    
+    stmt = select(*columns).where(Task.is_deleted == False)
+    if status:
+        stmt = stmt.where(Task.status == status)
+    if due_after:
+        stmt = stmt.where(Task.due_date >= due_after)
+    if due_before:
+        stmt = stmt.where(Task.due_date <= due_before)
+    if overdue:
+        stmt = stmt.where(Task.status == "pending", Task.due_date < (today or date.today()))
+    
+    record = record_type(tuple(column.key for column in columns))
+    rows = []
+    first_part, position = (after[0][0], after) if after is not None and sort != "id" else (0, after)
+    for part, (condition, key) in enumerate(SORT_PARTS[sort]):
+        if part < first_part:
+            continue
+        part_stmt = stmt if condition is None else stmt.where(condition)
+        page = part_stmt.order_by(*((key, Task.id) if key is not None else (Task.id,)))
+        if part == first_part and position is not None:
+            # Keyset: el índice (is_deleted, clave, id) permite saltar
+            # directamente a la posición del cursor sin recorrer filas previas.
+            value, last_id = position
+            if key is None:
+                page = page.where(Task.id > last_id)
+            else:
+                page = page.where(tuple_(key, Task.id) > tuple_(literal(value[1], String), literal(last_id)))
+        if skip:
+            page = page.offset(skip)
+        found = db.execute(page.limit(limit - len(rows))).tuples().all()
+        if skip:
+            # El offset sobrante pasa al tramo siguiente
+            skip = 0 if found else skip - db.scalar(select(func.count()).select_from(part_stmt.subquery()))
+        rows.extend(found)
+        if len(rows) == limit:
+            break
+    return list(map(record._make, rows))
+
+
+def sort_cursor(sort: str, task):
+    """
+    Valor de orden de una tarea para el cursor de la página siguiente.
+    
+    Args:
+        sort (str): Orden del listado.
+        task (TaskRecord): Última tarea de la página (con la columna de `sort`).
+    
+    Returns:
+        El ID (sort='id') o [tramo, clave] (ver `SORT_PARTS`), serializable
+        en JSON.
+    """
+    if sort == "id":
+        return task.id
+    if sort == "due_date":
+        return [0, task.due_date.isoformat()] if task.due_date is not None else [1, None]
+    if sort == "priority":
+        return [PRIORITY_RANKS.get(task.priority, 2), None]
+    return [0, str(task.created_at)]
+
+
+def check_sort_cursor(sort: str, value):
+    """
+    Comprueba que un valor de cursor corresponde a un tramo de `sort`.
+    
+    Raises:
+        ValueError: Si el valor está malformado.
+    """
+    if sort == "id":
+        return
+    parts = SORT_PARTS[sort]
+    valid = (
+        isinstance(value, list) and len(value) == 2
+        and isinstance(value[0], int) and 0 <= value[0] < len(parts)
+        and (value[1] is None) == (parts[value[0]][1] is None)
+        and (value[1] is None or isinstance(value[1], str))
+    )
+    if not valid:
+        raise ValueError("Cursor inválido")
+
+
+def select_task_rows(status: str = None, columns: tuple = EXPORT_COLUMNS):
+    """
+    Construye la consulta Core de todas las tareas (no eliminadas) por ID.
+    
+    Devuelve tuplas con `columns` en lugar de objetos ORM, así los
+    recorridos largos no llenan el identity map de la sesión.
+    
+    Args:
+        status (str): Filtrar por estado ('pending' o 'completed').
+        columns (tuple): Columnas seleccionadas (por defecto `EXPORT_COLUMNS`).
+    
+    Returns:
+        Select: Consulta lista para ejecutar (o transmitir con `stream`).
+    """
+    stmt = select(*columns).where(Task.is_deleted == False)
+    if status:
+        stmt = stmt.where(Task.status == status)
+    return stmt.order_by(Task.id)
+
+
+def search_tasks(db: Session, q: str, skip: int = 0, limit: int = 20, status: str = None):
+    """
+    Busca tareas (no eliminadas) por palabras en el título o la descripción.
+    
+    Usa el índice FTS5 `tasks_fts`; los resultados se ordenan por relevancia
+    (bm25, el título pesa más que la descripción) y después por ID.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        q (str): Texto de búsqueda (todas las palabras deben aparecer).
+        skip (int): Número de resultados a saltar.
+        limit (int): Número máximo de resultados.
+        status (str): Filtrar por estado ('pending' o 'completed').
     
     Returns:
-        list[Task]: Lista de tareas encontradas.
+        list[Row]: Filas (Task, rank, snippet); vacía si `q` no tiene palabras.
     """
-    query = db.query(Task).filter(Task.is_deleted == False)
+    match_query = search.build_match_query(q)
+    if not match_query:
+        return []
     
+    rank = search.rank_column().label("rank")
+    stmt = (
+        select(Task, rank, search.snippet_column().label("snippet"))
+        .join(search.tasks_fts, search.tasks_fts.c.rowid == Task.id)
+        .where(search.match_condition(match_query), Task.is_deleted == False)
+    )
     if status:
-        query = query.filter(Task.status == status)
+        stmt = stmt.where(Task.status == status)
+    stmt = stmt.order_by(rank, Task.id).offset(skip).limit(limit)
+    return db.execute(stmt).all()
+
+
+def get_changes(db: Session, since: int = 0, limit: int = 500):
+    """
+    Obtiene las tareas modificadas después de una versión de cambio.
+    
+    Incluye las tareas eliminadas (soft-delete), también las ya archivadas en
+    `tasks_archive`, que el feed entrega como tombstones.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        since (int): Última versión de cambio conocida por el cliente.
+        limit (int): Número máximo de cambios.
+    
+    Returns:
+        list[TaskRecord]: Registros con change_version, is_deleted y
+            `EXPORT_COLUMNS`, ordenados por versión de cambio.
+    
+    Raises:
+        ChangesPurged: Si `since` (distinto de 0) es anterior a la última
+            versión purgada del archivo.
+    """
+    if since:
+        purged = db.scalar(select(SyncState.purged_version).where(SyncState.id == 1))
+        if purged and since < purged:
+            raise ChangesPurged(purged)
     
-    return query.offset(skip).limit(limit).all()
+    columns = (Task.change_version, Task.is_deleted, *EXPORT_COLUMNS)
+    record = record_type(tuple(column.key for column in columns))
+    rows = []
+    # Dos consultas por índice (change_version) en vez de un UNION: cada una
+    # pasa por el filtro de inquilino del ORM
+    for model in (Task, TaskArchive):
+        stmt = (
+            select(*(getattr(model, column.key) for column in columns))
+            .where(model.change_version > since)
+            .order_by(model.change_version)
+            .limit(limit)
+        )
+        rows.extend(db.execute(stmt).tuples())
+    rows.sort(key=lambda row: row[0])
+    return list(map(record._make, rows[:limit]))
+
+
+def get_recent_tasks(db: Session, limit: int = 100, status: str = None, tenant_id: str = None):
+    """
+    Obtiene las tareas (no eliminadas) modificadas más recientemente, de
+    cualquier inquilino (listados de administración sobre todos los shards).
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        limit (int): Número máximo de tareas.
+        status (str): Filtrar por estado (opcional).
+        tenant_id (str): Filtrar por inquilino (opcional).
+    
+    Returns:
+        list[Row]: Filas con tenant_id y `EXPORT_COLUMNS`, de la más reciente
+            a la más antigua.
+    """
+    stmt = select(Task.tenant_id, *EXPORT_COLUMNS).where(Task.is_deleted == False)
+    if status:
+        stmt = stmt.where(Task.status == status)
+    if tenant_id:
+        stmt = stmt.where(Task.tenant_id == tenant_id)
+    stmt = stmt.order_by(Task.updated_at.desc(), Task.id.desc()).limit(limit)
+    return db.execute(stmt).all()
+
+
+def get_storage_summary(db: Session):
+    """
+    Cuenta las tareas (incluidas las eliminadas) y los inquilinos de una base.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+    
+    Returns:
+        dict: tasks y tenants.
+    """
+    tasks, tenants = db.execute(select(func.count(), func.count(Task.tenant_id.distinct()))).one()
+    return {"tasks": tasks, "tenants": tenants}
+
+
+def get_table_sizes(db: Session):
+    """
+    Mide el espacio de cada tabla e índice de una base de datos (tabla
+    virtual `dbstat`) y cuenta las filas de la tabla caliente y del archivo.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+    
+    Returns:
+        dict: page_size, freelist_pages, tasks (live/deleted), archived y
+            objects (name, table, type, pages, size_bytes; vacío si SQLite se
+            compiló sin `dbstat`).
+    """
+    page_size = db.execute(text("PRAGMA page_size")).scalar()
+    freelist = db.execute(text("PRAGMA freelist_count")).scalar()
+    live, deleted = db.execute(
+        select(
+            func.count().filter(Task.is_deleted == False),
+            func.count().filter(Task.is_deleted == True),
+        )
+    ).one()
+    archived = db.scalar(select(func.count()).select_from(TaskArchive))
+    try:
+        objects = db.execute(text(
+            "SELECT s.name, m.tbl_name AS \"table\", m.type, COUNT(*) AS pages, SUM(s.pgsize) AS size_bytes "
+            "FROM dbstat AS s JOIN sqlite_schema AS m ON m.name = s.name "
+            "GROUP BY s.name ORDER BY size_bytes DESC"
+        )).mappings().all()
+    except OperationalError:
+        objects = []
+    return {
+        "page_size": page_size,
+        "freelist_pages": freelist,
+        "tasks": {"live": live, "deleted": deleted},
+        "archived": archived,
+        "objects": [dict(row) for row in objects],
+    }
+
+
+def get_task_stats(db: Session, today: date = None):
+    """
+    Calcula las estadísticas de las tareas (no eliminadas) desde `task_counters`.
+    
+    El coste depende del número de grupos (estado, prioridad, fecha de
+    vencimiento) y no del número de tareas.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        today (date): Fecha de referencia para "vencida" (por defecto, hoy).
+    
+    Returns:
+        dict: total, by_status, by_priority y overdue (pendientes cuya fecha
+            de vencimiento es anterior a hoy).
+    """
+    today = (today or date.today()).isoformat()
+    stats = {
+        "total": 0,
+        "by_status": {"pending": 0, "completed": 0},
+        "by_priority": {"low": 0, "medium": 0, "high": 0},
+        "overdue": 0,
+    }
+    counters = select(TaskCounter.status, TaskCounter.priority, TaskCounter.due_date, TaskCounter.count)
+    for status, priority, due_date, count in db.execute(counters.where(TaskCounter.count != 0)):
+        stats["total"] += count
+        stats["by_status"][status] = stats["by_status"].get(status, 0) + count
+        stats["by_priority"][priority] = stats["by_priority"].get(priority, 0) + count
+        if status == "pending" and due_date and due_date < today:
+            stats["overdue"] += count
+    return stats
 
 
 def get_task(db: Session, task_id: int):
@@ -48,88 +416,365 @@ def create_task(db: Session, task: TaskCreate):
     """
     Crea una nueva tarea en la base de datos.
     
+    Un único INSERT ... RETURNING devuelve la fila completa (incluidos los
+    valores por defecto del servidor), sin un SELECT posterior.
+    
     Args:
         db (Session): Sesión de base de datos.
         task (TaskCreate): Datos de la tarea a crear.
     
     Returns:
-        Task: Objeto de la tarea creada.
+        Row: Fila de la tarea creada (`RESPONSE_COLUMNS`).
+    """
+    stmt = insert(Task).values(**_task_rows([task])[0]).returning(*RESPONSE_COLUMNS)
+    row = db.execute(stmt).one()
+    db.commit()
+    return row
+
+
+def create_tasks(db: Session, tasks: list[TaskCreate]):
+    """
+    Crea varias tareas en una sola transacción.
+    
+    Se emite un único INSERT con múltiples filas (executemany) y RETURNING,
+    en lugar de un `add` + `commit` + `refresh` por tarea.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        tasks (list[TaskCreate]): Tareas ya validadas.
+    
+    Returns:
+        list[int]: IDs de las tareas creadas, en el mismo orden recibido.
+    """
+    if not tasks:
+        return []
+    
+    stmt = insert(Task).returning(Task.id, sort_by_parameter_order=True)
+    ids = list(db.scalars(stmt, _task_rows(tasks)))
+    db.commit()
+    return ids
+
+
+def _task_rows(tasks: list[TaskCreate]):
+    """Convierte tareas validadas en diccionarios de columnas para INSERT."""
+    return [
+        {
+            "title": task.title,
+            "description": task.description,
+            "priority": task.priority,
+            "due_date": task.due_date,
+            "status": "pending",
+        }
+        for task in tasks
+    ]
+
+
+def import_tasks_chunk(
+    db: Session,
+    tasks: list[TaskCreate],
+    import_id: str = None,
+    lines_committed: int = 0,
+    failed: int = 0,
+    completed: bool = False,
+):
     """
-    db_task = Task(
-        title=task.title,
-        description=task.description,
-        priority=task.priority,
-        due_date=task.due_date,
-        status="pending"
+    Inserta un bloque de una importación y registra el progreso en la misma
+    transacción.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        tasks (list[TaskCreate]): Tareas válidas del bloque.
+        import_id (str): Identificador de la importación (None = sin registro).
+        lines_committed (int): Líneas del archivo procesadas tras este bloque.
+        failed (int): Líneas rechazadas en este bloque.
+        completed (bool): True si es el último bloque del archivo.
+    
+    Returns:
+        int: Número de tareas insertadas.
+    """
+    if tasks:
+        db.execute(insert(Task), _task_rows(tasks))
+    
+    if import_id is not None:
+        job = db.get(ImportJob, import_id)
+        if job is None:
+            job = ImportJob(id=import_id, imported=0, failed=0)
+            db.add(job)
+        job.lines_committed = lines_committed
+        job.imported += len(tasks)
+        job.failed += failed
+        job.status = "completed" if completed else "running"
+    
+    db.commit()
+    return len(tasks)
+
+
+def get_import_job(db: Session, import_id: str):
+    """
+    Obtiene el progreso de una importación.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        import_id (str): Identificador de la importación.
+    
+    Returns:
+        ImportJob: Progreso registrado o None si no existe.
+    """
+    return db.get(ImportJob, import_id)
+
+
+def _update_returning(db: Session, conditions: list, values: dict):
+    """
+    Ejecuta un UPDATE ... RETURNING sobre una tarea y confirma la transacción.
+    
+    Las sentencias UPDATE no pasan por el `version_id_col` del ORM, así que la
+    versión se incrementa explícitamente.
+    
+    Returns:
+        Row: Fila actualizada (`RESPONSE_COLUMNS`) o None si ninguna cumple
+            las condiciones.
+    """
+    stmt = (
+        update(Task)
+        .where(*conditions)
+        .values(**values, version=Task.version + 1)
+        .returning(*RESPONSE_COLUMNS)
+        .execution_options(synchronize_session=False)
     )
-    db.add(db_task)
+    row = db.execute(stmt).one_or_none()
     db.commit()
-    db.refresh(db_task)
-    return db_task
+    return row
+
+
+def _version_conditions(task_id: int, expected_versions):
+    """Condiciones WHERE de una tarea no eliminada en alguna de las versiones esperadas."""
+    conditions = [Task.id == task_id, Task.is_deleted == False]
+    if expected_versions is not None:
+        conditions.append(Task.version.in_(expected_versions))
+    return conditions
+
+
+def _raise_if_exists(db: Session, task_id: int):
+    """
+    Tras una escritura condicional sin filas afectadas, distingue entre tarea
+    inexistente (no hace nada) y versión distinta (PreconditionFailed).
+    """
+    db_task = get_task(db, task_id)
+    if db_task is not None:
+        raise PreconditionFailed(f"La tarea {task_id} está en la versión {db_task.version}")
 
 
-def update_task(db: Session, task_id: int, task_update: TaskUpdate):
+def update_task(db: Session, task_id: int, task_update: TaskUpdate, expected_versions: set = None):
     """
     Actualiza una tarea existente.
     
+    La comprobación de existencia, la de versión y la escritura se hacen en
+    un único UPDATE ... RETURNING.
+    
     Args:
         db (Session): Sesión de base de datos.
         task_id (int): ID de la tarea a actualizar.
         task_update (TaskUpdate): Datos a actualizar.
+        expected_versions (set[int]): Versiones aceptadas (`If-Match`); None
+            para no comprobar.
     
     Returns:
-        Task: Objeto de la tarea actualizada o None si no existe.
-    """
-    db_task = get_task(db, task_id)
-    if not db_task:
-        return None
+        Row: Fila de la tarea actualizada o None si no existe.
     
+    Raises:
+        PreconditionFailed: Si la tarea cambió desde la versión esperada.
+    """
     # Actualizar solo los campos que fueron proporcionados
     update_data = task_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(db_task, field, value)
+    if not update_data:
+        db_task = get_task(db, task_id)
+        if db_task is not None and expected_versions is not None and db_task.version not in expected_versions:
+            raise PreconditionFailed(f"La tarea {task_id} está en la versión {db_task.version}")
+        return db_task
     
-    db.commit()
-    db.refresh(db_task)
-    return db_task
+    row = _update_returning(db, _version_conditions(task_id, expected_versions), update_data)
+    if row is None and expected_versions is not None:
+        _raise_if_exists(db, task_id)
+    return row
 
 
-def delete_task(db: Session, task_id: int):
+def delete_task(db: Session, task_id: int, expected_versions: set = None):
     """
-    Elimina (soft-delete) una tarea existente.
+    Elimina (soft-delete) una tarea existente con un único UPDATE.
     
     Args:
         db (Session): Sesión de base de datos.
         task_id (int): ID de la tarea a eliminar.
+        expected_versions (set[int]): Versiones aceptadas (`If-Match`); None
+            para no comprobar.
     
     Returns:
         bool: True si la tarea fue eliminada, False si no existe.
-    """
-    db_task = get_task(db, task_id)
-    if not db_task:
-        return False
     
-    db_task.is_deleted = True
-    db.commit()
-    return True
+    Raises:
+        PreconditionFailed: Si la tarea cambió desde la versión esperada.
+    """
+    values = {"is_deleted": True, "deleted_at": func.now()}
+    row = _update_returning(db, _version_conditions(task_id, expected_versions), values)
+    if row is None and expected_versions is not None:
+        _raise_if_exists(db, task_id)
+    return row is not None
 
 
 def restore_task(db: Session, task_id: int):
     """
-    Restaura una tarea eliminada (soft-delete).
+    Restaura una tarea eliminada (soft-delete) con un único UPDATE ... RETURNING.
+    
+    Si la tarea ya no está en `tasks` la busca en el archivo y la devuelve a
+    la tabla caliente con el mismo ID.
     
     Args:
         db (Session): Sesión de base de datos.
         task_id (int): ID de la tarea a restaurar.
     
     Returns:
-        Task: Objeto de la tarea restaurada o None si no existe.
+        Row: Fila de la tarea restaurada o None si no existe.
     """
-    db_task = db.query(Task).filter(Task.id == task_id).first()
-    if not db_task:
-        return None
+    row = _update_returning(db, [Task.id == task_id], {"is_deleted": False, "deleted_at": None})
+    if row is None and _unarchive(db, [TaskArchive.id == task_id]):
+        row = db.execute(select(*RESPONSE_COLUMNS).where(Task.id == task_id)).one()
+        db.commit()
+    return row
+
+
+# Columnas que se copian al devolver una tarea del archivo (change_version
+# la asigna el trigger de inserción)
+_UNARCHIVE_COLUMNS = (
+    "id", "title", "description", "status", "priority", "due_date",
+    "created_at", "tenant_id", "is_deleted", "deleted_at", "updated_at", "version",
+)
+
+
+def _unarchive(db: Session, conditions: list, chunk_size: int = 500):
+    """
+    Devuelve a `tasks` (restauradas) las tareas archivadas que cumplen las
+    condiciones, sin confirmar la transacción.
+    
+    Los IDs se seleccionan primero con una consulta ORM (filtro de
+    inquilino); la copia y el borrado van por lotes de IDs.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        conditions (list): Condiciones de SQLAlchemy sobre `TaskArchive`.
+        chunk_size (int): IDs por sentencia.
+    
+    Returns:
+        int: Número de tareas restauradas.
+    """
+    ids = db.scalars(select(TaskArchive.id).where(*conditions)).all()
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        source = select(
+            *(getattr(TaskArchive, name) for name in _UNARCHIVE_COLUMNS[:-4]),
+            false(), null(), func.now(), TaskArchive.version + 1,
+        ).where(TaskArchive.id.in_(chunk))
+        db.execute(insert(Task.__table__).from_select(_UNARCHIVE_COLUMNS, source))
+        db.execute(
+            delete(TaskArchive).where(TaskArchive.id.in_(chunk)).execution_options(synchronize_session=False)
+        )
+    return len(ids)
+
+
+def _selector_conditions(selector: TaskBulkSelector, model=Task):
+    """
+    Traduce una selección masiva (IDs o filtro) a condiciones WHERE.
     
-    db_task.is_deleted = False
+    Args:
+        selector (TaskBulkSelector): Selección recibida en la petición.
+        model: Modelo sobre el que se aplican (`Task` o `TaskArchive`).
+    
+    Returns:
+        list: Condiciones de SQLAlchemy sobre `model`.
+    """
+    if selector.ids is not None:
+        return [model.id.in_(selector.ids)]
+    
+    criteria = selector.filter
+    conditions = []
+    if criteria.status:
+        conditions.append(model.status == criteria.status)
+    if criteria.priority:
+        conditions.append(model.priority == criteria.priority)
+    if criteria.due_after:
+        conditions.append(model.due_date >= criteria.due_after)
+    if criteria.due_before:
+        conditions.append(model.due_date <= criteria.due_before)
+    return conditions
+
+
+def _bulk_set(db: Session, conditions: list, values: dict):
+    """
+    Ejecuta un único UPDATE ... WHERE y confirma la transacción.
+    
+    Las sentencias Core no pasan por el `version_id_col` del ORM, así que la
+    versión de cada fila se incrementa explícitamente.
+    
+    Returns:
+        int: Número de filas afectadas.
+    """
+    stmt = (
+        update(Task)
+        .where(*conditions)
+        .values(**values, version=Task.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    affected = db.execute(stmt).rowcount
     db.commit()
-    db.refresh(db_task)
-    return db_task
+    return affected
+
+
+def update_tasks(db: Session, selector: TaskBulkSelector, task_update: TaskUpdate):
+    """
+    Actualiza varias tareas (no eliminadas) con una sola sentencia.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        selector (TaskBulkSelector): IDs o filtro de las tareas a actualizar.
+        task_update (TaskUpdate): Campos a actualizar.
+    
+    Returns:
+        int: Número de tareas actualizadas.
+    """
+    update_data = task_update.model_dump(exclude_unset=True)
+    if not update_data:
+        return 0
+    
+    conditions = [Task.is_deleted == False, *_selector_conditions(selector)]
+    return _bulk_set(db, conditions, update_data)
+
+
+def delete_tasks(db: Session, selector: TaskBulkSelector):
+    """
+    Elimina (soft-delete) varias tareas con una sola sentencia.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        selector (TaskBulkSelector): IDs o filtro de las tareas a eliminar.
+    
+    Returns:
+        int: Número de tareas eliminadas.
+    """
+    conditions = [Task.is_deleted == False, *_selector_conditions(selector)]
+    return _bulk_set(db, conditions, {"is_deleted": True, "deleted_at": func.now()})
+
+
+def restore_tasks(db: Session, selector: TaskBulkSelector):
+    """
+    Restaura varias tareas eliminadas (soft-delete) con una sola sentencia,
+    incluidas las que ya estén en el archivo.
+    
+    Args:
+        db (Session): Sesión de base de datos.
+        selector (TaskBulkSelector): IDs o filtro de las tareas a restaurar.
+    
+    Returns:
+        int: Número de tareas restauradas.
+    """
+    unarchived = _unarchive(db, _selector_conditions(selector, TaskArchive))
+    conditions = [Task.is_deleted == True, *_selector_conditions(selector)]
+    return unarchived + _bulk_set(db, conditions, {"is_deleted": False, "deleted_at": None})
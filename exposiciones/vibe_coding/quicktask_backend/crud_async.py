@@ -0,0 +1,229 @@
+"""
+crud_async.py
+
+Versiones asíncronas de las funciones CRUD de `crud.py`.
+
+Cada función ejecuta la implementación síncrona de `crud.py` mediante
+`AsyncSession.run_sync`: SQLAlchemy la corre dentro de un greenlet y las
+operaciones de E/S se esperan sobre el driver asíncrono (aiosqlite), de modo
+que la lógica de acceso a datos vive en un único lugar.
+
+Si `write_batcher` está asignado (`QUICKTASK_WRITE_BATCH_ENABLED`), las
+mutaciones no usan la sesión recibida: se encolan en el agrupador de
+escrituras, que confirma varias en una sola transacción (ver `batcher.py`).
+"""
+
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from schemas import TaskCreate, TaskUpdate, TaskBulkSelector
+import crud
+import database
+
+# Agrupador de escrituras (`batcher.WriteBatcher`); main.py lo asigna si está
+# activado. Con sharding cada shard tiene el suyo.
+write_batcher = None
+
+
+async def _run_write(db: AsyncSession, fn, *args, **kwargs):
+    """
+    Ejecuta una mutación de `crud.py` en la sesión o a través del agrupador.
+
+    Con sharding la ejecuta el enrutador en el shard actual del inquilino
+    (ver `shards.ShardRouter.write`), no en la sesión recibida.
+    """
+    if database.shard_router is not None:
+        return await database.shard_router.write(fn, *args, **kwargs)
+    if write_batcher is not None:
+        return await write_batcher.submit(fn, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
+
+
+async def get_tasks(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: str = None,
+    after: tuple = None,
+    fields: tuple = None,
+    sort: str = "id",
+    due_after: date = None,
+    due_before: date = None,
+    overdue: bool = False,
+):
+    """
+    Obtiene todas las tareas (no eliminadas). Ver `crud.get_tasks`.
+
+    Returns:
+        list[TaskRecord]: Registros inmutables con las columnas pedidas.
+    """
+    return await db.run_sync(
+        crud.get_tasks, skip=skip, limit=limit, status=status, after=after, fields=fields,
+        sort=sort, due_after=due_after, due_before=due_before, overdue=overdue,
+    )
+
+
+async def stream_task_rows(db: AsyncSession, status: str = None, batch_size: int = 1000):
+    """
+    Recorre todas las tareas (no eliminadas) con un cursor del lado servidor.
+
+    Las filas se leen de `batch_size` en `batch_size` (`yield_per`), por lo
+    que la memoria no crece con el tamaño de la tabla.
+
+    Yields:
+        list[Row]: Lotes de filas con las columnas de `crud.EXPORT_COLUMNS`.
+    """
+    stmt = crud.select_task_rows(status=status).execution_options(yield_per=batch_size)
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield partition
+
+
+async def search_tasks(db: AsyncSession, q: str, skip: int = 0, limit: int = 20, status: str = None):
+    """
+    Busca tareas por texto completo. Ver `crud.search_tasks`.
+
+    Returns:
+        list[Row]: Filas (Task, rank, snippet).
+    """
+    return await db.run_sync(crud.search_tasks, q, skip=skip, limit=limit, status=status)
+
+
+async def get_changes(db: AsyncSession, since: int = 0, limit: int = 500):
+    """
+    Obtiene las tareas modificadas después de una versión. Ver `crud.get_changes`.
+
+    Returns:
+        list[TaskRecord]: Cambios ordenados por versión de cambio.
+    """
+    return await db.run_sync(crud.get_changes, since=since, limit=limit)
+
+
+async def get_task_stats(db: AsyncSession):
+    """
+    Calcula las estadísticas desde los contadores. Ver `crud.get_task_stats`.
+
+    Returns:
+        dict: total, by_status, by_priority y overdue.
+    """
+    return await db.run_sync(crud.get_task_stats)
+
+
+async def get_task(db: AsyncSession, task_id: int):
+    """
+    Obtiene una tarea específica por su ID. Ver `crud.get_task`.
+
+    Returns:
+        Task: Objeto de tarea o None si no existe.
+    """
+    return await db.run_sync(crud.get_task, task_id)
+
+
+async def create_task(db: AsyncSession, task: TaskCreate):
+    """
+    Crea una nueva tarea en la base de datos. Ver `crud.create_task`.
+
+    Returns:
+        Row: Fila de la tarea creada (`crud.RESPONSE_COLUMNS`).
+    """
+    return await _run_write(db, crud.create_task, task)
+
+
+async def create_tasks(db: AsyncSession, tasks: list[TaskCreate]):
+    """
+    Crea varias tareas en una sola transacción. Ver `crud.create_tasks`.
+
+    Returns:
+        list[int]: IDs de las tareas creadas, en el mismo orden recibido.
+    """
+    return await _run_write(db, crud.create_tasks, tasks)
+
+
+async def import_tasks_chunk(
+    db: AsyncSession,
+    tasks: list[TaskCreate],
+    import_id: str = None,
+    lines_committed: int = 0,
+    failed: int = 0,
+    completed: bool = False,
+):
+    """
+    Inserta un bloque de importación y su progreso. Ver `crud.import_tasks_chunk`.
+
+    Returns:
+        int: Número de tareas insertadas.
+    """
+    chunk = {"import_id": import_id, "lines_committed": lines_committed, "failed": failed, "completed": completed}
+    if database.shard_router is not None:
+        # Un bloque es ya su propia transacción: sin agrupador
+        return await database.shard_router.write(crud.import_tasks_chunk, tasks, batched=False, **chunk)
+    return await db.run_sync(crud.import_tasks_chunk, tasks, **chunk)
+
+
+async def get_import_job(db: AsyncSession, import_id: str):
+    """
+    Obtiene el progreso de una importación. Ver `crud.get_import_job`.
+
+    Returns:
+        ImportJob: Progreso registrado o None si no existe.
+    """
+    return await db.run_sync(crud.get_import_job, import_id)
+
+
+async def update_task(db: AsyncSession, task_id: int, task_update: TaskUpdate, expected_versions: set = None):
+    """
+    Actualiza una tarea existente. Ver `crud.update_task`.
+
+    Returns:
+        Row: Fila de la tarea actualizada o None si no existe.
+    """
+    return await _run_write(db, crud.update_task, task_id, task_update, expected_versions=expected_versions)
+
+
+async def delete_task(db: AsyncSession, task_id: int, expected_versions: set = None):
+    """
+    Elimina (soft-delete) una tarea existente. Ver `crud.delete_task`.
+
+    Returns:
+        bool: True si la tarea fue eliminada, False si no existe.
+    """
+    return await _run_write(db, crud.delete_task, task_id, expected_versions=expected_versions)
+
+
+async def restore_task(db: AsyncSession, task_id: int):
+    """
+    Restaura una tarea eliminada (soft-delete). Ver `crud.restore_task`.
+
+    Returns:
+        Row: Fila de la tarea restaurada o None si no existe.
+    """
+    return await _run_write(db, crud.restore_task, task_id)
+
+
+async def update_tasks(db: AsyncSession, selector: TaskBulkSelector, task_update: TaskUpdate):
+    """
+    Actualiza varias tareas con una sola sentencia. Ver `crud.update_tasks`.
+
+    Returns:
+        int: Número de tareas actualizadas.
+    """
+    return await _run_write(db, crud.update_tasks, selector, task_update)
+
+
+async def delete_tasks(db: AsyncSession, selector: TaskBulkSelector):
+    """
+    Elimina (soft-delete) varias tareas. Ver `crud.delete_tasks`.
+
+    Returns:
+        int: Número de tareas eliminadas.
+    """
+    return await _run_write(db, crud.delete_tasks, selector)
+
+
+async def restore_tasks(db: AsyncSession, selector: TaskBulkSelector):
+    """
+    Restaura varias tareas eliminadas. Ver `crud.restore_tasks`.
+
+    Returns:
+        int: Número de tareas restauradas.
+    """
+    return await _run_write(db, crud.restore_tasks, selector)
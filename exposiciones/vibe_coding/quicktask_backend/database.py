@@ -1,28 +1,187 @@
 """
 database.py
 
-Configuración de la conexión a SQLite y creación del engine de SQLAlchemy.
+Configuración de la conexión a SQLite y creación de los engines de SQLAlchemy.
+
+La URL y los parámetros de SQLite se leen de `config.Settings` (variables de
+entorno `QUICKTASK_*`). Sobre la misma base de datos se exponen:
+- Síncrono (`engine`, `SessionLocal`, `get_db`): scripts, pruebas y
+  creación del esquema.
+- Asíncrono de escritura (`async_write_engine`, `get_write_db`): un único
+  escritor; las mutaciones esperan su turno en el pool en lugar de chocar
+  con el bloqueo de SQLite ("database is locked").
+- Asíncrono de lectura (`async_read_engine`, `get_read_db`): pool de
+  conexiones `query_only` para los GET. Con WAL no bloquean al escritor.
+
+Con sharding (`shards.py`) cada shard tiene sus propios engines, creados con
+`create_engines`; `get_write_db`/`get_read_db` eligen el del inquilino actual.
+
+Con `metrics_enabled`, los engines registran el tiempo de cada sentencia y la
+espera por el pool (ver `metrics.py`); con `diagnostics_enabled`, las
+sentencias lentas y las peticiones con demasiadas sentencias (ver
+`diagnostics.py`).
 """
 
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from config import get_settings
+import diagnostics
+import metrics
+
+settings = get_settings()
+
+# Inquilino de la petición en curso (lo fija `shards.TenantMiddleware`).
+# Sin sharding siempre es el inquilino por defecto.
+DEFAULT_TENANT = "default"
+current_tenant = ContextVar("current_tenant", default=DEFAULT_TENANT)
 
 # Ruta a la base de datos SQLite
-DATABASE_URL = "sqlite:///./tasks.db"
+DATABASE_URL = settings.database_url
+
+
+def apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    """
+    Aplica el perfil de almacenamiento a una conexión SQLite recién abierta.
+
+    Args:
+        dbapi_connection: Conexión DBAPI (sqlite3 o adaptador aiosqlite).
+        read_only (bool): Si es True, la conexión se marca `query_only` y no
+            cambia el modo de journal (persistente, lo fija el escritor).
+    """
+    cursor = dbapi_connection.cursor()
+    # busy_timeout primero: cambiar el journal puede requerir esperar un bloqueo
+    cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout_ms)}")
+    if not read_only:
+        cursor.execute(f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous = {settings.sqlite_synchronous}")
+    # Valor negativo = tamaño en KiB en lugar de número de páginas
+    cursor.execute(f"PRAGMA cache_size = -{int(settings.sqlite_cache_size_kib)}")
+    cursor.execute(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+    if read_only:
+        cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+def _on_connect_write(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection)
+
+
+def _on_connect_read(dbapi_connection, connection_record):
+    apply_sqlite_pragmas(dbapi_connection, read_only=True)
+
+
+def _async_url(database_url: str) -> str:
+    """URL equivalente para el driver asíncrono aiosqlite."""
+    return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+def create_engines(database_url: str):
+    """
+    Crea el engine síncrono y los engines asíncronos de escritura y lectura
+    para un archivo SQLite, con el perfil de almacenamiento de `settings`.
+    
+    Args:
+        database_url (str): URL síncrona de SQLAlchemy (`sqlite:///...`).
+    
+    Returns:
+        tuple: (engine, async_write_engine, async_read_engine).
+    """
+    sync_engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},  # Necesario para SQLite
+    )
+    event.listen(sync_engine, "connect", _on_connect_write)
+    # Pool que mide la espera por una conexión (etiqueta: pool_logging_name)
+    poolclass = metrics.TimedPool if settings.metrics_enabled else AsyncAdaptedQueuePool
+
+    # Engines asíncronos (driver aiosqlite). Para archivos SQLite el dialecto
+    # usa NullPool por defecto (una conexión y un hilo nuevos por petición),
+    # por eso se fijan pools explícitos. SQLite admite un solo escritor a la
+    # vez: el pool de escritura tiene una única conexión.
+    write_engine = create_async_engine(
+        _async_url(database_url),
+        poolclass=poolclass,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.write_pool_timeout,
+        pool_logging_name="write",
+    )
+    event.listen(write_engine.sync_engine, "connect", _on_connect_write)
+
+    read_engine = create_async_engine(
+        _async_url(database_url),
+        poolclass=poolclass,
+        pool_size=settings.read_pool_size,
+        max_overflow=0,
+        pool_logging_name="read",
+    )
+    event.listen(read_engine.sync_engine, "connect", _on_connect_read)
+
+    instrumented_engines = (("sync", sync_engine), ("write", write_engine.sync_engine), ("read", read_engine.sync_engine))
+    for name, instrumented in instrumented_engines:
+        if settings.metrics_enabled:
+            metrics.instrument_engine(instrumented, name)
+        if settings.diagnostics_enabled:
+            diagnostics.instrument_engine(instrumented, name)
+    return sync_engine, write_engine, read_engine
+
+
+def create_sessionmakers(write_engine, read_engine):
+    """
+    Crea las fábricas de sesiones asíncronas de escritura y lectura.
+    
+    expire_on_commit=False evita recargas implícitas de atributos fuera del
+    contexto async tras el commit.
+    
+    Returns:
+        tuple: (AsyncWriteSession, AsyncReadSession).
+    """
+    return (
+        async_sessionmaker(write_engine, autoflush=False, expire_on_commit=False),
+        async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False),
+    )
+
 
-# Crear el engine de SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Necesario para SQLite
-)
+# Engines de la base de datos principal
+engine, async_write_engine, async_read_engine = create_engines(DATABASE_URL)
 
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncWriteSessionLocal, AsyncReadSessionLocal = create_sessionmakers(async_write_engine, async_read_engine)
+
+# Enrutador de shards (`shards.ShardRouter`); main.py lo asigna si el sharding
+# está activado. Sin él, todas las sesiones usan la base de datos principal.
+shard_router = None
 
 # Base para los modelos ORM
 Base = declarative_base()
 
 
+def add_missing_columns(table, bind=None):
+    """
+    Añade a una tabla existente las columnas nuevas del modelo.
+    
+    `create_all` no modifica tablas que ya existen; las columnas agregadas
+    después deben ser anulables o tener `server_default` para poder añadirse
+    con ALTER TABLE.
+    
+    Args:
+        table (Table): Tabla del modelo (`Model.__table__`).
+        bind (Engine): Engine síncrono (por defecto, el de la base principal).
+    """
+    bind = bind if bind is not None else engine
+    existing = {column["name"] for column in inspect(bind).get_columns(table.name)}
+    with bind.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+
+
 def get_db():
     """
     Dependencia para inyectar la sesión de base de datos en las rutas.
@@ -35,3 +194,50 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def write_sessionmaker():
+    """
+    Fábrica de sesiones de escritura del inquilino actual.
+    
+    Returns:
+        async_sessionmaker: La de su shard o, sin sharding, la principal.
+    """
+    if shard_router is None:
+        return AsyncWriteSessionLocal
+    return (await shard_router.current()).AsyncWriteSession
+
+
+async def read_sessionmaker():
+    """
+    Fábrica de sesiones de lectura del inquilino actual.
+    
+    Returns:
+        async_sessionmaker: La de su shard o, sin sharding, la principal.
+    """
+    if shard_router is None:
+        return AsyncReadSessionLocal
+    return (await shard_router.current()).AsyncReadSession
+
+
+async def get_write_db():
+    """
+    Dependencia asíncrona para las rutas que modifican datos.
+    
+    Yields:
+        AsyncSession: Sesión sobre el pool del escritor único (del shard del
+            inquilino si hay sharding).
+    """
+    async with (await write_sessionmaker())() as db:
+        yield db
+
+
+async def get_read_db():
+    """
+    Dependencia asíncrona para las rutas de solo lectura.
+    
+    Yields:
+        AsyncSession: Sesión sobre el pool de lectura (`query_only`).
+    """
+    async with (await read_sessionmaker())() as db:
+        yield db
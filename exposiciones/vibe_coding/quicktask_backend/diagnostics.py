@@ -0,0 +1,185 @@
+"""
+diagnostics.py
+
+Modo de diagnóstico de consultas (opcional, `QUICKTASK_DIAGNOSTICS_ENABLED`).
+
+Escribe líneas JSON en el logger `quicktask.diagnostics` (por defecto, a
+stderr) para agregarlas después (`jq`, el colector de logs):
+
+- `slow_query`: una sentencia que tardó más de
+  `QUICKTASK_DIAGNOSTICS_SLOW_QUERY_MS`, con su `EXPLAIN QUERY PLAN`, el
+  engine y la ruta que la ejecutó.
+- `request_statements`: una petición que ejecutó más de
+  `QUICKTASK_DIAGNOSTICS_MAX_STATEMENTS` sentencias o repitió la misma forma
+  de sentencia `QUICKTASK_DIAGNOSTICS_MAX_REPEATS` veces o más (N+1). La
+  forma es el SQL sin los valores; las listas `IN (?, ?, ...)` cuentan como
+  una sola forma.
+
+Los parámetros de las sentencias no se registran. Las sentencias que el
+agrupador de escrituras o el archivador ejecutan fuera de una petición solo
+aparecen como `slow_query` (sin ruta).
+"""
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from config import get_settings
+import metrics
+
+settings = get_settings()
+logger = logging.getLogger("quicktask.diagnostics")
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+# Traza de la petición en curso (la fija `track`)
+_current = ContextVar("diagnostics_trace", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    """SQL normalizado: espacios colapsados y listas de parámetros en `(?)`."""
+    return _IN_LIST.sub("(?)", _SPACES.sub(" ", statement).strip())
+
+
+def _emit(record: dict):
+    logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+
+class RequestTrace:
+    """
+    Sentencias ejecutadas durante una petición.
+
+    Atributos:
+        scope (dict): Scope ASGI de la petición.
+        status (int): Código de la respuesta (None hasta enviarla).
+        statements (int): Sentencias ejecutadas.
+        sql_seconds (float): Tiempo total en SQL.
+        shapes (Counter): Veces que se ejecutó cada forma de sentencia.
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.status = None
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.shapes = Counter()
+
+    @property
+    def route(self) -> str:
+        return metrics.route_template(self.scope)
+
+    def report(self):
+        """Registra la petición si superó el límite de sentencias o repitió alguna."""
+        repeated = [
+            {"sql": shape, "count": count}
+            for shape, count in self.shapes.most_common()
+            if count >= settings.diagnostics_max_repeats
+        ]
+        if self.statements <= settings.diagnostics_max_statements and not repeated:
+            return
+        _emit({
+            "event": "request_statements",
+            "method": self.scope.get("method"),
+            "route": self.route,
+            "status": self.status,
+            "statements": self.statements,
+            "sql_ms": round(self.sql_seconds * 1000, 3),
+            "repeated": repeated,
+        })
+
+
+@contextmanager
+def track(scope):
+    """
+    Registra las sentencias ejecutadas dentro del bloque como de una petición
+    y la reporta al salir.
+
+    Args:
+        scope (dict): Scope ASGI de la petición.
+
+    Yields:
+        RequestTrace: Traza de la petición.
+    """
+    trace = RequestTrace(scope)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        trace.report()
+
+
+def _query_plan(conn, statement: str, parameters) -> list[str]:
+    """
+    `EXPLAIN QUERY PLAN` de una sentencia, por la misma conexión.
+
+    Usa el cursor DBAPI directamente para no disparar los eventos del engine.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[3] for row in cursor.fetchall()]
+    except Exception as exc:
+        # Sentencias sin plan (PRAGMA, BEGIN) o que ya no se pueden repetir
+        return [f"(sin plan: {exc})"]
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine, name: str):
+    """
+    Traza las sentencias de un engine síncrono (o el `sync_engine` de uno
+    asíncrono): sentencias lentas y sentencias por petición.
+
+    Args:
+        engine (Engine): Engine a instrumentar.
+        name (str): Nombre del engine en el log (write, read, sync).
+    """
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._diagnostics_start = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._diagnostics_start
+        trace = _current.get()
+        if trace is not None:
+            trace.statements += 1
+            trace.sql_seconds += elapsed
+            trace.shapes[statement_shape(statement)] += 1
+        if elapsed * 1000 >= settings.diagnostics_slow_query_ms:
+            _emit({
+                "event": "slow_query",
+                "engine": name,
+                "route": trace.route if trace is not None else None,
+                "method": trace.scope.get("method") if trace is not None else None,
+                "ms": round(elapsed * 1000, 3),
+                "sql": statement_shape(statement),
+                "plan": _query_plan(conn, statement, parameters) if not executemany else [],
+            })
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class DiagnosticsMiddleware:
+    """Middleware ASGI que traza las sentencias de cada petición (ver `track`)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with track(scope) as trace:
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    trace.status = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, send_with_status)
@@ -0,0 +1,96 @@
+"""
+etag.py
+
+ETags y comparación de las cabeceras condicionales (`If-None-Match`,
+`If-Match`) para las peticiones de tareas.
+
+El ETag de una tarea se deriva de su ID y de su columna `version`, que se
+incrementa en cada escritura; el de un listado, de los parámetros de la
+consulta y de los pares (id, version) de la página. Así se puede responder
+`304 Not Modified` sin serializar la respuesta.
+"""
+
+import hashlib
+
+
+def task_etag(task_id: int, version: int) -> str:
+    """
+    Construye el ETag fuerte de una tarea.
+
+    Args:
+        task_id (int): ID de la tarea.
+        version (int): Versión actual de la tarea.
+
+    Returns:
+        str: ETag entre comillas (p. ej. '"12-3"').
+    """
+    return f'"{task_id}-{version}"'
+
+
+def list_etag(params: dict, tasks) -> str:
+    """
+    Construye el ETag fuerte de una página de tareas.
+
+    Args:
+        params (dict): Parámetros de la consulta que determinan la página.
+        tasks (list[Task]): Tareas de la página, en orden.
+
+    Returns:
+        str: ETag entre comillas con un resumen SHA-1.
+    """
+    digest = hashlib.sha1(repr(sorted(params.items())).encode("utf-8"))
+    for task in tasks:
+        digest.update(f"|{task.id}-{task.version}".encode("ascii"))
+    return f'"{digest.hexdigest()}"'
+
+
+def _parse(header: str) -> list[str]:
+    """Separa una lista de ETags de una cabecera condicional."""
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def none_match(header: str, current: str) -> bool:
+    """
+    Indica si `If-None-Match` coincide con el ETag actual (responder 304).
+
+    Usa la comparación débil de RFC 9110: se ignora el prefijo `W/`.
+
+    Args:
+        header (str): Valor de la cabecera `If-None-Match` (o None).
+        current (str): ETag actual del recurso.
+
+    Returns:
+        bool: True si el cliente ya tiene la representación actual.
+    """
+    if not header:
+        return False
+    tags = [tag.removeprefix("W/") for tag in _parse(header)]
+    return "*" in tags or current in tags
+
+
+def if_match_versions(header: str, task_id: int):
+    """
+    Extrae de `If-Match` las versiones aceptadas para una tarea.
+
+    Usa la comparación fuerte de RFC 9110: los ETags débiles (`W/`) o de
+    otra tarea no coinciden nunca.
+
+    Args:
+        header (str): Valor de la cabecera `If-Match` (o None).
+        task_id (int): ID de la tarea que se va a modificar.
+
+    Returns:
+        set[int]: Versiones aceptadas (vacío si ninguna coincide), o None si
+            no hay condición (cabecera ausente o `*`).
+    """
+    if not header:
+        return None
+    tags = _parse(header)
+    if "*" in tags:
+        return None
+    versions = set()
+    for tag in tags:
+        task_part, _, version = tag.strip('"').partition("-")
+        if tag.startswith('"') and task_part == str(task_id) and version.isdigit():
+            versions.add(int(version))
+    return versions
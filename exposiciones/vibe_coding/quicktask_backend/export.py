@@ -0,0 +1,94 @@
+"""
+export.py
+
+Codificación por lotes de filas de tareas: la exportación en streaming
+(NDJSON y CSV) y las páginas JSON del listado.
+
+Cada función recibe un lote de filas Core (tuplas con las columnas de
+`crud.EXPORT_COLUMNS`) y devuelve un único bloque de bytes, de modo que la
+memoria usada depende del tamaño del lote y no del total de la tabla.
+
+El JSON se codifica con orjson directamente desde las tuplas, sin construir
+un `TaskResponse` por fila: los datos vienen de nuestra propia BD y ya
+cumplen el esquema. orjson escribe las fechas en ISO 8601 igual que pydantic.
+"""
+
+import csv
+import io
+from datetime import date
+import orjson
+
+# Tipos de contenido por formato de exportación
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _plain(value):
+    """Convierte fechas a texto ISO 8601 (mismo formato que `TaskResponse`)."""
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def encode_json_array(rows, fields: list[str]) -> bytes:
+    """
+    Codifica un lote de filas como un array JSON de objetos.
+
+    Args:
+        rows (list): Filas del lote.
+        fields (list[str]): Nombres de las columnas, en el orden de las filas.
+            Las columnas que sobren al final de la fila (p. ej. la versión)
+            no se incluyen.
+
+    Returns:
+        bytes: Array JSON (mismo formato que `list[TaskResponse]`).
+    """
+    return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+
+def encode_ndjson(rows, fields: list[str]) -> bytes:
+    """
+    Codifica un lote de filas como JSON delimitado por saltos de línea.
+
+    Args:
+        rows (list): Filas del lote.
+        fields (list[str]): Nombres de las columnas, en el orden de las filas.
+
+    Returns:
+        bytes: Una línea JSON por fila.
+    """
+    return b"".join(orjson.dumps(dict(zip(fields, row))) + b"\n" for row in rows)
+
+
+def encode_csv(rows) -> bytes:
+    """
+    Codifica un lote de filas como CSV (RFC 4180).
+
+    Args:
+        rows (list): Filas del lote.
+
+    Returns:
+        bytes: Líneas CSV del lote.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_export(batches, fields: list[str], fmt: str):
+    """
+    Convierte un iterador asíncrono de lotes de filas en bloques de bytes.
+
+    Args:
+        batches: Iterador asíncrono de lotes (p. ej. `crud_async.stream_task_rows`).
+        fields (list[str]): Nombres de las columnas.
+        fmt (str): 'ndjson' o 'csv'.
+
+    Yields:
+        bytes: Un bloque por lote (más la cabecera en CSV).
+    """
+    if fmt == "csv":
+        yield encode_csv([fields])
+    async for rows in batches:
+        yield encode_ndjson(rows, fields) if fmt == "ndjson" else encode_csv(rows)
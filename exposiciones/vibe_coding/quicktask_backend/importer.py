@@ -0,0 +1,123 @@
+"""
+importer.py
+
+Importación incremental de tareas desde un cuerpo NDJSON recibido en
+streaming.
+
+El cuerpo se procesa línea a línea a medida que llega; las tareas válidas se
+insertan en bloques de `chunk_size` líneas, cada uno en su propia transacción
+y con una sesión de escritura propia (el escritor único no queda ocupado
+durante toda la subida). Si la importación tiene identificador, el progreso se
+confirma junto con cada bloque y la subida puede reanudarse desde
+`resume_offset`.
+"""
+
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+import crud_async
+import database
+import schemas
+
+# Máximo de errores de línea incluidos en la respuesta
+MAX_REPORTED_ERRORS = 100
+
+
+async def iter_lines(chunks):
+    """
+    Divide un flujo de bloques de bytes en líneas completas.
+
+    Args:
+        chunks: Iterador asíncrono de bytes (p. ej. `Request.stream()`).
+
+    Yields:
+        bytes: Cada línea, sin el salto de línea final.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+async def import_ndjson(
+    chunks,
+    chunk_size: int,
+    import_id: str = None,
+    offset: int = 0,
+    resume_from: int = 0,
+) -> schemas.TaskImportResult:
+    """
+    Valida e inserta las tareas de un cuerpo NDJSON por bloques.
+
+    Args:
+        chunks: Iterador asíncrono con el cuerpo de la petición.
+        chunk_size (int): Líneas procesadas por transacción.
+        import_id (str): Identificador para registrar el progreso (opcional).
+        offset (int): Número de línea del archivo original con el que empieza
+            el cuerpo (el cliente puede reenviar solo el resto del archivo).
+        resume_from (int): Líneas ya confirmadas en intentos anteriores; las
+            anteriores a esta se omiten.
+
+    Returns:
+        TaskImportResult: Resumen de la petición y offset para reanudar.
+    """
+    line_no = offset
+    lines_read = skipped = imported = failed = 0
+    errors = []
+    pending_tasks, pending_failed = [], 0
+    committed = max(offset, resume_from)
+
+    async def flush(completed: bool = False):
+        nonlocal imported, failed, pending_tasks, pending_failed, committed
+        # Nunca retroceder: el cuerpo pudo terminar antes de lo ya confirmado
+        position = max(line_no, committed)
+        if pending_tasks or pending_failed or import_id is not None:
+            async with (await database.write_sessionmaker())() as db:
+                imported += await crud_async.import_tasks_chunk(
+                    db, pending_tasks,
+                    import_id=import_id, lines_committed=position, failed=pending_failed, completed=completed,
+                )
+        failed += pending_failed
+        committed = position
+        pending_tasks, pending_failed = [], 0
+
+    try:
+        async for raw_line in iter_lines(chunks):
+            current, line_no = line_no, line_no + 1
+            lines_read += 1
+            if current < resume_from:
+                skipped += 1
+                continue
+            if not raw_line.strip():
+                continue
+
+            try:
+                pending_tasks.append(schemas.TaskCreate.model_validate_json(raw_line))
+            except ValidationError as exc:
+                pending_failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append(schemas.ImportLineError(
+                        line=current,
+                        errors=[{"loc": err["loc"], "msg": err["msg"], "type": err["type"]} for err in exc.errors()]
+                    ))
+
+            if line_no - committed >= chunk_size:
+                await flush()
+    except ClientDisconnect:
+        # La última línea puede estar truncada: se descarta el bloque pendiente
+        # y el cliente reanuda desde el último bloque confirmado.
+        return schemas.TaskImportResult(
+            import_id=import_id, lines_read=lines_read, skipped=skipped,
+            imported=imported, failed=failed, errors=errors,
+            resume_offset=committed, completed=False,
+        )
+
+    await flush(completed=True)
+    return schemas.TaskImportResult(
+        import_id=import_id, lines_read=lines_read, skipped=skipped,
+        imported=imported, failed=failed, errors=errors,
+        resume_offset=committed, completed=True,
+    )
@@ -4,15 +4,82 @@ main.py
 Aplicación principal de FastAPI con los endpoints CRUD para gestionar tareas.
 """
 
-from fastapi import FastAPI, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from database import engine, get_db, Base
+import asyncio
+import heapq
+from datetime import date
+from itertools import islice
+from typing import Any
+from fastapi import FastAPI, Body, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import engine, get_read_db, get_write_db
+import archive
+import database
+from config import get_settings
+from batcher import WriteBatcher
+from cache import TaskCache
+import changes
+from pagination import encode_cursor, decode_cursor
 import crud
-import models
+import crud_async
+import diagnostics
+import etag
+import export
+import importer
+import metrics
+import migrations
 import schemas
+import search
+import shards
 
-# Crear las tablas en la base de datos
-Base.metadata.create_all(bind=engine)
+# El esquema lo actualiza `python migrations.py` antes de arrancar: importar
+# la aplicación no toca la base de datos
+changes.notify_on_commit(database.async_write_engine)
+
+settings = get_settings()
+
+# Caché de lecturas de una tarea (se invalida en cada escritura)
+task_cache = TaskCache(
+    max_entries=settings.task_cache_max_entries,
+    ttl=settings.task_cache_ttl_seconds,
+    enabled=settings.task_cache_enabled,
+)
+
+
+
+def _new_write_batcher(write_engine):
+    """Agrupador de escrituras (group commit) para un engine de escritura."""
+    return WriteBatcher(
+        write_engine,
+        max_batch=settings.write_batch_max_ops,
+        max_delay=settings.write_batch_max_delay_ms / 1000,
+    )
+
+
+# Agrupador de escrituras (group commit), opcional
+if settings.write_batch_enabled:
+    crud_async.write_batcher = _new_write_batcher(database.async_write_engine)
+
+# Sharding por inquilino, opcional. Sin él, la base principal es el único
+# "shard" de los listados de administración.
+if settings.shard_count > 0:
+    database.shard_router = shards.ShardRouter(
+        settings.shard_dir,
+        settings.shard_count,
+        batcher_factory=_new_write_batcher if settings.write_batch_enabled else None,
+    )
+default_shard = shards.Shard(
+    0, engine.url.database, engine, database.async_write_engine, database.async_read_engine
+)
+
+def _cache_key(task_id: int):
+    """Clave de caché de una tarea: con sharding los IDs solo son únicos por inquilino."""
+    return (database.current_tenant.get(), task_id)
+
+
+# Campos de `TaskResponse`, en el orden de `crud.EXPORT_COLUMNS`
+TASK_FIELDS = [column.key for column in crud.EXPORT_COLUMNS]
 
 # Crear la aplicación FastAPI
 app = FastAPI(
@@ -20,6 +87,77 @@ app = FastAPI(
     description="API REST para gestionar tareas personales",
     version="1.0.0"
 )
+app.add_middleware(shards.TenantMiddleware)
+if settings.diagnostics_enabled:
+    app.add_middleware(diagnostics.DiagnosticsMiddleware)
+if settings.metrics_enabled:
+    # Último en agregarse = el más externo: mide también el middleware de inquilinos
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.on_event("startup")
+def check_migrations():
+    """
+    Comprueba que el esquema está al día antes de aceptar tráfico.
+    
+    Con `migrate_on_startup` aplica las migraciones pendientes; si no, el
+    arranque falla (varios workers no deben migrar a la vez).
+    """
+    missing = migrations.pending(engine)
+    if not missing:
+        return
+    if settings.migrate_on_startup:
+        migrations.migrate(engine)
+    else:
+        names = ", ".join(f"{m.version} {m.name}" for m in missing)
+        raise RuntimeError(f"Migraciones pendientes ({names}): ejecuta `python migrations.py`")
+
+
+@app.on_event("startup")
+async def warm_up_async_engines():
+    """
+    Abre una primera conexión asíncrona en cada pool antes de aceptar tráfico.
+    
+    SQLAlchemy serializa el evento `first_connect` del pool con un mutex de
+    hilos; si varias corrutinas abren la primera conexión a la vez, el event
+    loop queda bloqueado. Hacerlo una vez al arrancar evita esa carrera.
+    """
+    for async_engine in (database.async_write_engine, database.async_read_engine):
+        async with async_engine.connect():
+            pass
+
+
+@app.on_event("startup")
+async def start_archiver():
+    """Lanza el archivador de tareas eliminadas (ver `archive.py`)."""
+    if settings.archive_enabled:
+        app.state.archiver = asyncio.create_task(archive.run_periodically(
+            _admin_shards,
+            settings.archive_interval_seconds,
+            after_days=settings.archive_after_days,
+            purge_after_days=settings.purge_after_days,
+            batch_size=settings.archive_batch_size,
+        ))
+
+
+@app.on_event("shutdown")
+async def flush_write_batcher():
+    """
+    Detiene el archivador, confirma las escrituras agrupadas que sigan en
+    cola y cierra los shards.
+    """
+    archiver = getattr(app.state, "archiver", None)
+    if archiver is not None:
+        archiver.cancel()
+        try:
+            await archiver
+        except asyncio.CancelledError:
+            pass
+        app.state.archiver = None
+    if crud_async.write_batcher is not None:
+        await crud_async.write_batcher.close()
+    if database.shard_router is not None:
+        await database.shard_router.close()
 
 
 # ============================================================================
@@ -27,7 +165,7 @@ app = FastAPI(
 # ============================================================================
 
 @app.get("/", tags=["Health"])
-def read_root():
+async def read_root():
     """
     Endpoint raíz para verificar que la API está activa.
     
@@ -42,33 +180,371 @@ def read_root():
     }
 
 
-@app.get("/tasks", response_model=list[schemas.TaskResponse], tags=["Tasks"])
-def list_tasks(
+@app.get("/cache/stats", tags=["Health"])
+async def cache_stats():
+    """
+    Devuelve los contadores de la caché de tareas.
+    
+    Returns:
+        dict: Estado, tamaño, aciertos, fallos y expulsiones.
+    """
+    return task_cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def get_metrics():
+    """
+    Métricas del proceso en el formato de texto de Prometheus.
+    
+    Peticiones, estados y latencia por ruta; sentencias y tiempo SQL por
+    petición; duración de cada sentencia y espera por el pool por engine.
+    
+    Returns:
+        PlainTextResponse: Exposición de texto de Prometheus (404 si las
+        métricas están desactivadas).
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+async def _admin_shards():
+    """Shards sobre los que operan los endpoints de administración."""
+    if database.shard_router is None:
+        return [default_shard]
+    return await database.shard_router.all_shards()
+
+
+@app.get("/admin/shards", response_model=list[schemas.ShardSummary], tags=["Admin"])
+async def list_shards():
+    """
+    Devuelve la ocupación de cada shard (tareas, inquilinos y tamaño).
+    
+    Sirve para detectar shards con mucha carga y repartirlos con
+    `python shards.py split <shard>`. Sin sharding devuelve la base principal.
+    
+    Returns:
+        list[ShardSummary]: Un elemento por shard.
+    """
+    all_shards = await _admin_shards()
+    summaries = await shards.fan_out(all_shards, crud.get_storage_summary)
+    return [
+        {"shard": shard.id, "size_bytes": shard.size_bytes(), **summary}
+        for shard, summary in zip(all_shards, summaries)
+    ]
+
+
+@app.get("/admin/storage", response_model=list[schemas.StorageReport], tags=["Admin"])
+async def storage_report():
+    """
+    Devuelve el espacio que ocupa cada tabla e índice de cada shard.
+    
+    Incluye las tareas activas, las eliminadas que siguen en la tabla
+    caliente y las archivadas (`tasks_archive`), para ver el efecto del
+    archivador. Los tamaños salen de la tabla virtual `dbstat` de SQLite.
+    
+    Returns:
+        list[StorageReport]: Un elemento por shard.
+    """
+    all_shards = await _admin_shards()
+    reports = await shards.fan_out(all_shards, crud.get_table_sizes)
+    return [{"shard": shard.id, **report} for shard, report in zip(all_shards, reports)]
+
+
+@app.get("/admin/tasks", response_model=list[schemas.AdminTask], tags=["Admin"])
+async def list_all_tenants_tasks(
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de tareas"),
+    status: str = Query(None, pattern="^(pending|completed)$", description="Filtrar por estado"),
+    tenant_id: str = Query(None, pattern=shards.TENANT_PATTERN.pattern, description="Filtrar por inquilino"),
+):
+    """
+    Lista las tareas modificadas más recientemente de todos los inquilinos.
+    
+    La consulta se ejecuta a la vez en todos los shards y los resultados se
+    mezclan por `updated_at` (de más reciente a más antigua).
+    
+    Query Parameters:
+        limit (int): Número máximo de tareas.
+        status (str): Filtrar por estado (opcional).
+        tenant_id (str): Filtrar por inquilino (opcional).
+    
+    Returns:
+        list[AdminTask]: Tareas con su inquilino y su shard.
+    """
+    all_shards = await _admin_shards()
+    results = await shards.fan_out(all_shards, crud.get_recent_tasks, limit=limit, status=status, tenant_id=tenant_id)
+    tagged = (
+        [{**row._asdict(), "shard": shard.id} for row in rows]
+        for shard, rows in zip(all_shards, results)
+    )
+    newest_first = heapq.merge(*tagged, key=lambda task: (task["updated_at"], task["id"]), reverse=True)
+    return list(islice(newest_first, limit))
+
+
+@app.get("/tasks", response_model=list[schemas.TaskProjection], tags=["Tasks"])
+async def list_tasks(
     skip: int = Query(0, ge=0, description="Número de tareas a saltar"),
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de tareas"),
     status: str = Query(None, regex="^(pending|completed)$", description="Filtrar por estado"),
-    db: Session = Depends(get_db)
+    after: str = Query(None, description="Cursor opaco de la página anterior (cabecera X-Next-Cursor)"),
+    sort: str = Query("id", pattern="^(id|due_date|priority|created_at)$", description="Orden del listado"),
+    due_after: date = Query(None, description="Vencimiento desde esta fecha, inclusive (YYYY-MM-DD)"),
+    due_before: date = Query(None, description="Vencimiento hasta esta fecha, inclusive (YYYY-MM-DD)"),
+    overdue: bool = Query(False, description="Solo tareas pendientes con vencimiento anterior a hoy"),
+    fields: str = Query(
+        None,
+        pattern=r"^\w+(,\w+)*$",
+        description="Campos a devolver separados por comas (p. ej. id,title,status); por defecto, todos"
+    ),
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Lista todas las tareas (no eliminadas).
     
+    Si la página está completa, la cabecera `X-Next-Cursor` contiene el
+    cursor para pedir la siguiente con `after`. A diferencia de `skip`, el
+    cursor no obliga a la BD a recorrer las filas ya entregadas.
+    
+    La cabecera `ETag` resume los parámetros y las versiones de las tareas
+    de la página; si coincide con `If-None-Match` se responde 304 sin
+    serializar la página.
+    
+    Las tareas se leen como filas Core y se codifican con orjson sin pasar
+    por `TaskResponse`. Con `fields` solo se leen y devuelven esas columnas
+    (p. ej. sin `description`); el esquema de OpenAPI (`TaskProjection`)
+    declara por eso todos los campos como opcionales.
+    
+    Todos los órdenes y filtros de vencimiento usan un índice compuesto, así
+    que "lo que vence esta semana" no recorre la tabla.
+    
     Query Parameters:
         skip (int): Offset para paginación.
         limit (int): Límite de resultados.
         status (str): Filtro opcional por estado ('pending' o 'completed').
+        after (str): Cursor de la página anterior (paginación keyset).
+        sort (str): 'id' (por defecto), 'due_date' (sin fecha al final),
+            'priority' (high, medium, low) o 'created_at'.
+        due_after (date): Vencimiento desde esta fecha, inclusive.
+        due_before (date): Vencimiento hasta esta fecha, inclusive.
+        overdue (bool): Solo pendientes con vencimiento anterior a hoy.
+        fields (str): Proyección de columnas, separadas por comas.
+    
+    Returns:
+        list[TaskProjection]: Lista de tareas (solo los campos pedidos si
+            se usa `fields`).
+    
+    Raises:
+        HTTPException: Si el cursor es inválido, se combina con `skip` o
+            `fields` contiene un campo desconocido (400).
+    """
+    selected = None
+    if fields is not None:
+        selected = tuple(dict.fromkeys(fields.split(",")))
+        unknown = [name for name in selected if name not in TASK_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(unknown)}")
+    
+    cursor = None
+    if after is not None:
+        if skip:
+            raise HTTPException(status_code=400, detail="No se puede combinar 'after' con 'skip'")
+        try:
+            cursor = decode_cursor(after, sort=sort)
+            crud.check_sort_cursor(sort, cursor[0])
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    
+    filters = {"status": status, "due_after": due_after, "due_before": due_before, "overdue": overdue}
+    rows = await crud_async.get_tasks(
+        db, skip=skip, limit=limit, after=cursor, fields=selected, sort=sort, **filters
+    )
+    headers = {}
+    if len(rows) == limit:
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(sort, crud.sort_cursor(sort, last), last.id)
+    
+    params = {"skip": skip, "limit": limit, "after": after, "fields": selected, "sort": sort, **filters}
+    headers["ETag"] = etag.list_etag(params, rows)
+    if etag.none_match(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        content=export.encode_json_array(rows, selected or TASK_FIELDS),
+        media_type="application/json",
+        headers=headers
+    )
+
+
+@app.get("/tasks/stats", response_model=schemas.TaskStats, tags=["Tasks"])
+async def get_task_stats(db: AsyncSession = Depends(get_read_db)):
+    """
+    Devuelve el número de tareas por estado y prioridad y las vencidas.
+    
+    Se calcula desde la tabla de contadores `task_counters`, que se actualiza
+    en la misma transacción que cada escritura: no recorre las tareas.
+    
+    Returns:
+        TaskStats: total, by_status, by_priority y overdue.
+    """
+    return await crud_async.get_task_stats(db)
+
+
+@app.get("/tasks/changes", response_model=schemas.TaskChangesPage, tags=["Sync"])
+async def get_task_changes(
+    since: int = Query(0, ge=0, description="Última versión de cambio recibida (0 = desde el principio)"),
+    limit: int = Query(None, ge=1, le=5000, description="Número máximo de cambios"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Devuelve las tareas que cambiaron después de la versión `since`.
+    
+    Las tareas eliminadas se incluyen como tombstones (`deleted: true`, sin
+    `task`). El cliente guarda `next_since` y lo envía en la siguiente
+    petición; mientras `has_more` sea true quedan cambios por leer.
+    
+    Query Parameters:
+        since (int): Última versión de cambio conocida.
+        limit (int): Máximo de cambios (por defecto `QUICKTASK_CHANGES_PAGE_SIZE`).
+    
+    Returns:
+        TaskChangesPage: Cambios, siguiente `since` y si hay más.
+    
+    Raises:
+        HTTPException: 410 si los tombstones posteriores a `since` ya se
+            purgaron del archivo (el cliente debe resincronizar con since=0).
+    """
+    limit = limit or settings.changes_page_size
+    try:
+        records = await crud_async.get_changes(db, since=since, limit=limit)
+    except crud.ChangesPurged as exc:
+        raise HTTPException(status_code=410, detail=f"{exc}; resincroniza con since=0")
+    items = [changes.to_change(record, TASK_FIELDS) for record in records]
+    return {
+        "changes": items,
+        "next_since": items[-1]["change_version"] if items else since,
+        "has_more": len(items) == limit,
+    }
+
+
+@app.get("/tasks/changes/stream", tags=["Sync"])
+async def stream_task_changes(
+    since: int = Query(None, ge=0, description="Última versión de cambio recibida"),
+    last_event_id: str = Header(None),
+):
+    """
+    Envía los cambios de tareas en vivo como Server-Sent Events.
+    
+    Primero envía los cambios posteriores a `since` y después cada cambio
+    nuevo en cuanto se confirma. Cada evento `change` lleva como `id` su
+    versión de cambio: al reconectar, el navegador envía `Last-Event-ID` y
+    el stream continúa desde ahí.
+    
+    Query Parameters:
+        since (int): Última versión de cambio conocida (por defecto, la de
+            `Last-Event-ID` o 0).
+    
+    Returns:
+        StreamingResponse: Flujo `text/event-stream`.
+    """
+    if since is None:
+        since = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    return StreamingResponse(
+        changes.stream_changes(
+            since, TASK_FIELDS,
+            page_size=settings.changes_page_size,
+            wait_seconds=settings.changes_stream_wait_seconds,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/tasks/search", response_model=list[schemas.TaskSearchHit], tags=["Tasks"])
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200, description="Palabras a buscar en título y descripción"),
+    skip: int = Query(0, ge=0, description="Número de resultados a saltar"),
+    limit: int = Query(20, ge=1, le=100, description="Número máximo de resultados"),
+    status: str = Query(None, pattern="^(pending|completed)$", description="Filtrar por estado"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Busca tareas (no eliminadas) por palabras en el título o la descripción.
+    
+    Usa el índice de texto completo FTS5: todas las palabras deben aparecer
+    (sin distinguir mayúsculas ni tildes) y `palabra*` busca por prefijo. Los
+    resultados se ordenan por relevancia (bm25).
+    
+    Query Parameters:
+        q (str): Texto de búsqueda.
+        skip (int): Offset para paginación.
+        limit (int): Límite de resultados.
+        status (str): Filtro opcional por estado.
     
     Returns:
-        list[TaskResponse]: Lista de tareas.
+        list[TaskSearchHit]: Tareas con su puntuación y un fragmento resaltado.
     """
-    tasks = crud.get_tasks(db, skip=skip, limit=limit, status=status)
-    return tasks
+    rows = await crud_async.search_tasks(db, q, skip=skip, limit=limit, status=status)
+    return [
+        schemas.TaskSearchHit(
+            **schemas.TaskResponse.model_validate(task).model_dump(),
+            rank=rank,
+            snippet=search.render_snippet(snippet),
+        )
+        for task, rank, snippet in rows
+    ]
+
+
+async def _export_chunks(fmt: str, status: str):
+    """
+    Genera el cuerpo de la exportación con su propia sesión de lectura.
+    
+    La sesión vive lo mismo que el streaming y no lo que dura el endpoint.
+    """
+    async with (await database.read_sessionmaker())() as db:
+        batches = crud_async.stream_task_rows(db, status=status, batch_size=settings.export_batch_size)
+        async for chunk in export.stream_export(batches, TASK_FIELDS, fmt):
+            yield chunk
+
+
+@app.get("/tasks/export", tags=["Tasks"])
+async def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato: 'ndjson' o 'csv'"),
+    status: str = Query(None, pattern="^(pending|completed)$", description="Filtrar por estado")
+):
+    """
+    Exporta todas las tareas (no eliminadas) en streaming.
+    
+    Las filas se leen con un cursor del lado servidor y se envían por lotes,
+    así la memoria del proceso no depende del tamaño de la tabla.
+    
+    Query Parameters:
+        format (str): 'ndjson' (una tarea JSON por línea) o 'csv'.
+        status (str): Filtro opcional por estado.
+    
+    Returns:
+        StreamingResponse: Cuerpo NDJSON o CSV.
+    """
+    return StreamingResponse(
+        _export_chunks(format, status),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    )
 
 
 @app.get("/tasks/{task_id}", response_model=schemas.TaskResponse, tags=["Tasks"])
-def get_task(task_id: int, db: Session = Depends(get_db)):
+async def get_task(
+    task_id: int,
+    if_none_match: str = Header(None),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
     Obtiene una tarea específica por su ID.
     
+    La respuesta serializada y su ETag se guardan en `task_cache`; las
+    lecturas siguientes de la misma tarea no consultan la BD hasta que caduca
+    o una escritura la invalida. Si el ETag coincide con `If-None-Match` se
+    responde 304 sin cuerpo.
+    
     Path Parameters:
         task_id (int): ID de la tarea.
     
@@ -78,14 +554,27 @@ def get_task(task_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: Si la tarea no existe (404).
     """
-    db_task = crud.get_task(db, task_id=task_id)
-    if db_task is None:
-        raise HTTPException(status_code=404, detail="Tarea no encontrada")
-    return db_task
+    cached = task_cache.get(_cache_key(task_id))
+    if cached is None:
+        generation = task_cache.generation()
+        db_task = await crud_async.get_task(db, task_id=task_id)
+        if db_task is None:
+            raise HTTPException(status_code=404, detail="Tarea no encontrada")
+        tag = etag.task_etag(db_task.id, db_task.version)
+        if etag.none_match(if_none_match, tag):
+            return Response(status_code=304, headers={"ETag": tag})
+        body = schemas.TaskResponse.model_validate(db_task).model_dump_json().encode("utf-8")
+        cached = (tag, body)
+        task_cache.put(_cache_key(task_id), cached, generation)
+    
+    tag, body = cached
+    if etag.none_match(if_none_match, tag):
+        return Response(status_code=304, headers={"ETag": tag})
+    return Response(content=body, media_type="application/json", headers={"ETag": tag})
 
 
 @app.post("/tasks", response_model=schemas.TaskResponse, status_code=201, tags=["Tasks"])
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
+async def create_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_write_db)):
     """
     Crea una nueva tarea.
     
@@ -95,18 +584,242 @@ def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
     Returns:
         TaskResponse: Datos de la tarea creada.
     """
-    return crud.create_task(db=db, task=task)
+    return await crud_async.create_task(db=db, task=task)
+
+
+# El cuerpo de /tasks/bulk se valida elemento a elemento en el endpoint; el
+# esquema documentado sigue siendo una lista de TaskCreate
+BULK_REQUEST_BODY = {
+    "requestBody": {
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "array",
+                    "title": "Items",
+                    "description": "Lista de tareas (mismo formato que POST /tasks)",
+                    "items": {"$ref": "#/components/schemas/TaskCreate"},
+                }
+            }
+        }
+    }
+}
+
+
+@app.post(
+    "/tasks/bulk",
+    response_model=schemas.TaskBulkCreateResponse,
+    status_code=201,
+    tags=["Tasks"],
+    openapi_extra=BULK_REQUEST_BODY,
+)
+async def create_tasks_bulk(
+    items: list[Any] = Body(..., description="Lista de tareas (mismo formato que POST /tasks)"),
+    db: AsyncSession = Depends(get_write_db)
+):
+    """
+    Crea varias tareas en una sola transacción.
+    
+    Cada elemento se valida por separado contra `TaskCreate`: los válidos se
+    insertan juntos y los inválidos se reportan con su posición, sin abortar
+    el lote completo.
+    
+    Body:
+        list[TaskCreate]: Tareas a crear (máximo `QUICKTASK_BULK_MAX_ITEMS`).
+    
+    Returns:
+        TaskBulkCreateResponse: IDs creados y errores por elemento.
+    
+    Raises:
+        HTTPException: Si el lote supera el tamaño máximo (413).
+    """
+    if len(items) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {settings.bulk_max_items} tareas"
+        )
+    
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append(schemas.TaskCreate.model_validate(item))
+        except ValidationError as exc:
+            errors.append(schemas.BulkItemError(
+                index=index,
+                errors=[{"loc": err["loc"], "msg": err["msg"], "type": err["type"]} for err in exc.errors()]
+            ))
+    
+    created_ids = await crud_async.create_tasks(db=db, tasks=valid)
+    return schemas.TaskBulkCreateResponse(created_ids=created_ids, errors=errors)
+
+
+@app.post("/tasks/import", response_model=schemas.TaskImportResult, tags=["Tasks"])
+async def import_tasks(
+    request: Request,
+    import_id: str = Query(None, pattern="^[A-Za-z0-9_-]{1,64}$", description="Identificador para reanudar la importación"),
+    offset: int = Query(0, ge=0, description="Línea del archivo original con la que empieza el cuerpo"),
+    chunk_size: int = Query(None, ge=1, le=10000, description="Líneas por transacción"),
+):
+    """
+    Importa tareas desde un cuerpo NDJSON (una tarea por línea) en streaming.
+    
+    El cuerpo se valida línea a línea contra `TaskCreate` y se inserta en
+    bloques de `chunk_size` líneas, cada uno en su propia transacción. Con
+    `import_id` el progreso se guarda con cada bloque: si la subida se corta,
+    `GET /tasks/import/{import_id}` indica desde qué línea reanudar, y las
+    líneas ya confirmadas que se reenvíen se omiten.
+    
+    Query Parameters:
+        import_id (str): Identificador de la importación (opcional).
+        offset (int): Línea del archivo con la que empieza este cuerpo.
+        chunk_size (int): Líneas por transacción (por defecto `QUICKTASK_IMPORT_CHUNK_SIZE`).
+    
+    Returns:
+        TaskImportResult: Resumen, errores por línea y offset para reanudar.
+    
+    Raises:
+        HTTPException: Si `offset` deja líneas sin importar (409).
+    """
+    resume_from = 0
+    if import_id is not None:
+        async with (await database.read_sessionmaker())() as db:
+            job = await crud_async.get_import_job(db, import_id)
+        if job is not None:
+            resume_from = job.lines_committed
+    
+    if offset > resume_from:
+        raise HTTPException(
+            status_code=409,
+            detail=f"El cuerpo empieza en la línea {offset}, pero la importación debe reanudarse desde la línea {resume_from}"
+        )
+    
+    return await importer.import_ndjson(
+        request.stream(),
+        chunk_size=chunk_size or settings.import_chunk_size,
+        import_id=import_id,
+        offset=offset,
+        resume_from=resume_from,
+    )
+
+
+@app.get("/tasks/import/{import_id}", response_model=schemas.ImportJobResponse, tags=["Tasks"])
+async def get_import_progress(import_id: str, db: AsyncSession = Depends(get_read_db)):
+    """
+    Obtiene el progreso registrado de una importación.
+    
+    Path Parameters:
+        import_id (str): Identificador de la importación.
+    
+    Returns:
+        ImportJobResponse: Líneas confirmadas, totales y estado.
+    
+    Raises:
+        HTTPException: Si la importación no existe (404).
+    """
+    job = await crud_async.get_import_job(db, import_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return job
+
+
+def _check_bulk_size(selector: schemas.TaskBulkSelector):
+    """Rechaza listas de IDs mayores que el máximo configurado (413)."""
+    if selector.ids is not None and len(selector.ids) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {settings.bulk_max_items} tareas"
+        )
+
+
+def _invalidate_selected(selector: schemas.TaskBulkSelector):
+    """Invalida en caché las tareas de una operación masiva (todas si es por filtro)."""
+    if selector.ids is not None:
+        task_cache.invalidate(*map(_cache_key, selector.ids))
+    else:
+        task_cache.clear()
+
+
+@app.patch("/tasks/bulk", response_model=schemas.TaskBulkResult, tags=["Tasks"])
+async def update_tasks_bulk(bulk: schemas.TaskBulkUpdate, db: AsyncSession = Depends(get_write_db)):
+    """
+    Actualiza varias tareas con un único UPDATE ... WHERE.
+    
+    Body:
+        TaskBulkUpdate: `ids` o `filter` (status, priority, due_after,
+            due_before) y los cambios (`changes`) a aplicar.
+    
+    Returns:
+        TaskBulkResult: Número de tareas actualizadas.
+    """
+    _check_bulk_size(bulk)
+    affected = await crud_async.update_tasks(db=db, selector=bulk, task_update=bulk.changes)
+    _invalidate_selected(bulk)
+    return schemas.TaskBulkResult(affected=affected)
+
+
+@app.post("/tasks/bulk-delete", response_model=schemas.TaskBulkResult, tags=["Tasks"])
+async def delete_tasks_bulk(selector: schemas.TaskBulkSelector, db: AsyncSession = Depends(get_write_db)):
+    """
+    Elimina (soft-delete) varias tareas con un único UPDATE ... WHERE.
+    
+    Body:
+        TaskBulkSelector: `ids` o `filter` de las tareas a eliminar.
+    
+    Returns:
+        TaskBulkResult: Número de tareas eliminadas.
+    """
+    _check_bulk_size(selector)
+    affected = await crud_async.delete_tasks(db=db, selector=selector)
+    _invalidate_selected(selector)
+    return schemas.TaskBulkResult(affected=affected)
+
+
+@app.post("/tasks/bulk-restore", response_model=schemas.TaskBulkResult, tags=["Tasks"])
+async def restore_tasks_bulk(selector: schemas.TaskBulkSelector, db: AsyncSession = Depends(get_write_db)):
+    """
+    Restaura varias tareas eliminadas con un único UPDATE ... WHERE.
+    
+    Body:
+        TaskBulkSelector: `ids` o `filter` de las tareas a restaurar.
+    
+    Returns:
+        TaskBulkResult: Número de tareas restauradas.
+    """
+    _check_bulk_size(selector)
+    affected = await crud_async.restore_tasks(db=db, selector=selector)
+    _invalidate_selected(selector)
+    return schemas.TaskBulkResult(affected=affected)
+
+
+async def _update_task_checked(db: AsyncSession, task_id: int, task_update: schemas.TaskUpdate, if_match: str):
+    """Actualiza una tarea respetando `If-Match` (404 si no existe, 412 si cambió)."""
+    expected = etag.if_match_versions(if_match, task_id)
+    try:
+        db_task = await crud_async.update_task(
+            db=db, task_id=task_id, task_update=task_update, expected_versions=expected
+        )
+    except crud.PreconditionFailed:
+        raise HTTPException(status_code=412, detail="La tarea fue modificada; vuelve a obtenerla")
+    finally:
+        task_cache.invalidate(_cache_key(task_id))
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    return db_task
 
 
 @app.put("/tasks/{task_id}", response_model=schemas.TaskResponse, tags=["Tasks"])
-def update_task(
+async def update_task(
     task_id: int,
     task_update: schemas.TaskUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_match: str = Header(None),
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Actualiza una tarea existente.
     
+    Con `If-Match` la escritura solo se aplica si la tarea sigue en la
+    versión de ese ETag (concurrencia optimista).
+    
     Path Parameters:
         task_id (int): ID de la tarea.
     
@@ -117,23 +830,28 @@ def update_task(
         TaskResponse: Datos de la tarea actualizada.
     
     Raises:
-        HTTPException: Si la tarea no existe (404).
+        HTTPException: Si la tarea no existe (404) o cambió desde el ETag
+            de `If-Match` (412).
     """
-    db_task = crud.update_task(db=db, task_id=task_id, task_update=task_update)
-    if db_task is None:
-        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    db_task = await _update_task_checked(db, task_id, task_update, if_match)
+    response.headers["ETag"] = etag.task_etag(db_task.id, db_task.version)
     return db_task
 
 
 @app.patch("/tasks/{task_id}", response_model=schemas.TaskResponse, tags=["Tasks"])
-def patch_task(
+async def patch_task(
     task_id: int,
     task_update: schemas.TaskUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_match: str = Header(None),
+    db: AsyncSession = Depends(get_write_db)
 ):
     """
     Actualiza parcialmente una tarea (alias para PUT).
     
+    Con `If-Match` la escritura solo se aplica si la tarea sigue en la
+    versión de ese ETag (concurrencia optimista).
+    
     Path Parameters:
         task_id (int): ID de la tarea.
     
@@ -144,32 +862,45 @@ def patch_task(
         TaskResponse: Datos de la tarea actualizada.
     
     Raises:
-        HTTPException: Si la tarea no existe (404).
+        HTTPException: Si la tarea no existe (404) o cambió desde el ETag
+            de `If-Match` (412).
     """
-    db_task = crud.update_task(db=db, task_id=task_id, task_update=task_update)
-    if db_task is None:
-        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    db_task = await _update_task_checked(db, task_id, task_update, if_match)
+    response.headers["ETag"] = etag.task_etag(db_task.id, db_task.version)
     return db_task
 
 
 @app.delete("/tasks/{task_id}", status_code=204, tags=["Tasks"])
-def delete_task(task_id: int, db: Session = Depends(get_db)):
+async def delete_task(
+    task_id: int,
+    if_match: str = Header(None),
+    db: AsyncSession = Depends(get_write_db)
+):
     """
     Elimina una tarea (soft-delete).
     
+    Con `If-Match` solo se elimina si la tarea sigue en la versión de ese ETag.
+    
     Path Parameters:
         task_id (int): ID de la tarea.
     
     Raises:
-        HTTPException: Si la tarea no existe (404).
+        HTTPException: Si la tarea no existe (404) o cambió desde el ETag
+            de `If-Match` (412).
     """
-    success = crud.delete_task(db=db, task_id=task_id)
+    expected = etag.if_match_versions(if_match, task_id)
+    try:
+        success = await crud_async.delete_task(db=db, task_id=task_id, expected_versions=expected)
+    except crud.PreconditionFailed:
+        raise HTTPException(status_code=412, detail="La tarea fue modificada; vuelve a obtenerla")
+    finally:
+        task_cache.invalidate(_cache_key(task_id))
     if not success:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
 
 
 @app.post("/tasks/{task_id}/restore", response_model=schemas.TaskResponse, tags=["Tasks"])
-def restore_task(task_id: int, db: Session = Depends(get_db)):
+async def restore_task(task_id: int, db: AsyncSession = Depends(get_write_db)):
     """
     Restaura una tarea eliminada.
     
@@ -182,7 +913,8 @@ def restore_task(task_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: Si la tarea no existe (404).
     """
-    db_task = crud.restore_task(db=db, task_id=task_id)
+    db_task = await crud_async.restore_task(db=db, task_id=task_id)
+    task_cache.invalidate(_cache_key(task_id))
     if db_task is None:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
     return db_task
@@ -200,4 +932,5 @@ def value_error_handler(request, exc):
 
 if __name__ == "__main__":
     import uvicorn
+    migrations.migrate(engine)
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,290 @@
+"""
+metrics.py
+
+Métricas de la aplicación en el formato de texto de Prometheus (`GET /metrics`).
+
+- `MetricsMiddleware`: peticiones por ruta, método y estado, y su latencia.
+  La ruta es la plantilla (`/tasks/{task_id}`), no la URL, para acotar las
+  series; las peticiones sin ruta cuentan como `unmatched`.
+- `instrument_engine` (lo llama `database.create_engines`): tiempo de cada
+  sentencia SQL y sentencias por petición, vía eventos del engine.
+- `TimedPool`: espera por una conexión del pool (el escritor único hace cola
+  ahí). `database.py` la usa como `poolclass` de los engines asíncronos.
+
+Todo vive en memoria del proceso: con varios workers cada uno expone sus
+propias series. Registrar una observación es una búsqueda binaria en los
+límites y unas sumas bajo un bloqueo sin contención, así que puede quedar
+activo en producción (`QUICKTASK_METRICS_ENABLED=false` lo desactiva).
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Límites de los histogramas (segundos salvo `STATEMENT_BUCKETS`)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Contador monótono con etiquetas.
+
+    Atributos:
+        name (str): Nombre de la métrica.
+        help (str): Descripción (línea `# HELP`).
+        labels (tuple): Nombres de las etiquetas.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        """Suma `amount` a la serie de esas etiquetas."""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        """Valor actual de una serie (0 si no existe)."""
+        return self._values.get(label_values, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Histograma de límites fijos con etiquetas.
+
+    Cada serie guarda el número de observaciones por intervalo, la suma y el
+    total; los buckets acumulados se calculan al exportar.
+
+    Atributos:
+        name (str): Nombre de la métrica.
+        help (str): Descripción (línea `# HELP`).
+        labels (tuple): Nombres de las etiquetas.
+        buckets (tuple): Límites superiores, crecientes (`+Inf` implícito).
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        """Registra una observación en la serie de esas etiquetas."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [conteos por intervalo (+Inf al final), suma, total]
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        """Observaciones de una serie (0 si no existe)."""
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labels + ("le",), label_values + (le,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+http_requests = Counter(
+    "quicktask_http_requests_total", "Peticiones HTTP por ruta, método y estado.", ("method", "route", "status")
+)
+http_duration = Histogram(
+    "quicktask_http_request_duration_seconds",
+    "Latencia de las peticiones HTTP hasta el último byte de la respuesta.",
+    ("method", "route"),
+)
+http_statements = Histogram(
+    "quicktask_http_request_sql_statements",
+    "Sentencias SQL ejecutadas por petición.",
+    ("method", "route"),
+    buckets=STATEMENT_BUCKETS,
+)
+http_sql_time = Histogram(
+    "quicktask_http_request_sql_seconds", "Tiempo en SQL por petición.", ("method", "route")
+)
+sql_duration = Histogram(
+    "quicktask_sql_statement_duration_seconds", "Duración de cada sentencia SQL por engine.", ("engine",), SQL_BUCKETS
+)
+sql_errors = Counter("quicktask_sql_errors_total", "Sentencias SQL fallidas por engine.", ("engine",))
+pool_wait = Histogram(
+    "quicktask_db_pool_wait_seconds", "Espera por una conexión del pool por engine.", ("engine",), SQL_BUCKETS
+)
+
+REGISTRY = [http_requests, http_duration, http_statements, http_sql_time, sql_duration, sql_errors, pool_wait]
+
+# Sentencias y tiempo SQL de la petición en curso: [sentencias, segundos].
+# Lo fija el middleware; fuera de una petición (archivador, agrupador de
+# escrituras, scripts) es None y solo se registra el tiempo por sentencia.
+_request_sql = ContextVar("request_sql", default=None)
+
+
+def render() -> str:
+    """Todas las métricas en el formato de texto de Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# SQL Y POOL
+# ============================================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def instrument_engine(engine, name: str):
+    """
+    Mide cada sentencia SQL de un engine síncrono (o el `sync_engine` de uno
+    asíncrono) y la suma a la petición en curso.
+
+    Args:
+        engine (Engine): Engine a instrumentar.
+        name (str): Etiqueta `engine` de las series (write, read, sync).
+    """
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        sql_duration.observe(elapsed, name)
+        request = _request_sql.get()
+        if request is not None:
+            request[0] += 1
+            request[1] += elapsed
+
+    def handle_error(exception_context):
+        sql_errors.inc(name)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
+
+
+class TimedPool(AsyncAdaptedQueuePool):
+    """
+    Pool asíncrono que mide cuánto espera cada checkout por una conexión.
+
+    La etiqueta es el `pool_logging_name` del engine (se conserva al recrear
+    el pool).
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - start, self._orig_logging_name or "default")
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+# Plantilla de ruta por endpoint (se construye con la primera petición)
+_route_templates = {}
+
+
+def route_template(scope) -> str:
+    """
+    Plantilla de la ruta que atiende una petición (`/tasks/{task_id}`).
+
+    Starlette deja el endpoint en el scope al enrutar; antes de eso, o si
+    ninguna ruta coincide, devuelve `unmatched`.
+    """
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if not _route_templates and "app" in scope:
+        _route_templates.update(
+            (route.endpoint, route.path) for route in scope["app"].routes if hasattr(route, "endpoint")
+        )
+    return _route_templates.get(endpoint, "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que registra peticiones, estados y latencias por ruta.
+
+    La latencia llega hasta que la aplicación termina de enviar la respuesta
+    (en un stream, toda su duración).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        request = [0, 0.0]
+        token = _request_sql.set(request)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_sql.reset(token)
+            method, route = scope["method"], route_template(scope)
+            http_requests.inc(method, route, str(status))
+            http_duration.observe(elapsed, method, route)
+            http_statements.observe(request[0], method, route)
+            http_sql_time.observe(request[1], method, route)
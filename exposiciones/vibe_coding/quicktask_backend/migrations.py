@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+"""
+migrations.py
+
+Migraciones versionadas del esquema de SQLite.
+
+Importar la aplicación no toca la base de datos: el esquema se actualiza una
+sola vez, antes de arrancar los workers, con:
+
+    python migrations.py            # aplica las pendientes (base principal y shards)
+    python migrations.py status     # versión aplicada y migraciones pendientes
+
+Al arrancar, la aplicación solo comprueba que no quedan migraciones
+pendientes (`QUICKTASK_MIGRATE_ON_STARTUP=true` las aplica en ese momento,
+para un único proceso de desarrollo). Los shards nuevos se migran al crearse.
+
+Cada migración queda registrada en `schema_migrations`. Deben ser
+idempotentes: la primera crea las tablas desde los modelos actuales (una base
+nueva ya nace con el esquema completo), y una ejecución interrumpida se
+repite entera.
+
+- `create_index`: cada índice en su propia transacción corta. Con WAL las
+  lecturas siguen durante la construcción; las escrituras esperan al bloqueo
+  (`busy_timeout`), por eso se construyen antes de arrancar los workers.
+- `backfill`: actualiza filas por lotes, cada uno en su transacción, hasta
+  que no quede ninguna; se puede interrumpir y reanudar.
+"""
+
+import argparse
+import json
+from dataclasses import dataclass
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+import changes
+import database
+import search
+import stats
+from models import Task
+
+MIGRATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    Un paso del esquema.
+
+    Atributos:
+        version (int): Número de la migración (orden de aplicación).
+        name (str): Descripción corta.
+        apply (callable): Función que recibe el engine síncrono.
+    """
+    version: int
+    name: str
+    apply: callable
+
+
+def create_index(engine, index):
+    """
+    Crea un índice si no existe, en su propia transacción.
+
+    Se usa `IF NOT EXISTS` en lugar de la reflexión (`checkfirst`), que no
+    ve los índices de expresiones.
+
+    Args:
+        engine (Engine): Engine síncrono de la base de datos.
+        index (Index): Índice del modelo.
+    """
+    with engine.begin() as conn:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def backfill(engine, table: str, assignments: str, pending: str, batch_size: int = 1000) -> int:
+    """
+    Ejecuta `UPDATE table SET assignments WHERE pending` por lotes.
+
+    Cada lote es una transacción corta, así el escritor no queda retenido
+    durante toda la tabla. `pending` debe dejar de cumplirse en las filas
+    actualizadas (si no, el bucle no termina).
+
+    Args:
+        engine (Engine): Engine síncrono de la base de datos.
+        table (str): Tabla a actualizar.
+        assignments (str): Cláusula SET.
+        pending (str): Condición de las filas que faltan por actualizar.
+        batch_size (int): Filas por transacción.
+
+    Returns:
+        int: Filas actualizadas.
+    """
+    statement = text(
+        f"UPDATE {table} SET {assignments} "
+        f"WHERE rowid IN (SELECT rowid FROM {table} WHERE {pending} LIMIT :batch)"
+    )
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            updated = conn.execute(statement, {"batch": batch_size}).rowcount
+        total += updated
+        if updated < batch_size:
+            return total
+
+
+# ============================================================================
+# MIGRACIONES
+# ============================================================================
+
+def _create_tables(engine):
+    """Tablas que faltan y columnas nuevas de las existentes."""
+    database.Base.metadata.create_all(bind=engine)
+    for table in database.Base.metadata.sorted_tables:
+        database.add_missing_columns(table, bind=engine)
+
+
+def _create_task_indexes(engine):
+    """Índices de `tasks` (listados, feed de cambios, inquilino, orden)."""
+    for index in Task.__table__.indexes:
+        create_index(engine, index)
+
+
+def _change_feed(engine):
+    """Versión de cambio de las tareas anteriores al feed, contador y triggers."""
+    backfill(engine, "tasks", "change_version = id", "change_version = 0")
+    changes.create_change_triggers(engine)
+
+
+# Con un modificador, date() normaliza los días fuera de rango (02-30 ->
+# 03-02); sin él, algunas versiones de SQLite devuelven el texto tal cual
+_INVALID_DUE_DATE = "due_date IS NOT NULL AND due_date IS NOT date(due_date, '+0 days')"
+
+
+def normalize_due_dates(engine) -> int:
+    """
+    Deja `due_date` como fecha ISO válida (YYYY-MM-DD) o NULL.
+
+    Antes la columna era texto validado solo por formato: una fecha
+    imposible (p. ej. 2025-02-30) o una cadena vacía no se podría leer como
+    `date`. Esas tareas pasan a no tener fecha y su versión avanza (ETag y
+    feed de cambios).
+
+    Args:
+        engine (Engine): Engine síncrono de la base de datos.
+
+    Returns:
+        int: Tareas corregidas.
+    """
+    fixed = backfill(engine, "tasks", "due_date = NULL, version = version + 1", _INVALID_DUE_DATE)
+    backfill(engine, "tasks_archive", "due_date = NULL", _INVALID_DUE_DATE)
+    return fixed
+
+
+# Mensaje del trigger que rechaza las altas de un inquilino movido de shard
+TENANT_MOVED = "tenant_moved"
+
+MOVED_TENANTS_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS moved_tenants (
+        tenant_id VARCHAR(64) PRIMARY KEY,
+        shard_id INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_moved_tenant_bi BEFORE INSERT ON tasks
+    WHEN EXISTS (SELECT 1 FROM moved_tenants WHERE tenant_id = new.tenant_id)
+    BEGIN
+        SELECT RAISE(ABORT, '{TENANT_MOVED}');
+    END
+    """,
+)
+
+
+def _moved_tenants(engine):
+    """
+    Inquilinos que `shards.move_tenants` sacó de esta base y trigger que
+    rechaza sus altas (las que resolvieron el shard antes del cambio se
+    repiten en el nuevo, ver `shards.ShardRouter.write`).
+    """
+    with engine.begin() as conn:
+        for statement in MOVED_TENANTS_DDL:
+            conn.execute(text(statement))
+
+
+MIGRATIONS = (
+    Migration(1, "tablas y columnas", _create_tables),
+    Migration(2, "indices de tasks", _create_task_indexes),
+    Migration(3, "busqueda de texto completo (FTS5)", search.create_search_index),
+    Migration(4, "contadores de estadisticas", stats.create_stats_triggers),
+    Migration(5, "feed de cambios", _change_feed),
+    Migration(6, "fechas de vencimiento validas", normalize_due_dates),
+    Migration(7, "inquilinos movidos de shard", _moved_tenants),
+)
+
+
+# ============================================================================
+# EJECUCIÓN
+# ============================================================================
+
+def applied_versions(engine) -> set[int]:
+    """Versiones ya aplicadas en una base (vacío si nunca se migró)."""
+    with engine.connect() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_schema WHERE type = 'table' AND name = 'schema_migrations'"
+        )).first()
+        if exists is None:
+            return set()
+        return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def pending(engine) -> list[Migration]:
+    """Migraciones que faltan por aplicar, en orden."""
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+
+def migrate(engine) -> list[int]:
+    """
+    Aplica las migraciones pendientes de una base de datos, en orden.
+
+    Cada una se registra al terminar; si falla, las siguientes no se aplican
+    y la próxima ejecución la repite.
+
+    Args:
+        engine (Engine): Engine síncrono de la base de datos.
+
+    Returns:
+        list[int]: Versiones aplicadas ahora.
+    """
+    with engine.begin() as conn:
+        conn.execute(text(MIGRATIONS_DDL))
+    done = []
+    for migration in pending(engine):
+        migration.apply(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT OR IGNORE INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": migration.version, "name": migration.name},
+            )
+        done.append(migration.version)
+    return done
+
+
+def _engines():
+    """(nombre, engine) de la base principal y de cada shard existente."""
+    import shards  # shards.py importa este módulo (los shards nuevos se migran al crearse)
+
+    yield "main", database.engine
+    settings = database.settings
+    if settings.shard_count > 0:
+        router = shards.ShardRouter(settings.shard_dir, settings.shard_count)
+        for shard_id in router.existing_shard_ids():
+            engine, _, _ = database.create_engines(f"sqlite:///{router.path_for(shard_id)}")
+            yield f"shard_{shard_id}", engine
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de QuickTask")
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    args = parser.parse_args()
+
+    for name, engine in _engines():
+        if args.command == "status":
+            missing = pending(engine)
+            print(json.dumps({
+                "database": name,
+                "applied": max(applied_versions(engine), default=0),
+                "pending": [f"{m.version} {m.name}" for m in missing],
+            }, ensure_ascii=False))
+        else:
+            print(json.dumps({"database": name, "applied": migrate(engine)}))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -4,9 +4,9 @@ models.py
 Definición de los modelos ORM usando SQLAlchemy.
 """
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, Date, DateTime, Index, case, literal_column
 from sqlalchemy.sql import func
-from database import Base
+from database import Base, current_tenant
 
 
 class Task(Base):
@@ -19,21 +19,185 @@ class Task(Base):
         description (str): Descripción detallada de la tarea (opcional).
         status (str): Estado de la tarea ('pending', 'completed').
         priority (str): Prioridad de la tarea ('low', 'medium', 'high').
-        due_date (str): Fecha de vencimiento (formato ISO 8601).
+        due_date (date): Fecha de vencimiento (SQLite la guarda como texto
+            ISO 8601, que ordena igual que la fecha).
         created_at (datetime): Fecha de creación (autogenerada).
         updated_at (datetime): Fecha de última actualización (autogenerada).
+        version (int): Contador de versiones; se incrementa en cada escritura
+            y da el ETag de la tarea.
+        change_version (int): Versión global del último cambio (feed de
+            cambios); la asignan triggers a partir de `sync_state`.
+        tenant_id (str): Inquilino propietario; decide el shard (ver
+            `shards.py`). Al insertar toma el inquilino de la petición.
+        deleted_at (datetime): Fecha del soft-delete (None si no está
+            eliminada); decide cuándo se archiva (ver `archive.py`).
     """
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Cubre el filtro de listados (is_deleted/status) y el orden por id
+        # que usa la paginación por cursor.
+        Index("ix_tasks_live_status_id", "is_deleted", "status", "id"),
+        # Feed de cambios: WHERE change_version > :since ORDER BY change_version
+        Index("ix_tasks_change_version", "change_version"),
+        # Con sharding cada consulta se limita al inquilino actual
+        Index("ix_tasks_tenant_id", "tenant_id", "id"),
+        # Listados por rango de vencimiento y ordenados por fecha (`sort`)
+        Index("ix_tasks_live_due_date_id", "is_deleted", "due_date", "id"),
+        Index("ix_tasks_live_created_at_id", "is_deleted", "created_at", "id"),
+        # AUTOINCREMENT: un ID archivado o movido de shard no se reutiliza
+        # (solo aplica a tablas nuevas; ver `archive.archive_batch`)
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
     status = Column(String(20), default="pending", index=True)  # 'pending' o 'completed'
     priority = Column(String(20), default="medium")  # 'low', 'medium', 'high'
-    due_date = Column(String(10), nullable=True)  # Formato: YYYY-MM-DD
+    due_date = Column(Date, nullable=True)  # Formato: YYYY-MM-DD
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, server_default="1")
+    change_version = Column(Integer, nullable=False, server_default="0")
+    tenant_id = Column(String(64), nullable=False, server_default="default", default=lambda: current_tenant.get())
+    deleted_at = Column(DateTime, nullable=True)
+
+    # El ORM incrementa `version` en cada UPDATE y lo exige en el WHERE: una
+    # escritura concurrente sobre la misma fila produce StaleDataError.
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self):
         return f"<Task(id={self.id}, title='{self.title}', status='{self.status}')>"
+
+
+# Rango de la prioridad para ordenar (high primero). Con literales, no
+# parámetros: SQLite solo usa el índice si la expresión es idéntica.
+PRIORITY_RANK = case(
+    (Task.priority == literal_column("'high'"), literal_column("0")),
+    (Task.priority == literal_column("'medium'"), literal_column("1")),
+    else_=literal_column("2"),
+)
+Index("ix_tasks_live_priority_rank_id", Task.is_deleted, PRIORITY_RANK, Task.id)
+
+
+class TaskArchive(Base):
+    """
+    Modelo ORM para la tabla 'tasks_archive': tareas eliminadas hace tiempo,
+    fuera de la tabla caliente `tasks`.
+    
+    Tiene las mismas columnas que `Task` (el mismo ID) más la fecha de
+    archivado. `crud.restore_task` devuelve una tarea archivada a `tasks` y
+    el feed de cambios sigue entregándolas como tombstones.
+    
+    Atributos:
+        archived_at (datetime): Fecha en que se movió al archivo.
+        (resto): Ver `Task`.
+    """
+    __tablename__ = "tasks_archive"
+    __table_args__ = (
+        Index("ix_tasks_archive_change_version", "change_version"),
+        Index("ix_tasks_archive_archived_at", "archived_at"),
+        Index("ix_tasks_archive_tenant_id", "tenant_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    status = Column(String(20))
+    priority = Column(String(20))
+    due_date = Column(Date, nullable=True)
+    is_deleted = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    version = Column(Integer, nullable=False)
+    change_version = Column(Integer, nullable=False)
+    tenant_id = Column(String(64), nullable=False)
+    deleted_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<TaskArchive(id={self.id}, title='{self.title}', archived_at='{self.archived_at}')>"
+
+
+class ImportJob(Base):
+    """
+    Modelo ORM para la tabla 'import_jobs': progreso de una importación NDJSON.
+    
+    Se actualiza en la misma transacción que cada bloque de tareas insertado,
+    de modo que `lines_committed` indica exactamente desde qué línea reanudar.
+    
+    Atributos:
+        id (str): Identificador de la importación elegido por el cliente.
+        lines_committed (int): Líneas del archivo ya procesadas y confirmadas.
+        imported (int): Tareas insertadas en total.
+        failed (int): Líneas rechazadas en total.
+        status (str): 'running' o 'completed'.
+        created_at (datetime): Fecha de creación (autogenerada).
+        updated_at (datetime): Fecha de última actualización (autogenerada).
+    """
+    __tablename__ = "import_jobs"
+
+    id = Column(String(64), primary_key=True)
+    lines_committed = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    status = Column(String(20), nullable=False, default="running")
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ImportJob(id='{self.id}', lines_committed={self.lines_committed}, status='{self.status}')>"
+
+
+class TaskCounter(Base):
+    """
+    Modelo ORM para la tabla 'task_counters': número de tareas no eliminadas
+    por combinación de inquilino, estado, prioridad y fecha de vencimiento.
+    
+    La mantienen triggers sobre `tasks` (ver `stats.py`) en la misma
+    transacción que cada escritura, así las estadísticas no recorren `tasks`.
+    
+    Atributos:
+        tenant_id (str): Inquilino de las tareas del grupo.
+        status (str): Estado de las tareas del grupo.
+        priority (str): Prioridad de las tareas del grupo.
+        due_date (str): Fecha de vencimiento ('' si no tienen).
+        count (int): Número de tareas del grupo.
+    """
+    __tablename__ = "task_counters"
+
+    tenant_id = Column(String(64), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    priority = Column(String(20), primary_key=True)
+    due_date = Column(String(10), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TaskCounter(tenant_id='{self.tenant_id}', status='{self.status}', priority='{self.priority}', due_date='{self.due_date}', count={self.count})>"
+
+
+class SyncState(Base):
+    """
+    Modelo ORM para la tabla 'sync_state': contador global de versiones de
+    cambio para la sincronización incremental (ver `db.md`, campo `version`).
+    
+    Tiene una sola fila (id = 1). Cada escritura sobre `tasks` lo incrementa y
+    copia el valor en `Task.change_version` (ver `changes.py`); nunca decrece,
+    aunque se borren filas.
+    
+    Atributos:
+        id (int): Siempre 1.
+        last_version (int): Última versión de cambio asignada.
+        purged_version (int): Mayor versión de cambio de los tombstones
+            purgados del archivo; un cliente con un `since` anterior debe
+            resincronizar desde cero.
+    """
+    __tablename__ = "sync_state"
+
+    id = Column(Integer, primary_key=True)
+    last_version = Column(Integer, nullable=False, default=0)
+    purged_version = Column(Integer, nullable=False, server_default="0")
+
+    def __repr__(self):
+        return f"<SyncState(last_version={self.last_version})>"
@@ -0,0 +1,56 @@
+"""
+pagination.py
+
+Utilidades para la paginación por cursor (keyset) de los listados de tareas.
+
+El cursor es un token opaco para el cliente: codifica el criterio de orden,
+el valor de la clave de orden y el ID de la última tarea de la página, de modo
+que la siguiente página se obtiene con un ``WHERE (clave, id) > (...)`` que
+SQLite resuelve sobre el índice en lugar de recorrer y descartar filas como
+hace ``OFFSET``.
+"""
+
+import base64
+import json
+
+
+def encode_cursor(sort: str, value, task_id: int) -> str:
+    """
+    Construye el cursor opaco que apunta a la última tarea de una página.
+
+    Args:
+        sort (str): Criterio de orden del listado (p. ej. 'id').
+        value: Valor de la clave de orden de la última tarea.
+        task_id (int): ID de la última tarea (desempate).
+
+    Returns:
+        str: Token en base64 URL-safe, sin relleno.
+    """
+    payload = json.dumps({"s": sort, "v": value, "id": task_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str):
+    """
+    Decodifica un cursor generado por `encode_cursor`.
+
+    Args:
+        token (str): Cursor recibido del cliente.
+        sort (str): Criterio de orden de la petición actual.
+
+    Returns:
+        tuple: (valor_de_orden, id) de la última tarea de la página anterior.
+
+    Raises:
+        ValueError: Si el token está malformado o fue emitido para otro orden.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursor_sort, value, task_id = payload["s"], payload["v"], int(payload["id"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ValueError("Cursor inválido") from exc
+
+    if cursor_sort != sort:
+        raise ValueError("El cursor no corresponde al orden solicitado")
+    return value, task_id
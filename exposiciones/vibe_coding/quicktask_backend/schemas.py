@@ -4,9 +4,9 @@ schemas.py
 Definición de los esquemas de validación usando Pydantic.
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Optional
+from datetime import date, datetime
 
 
 class TaskCreate(BaseModel):
@@ -17,12 +17,12 @@ class TaskCreate(BaseModel):
         title (str): Título de la tarea (requerido).
         description (str): Descripción detallada (opcional).
         priority (str): Prioridad ('low', 'medium', 'high').
-        due_date (str): Fecha de vencimiento en formato YYYY-MM-DD (opcional).
+        due_date (date): Fecha de vencimiento en formato YYYY-MM-DD (opcional).
     """
     title: str = Field(..., min_length=1, max_length=255, description="Título de la tarea")
     description: Optional[str] = Field(None, max_length=2000, description="Descripción de la tarea")
     priority: str = Field("medium", pattern="^(low|medium|high)$", description="Prioridad de la tarea")
-    due_date: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="Fecha de vencimiento (YYYY-MM-DD)")
+    due_date: Optional[date] = Field(None, description="Fecha de vencimiento (YYYY-MM-DD)")
 
 
 class TaskUpdate(BaseModel):
@@ -35,13 +35,13 @@ class TaskUpdate(BaseModel):
         description (str): Nueva descripción (opcional).
         status (str): Nuevo estado ('pending' o 'completed').
         priority (str): Nueva prioridad.
-        due_date (str): Nueva fecha de vencimiento.
+        due_date (date): Nueva fecha de vencimiento.
     """
     title: Optional[str] = Field(None, min_length=1, max_length=255)
     description: Optional[str] = Field(None, max_length=2000)
     status: Optional[str] = Field(None, pattern="^(pending|completed)$")
     priority: Optional[str] = Field(None, pattern="^(low|medium|high)$")
-    due_date: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}-\d{2}$")
+    due_date: Optional[date] = None
 
 
 class TaskResponse(BaseModel):
@@ -55,7 +55,7 @@ class TaskResponse(BaseModel):
         description (str): Descripción.
         status (str): Estado actual.
         priority (str): Prioridad.
-        due_date (str): Fecha de vencimiento.
+        due_date (date): Fecha de vencimiento.
         created_at (datetime): Fecha de creación.
         updated_at (datetime): Fecha de última actualización.
     """
@@ -64,9 +64,294 @@ class TaskResponse(BaseModel):
     description: Optional[str]
     status: str
     priority: str
-    due_date: Optional[str]
+    due_date: Optional[date]
     created_at: datetime
     updated_at: datetime
 
     class Config:
         from_attributes = True  # Permite construir el esquema desde objetos ORM
+
+
+class TaskProjection(BaseModel):
+    """
+    Esquema de cada tarea de `GET /tasks`.
+    
+    Sin `fields` aparecen todos los campos de `TaskResponse`; con `fields`,
+    solo los pedidos, por eso ninguno es obligatorio.
+    
+    Atributos:
+        Los de `TaskResponse`, todos opcionales.
+    """
+    id: int = None
+    title: str = None
+    description: Optional[str] = None
+    status: str = None
+    priority: str = None
+    due_date: Optional[date] = None
+    created_at: datetime = None
+    updated_at: datetime = None
+
+
+class TaskSearchHit(TaskResponse):
+    """
+    Resultado de la búsqueda de texto completo.
+    
+    Atributos:
+        rank (float): Puntuación bm25 (menor = más relevante).
+        snippet (str): Fragmento escapado como HTML, con las coincidencias entre
+            <mark> y </mark>.
+    """
+    rank: float
+    snippet: str
+
+
+class TaskStats(BaseModel):
+    """
+    Estadísticas de las tareas no eliminadas.
+    
+    Atributos:
+        total (int): Número total de tareas.
+        by_status (dict[str, int]): Tareas por estado.
+        by_priority (dict[str, int]): Tareas por prioridad.
+        overdue (int): Tareas pendientes con fecha de vencimiento pasada.
+    """
+    total: int
+    by_status: dict[str, int]
+    by_priority: dict[str, int]
+    overdue: int
+
+
+class AdminTask(TaskResponse):
+    """
+    Tarea en los listados de administración (todos los inquilinos).
+    
+    Atributos:
+        tenant_id (str): Inquilino propietario.
+        shard (int): Shard que la almacena.
+    """
+    tenant_id: str
+    shard: int
+
+
+class ShardSummary(BaseModel):
+    """
+    Ocupación de un shard.
+    
+    Atributos:
+        shard (int): Número del shard.
+        tasks (int): Tareas almacenadas (incluidas las eliminadas).
+        tenants (int): Inquilinos con tareas en el shard.
+        size_bytes (int): Tamaño en disco (archivo y WAL).
+    """
+    shard: int
+    tasks: int
+    tenants: int
+    size_bytes: int
+
+
+class StorageObject(BaseModel):
+    """
+    Espacio que ocupa una tabla o un índice.
+    
+    Atributos:
+        name (str): Nombre de la tabla o del índice.
+        table (str): Tabla a la que pertenece.
+        type (str): 'table' o 'index'.
+        pages (int): Páginas que ocupa.
+        size_bytes (int): Bytes que ocupa.
+    """
+    name: str
+    table: str
+    type: str
+    pages: int
+    size_bytes: int
+
+
+class StorageReport(BaseModel):
+    """
+    Ocupación de las tablas e índices de un shard.
+    
+    Atributos:
+        shard (int): Número del shard.
+        page_size (int): Tamaño de página de SQLite.
+        freelist_pages (int): Páginas libres (reutilizables) del archivo.
+        tasks (dict): Tareas en la tabla caliente: live y deleted.
+        archived (int): Tareas en `tasks_archive`.
+        objects (list[StorageObject]): Tablas e índices, de mayor a menor.
+    """
+    shard: int
+    page_size: int
+    freelist_pages: int
+    tasks: dict[str, int]
+    archived: int
+    objects: list[StorageObject]
+
+
+class TaskChange(BaseModel):
+    """
+    Cambio de una tarea en el feed de sincronización.
+    
+    Atributos:
+        change_version (int): Versión global del cambio.
+        id (int): ID de la tarea.
+        deleted (bool): True si la tarea fue eliminada (tombstone).
+        task (TaskResponse): Estado actual de la tarea (None si se eliminó).
+    """
+    change_version: int
+    id: int
+    deleted: bool
+    task: Optional[TaskResponse]
+
+
+class TaskChangesPage(BaseModel):
+    """
+    Página del feed de cambios.
+    
+    Atributos:
+        changes (list[TaskChange]): Cambios ordenados por versión.
+        next_since (int): Valor de `since` para la siguiente petición.
+        has_more (bool): True si quedan cambios por leer ahora mismo.
+    """
+    changes: list[TaskChange]
+    next_since: int
+    has_more: bool
+
+
+class BulkItemError(BaseModel):
+    """
+    Error de validación de un elemento dentro de una operación masiva.
+    
+    Atributos:
+        index (int): Posición del elemento en la lista enviada.
+        errors (list[dict]): Errores de validación (loc, msg, type).
+    """
+    index: int
+    errors: list[dict[str, Any]]
+
+
+class TaskBulkCreateResponse(BaseModel):
+    """
+    Esquema de respuesta para la creación masiva de tareas.
+    
+    Atributos:
+        created_ids (list[int]): IDs de las tareas creadas, en el orden enviado.
+        errors (list[BulkItemError]): Elementos rechazados y sus errores.
+    """
+    created_ids: list[int]
+    errors: list[BulkItemError]
+
+
+class TaskFilter(BaseModel):
+    """
+    Criterios para seleccionar tareas en operaciones masivas.
+    
+    Atributos:
+        status (str): Estado ('pending' o 'completed').
+        priority (str): Prioridad ('low', 'medium', 'high').
+        due_after (date): Vencimiento desde esta fecha, inclusive (YYYY-MM-DD).
+        due_before (date): Vencimiento hasta esta fecha, inclusive (YYYY-MM-DD).
+    """
+    status: Optional[str] = Field(None, pattern="^(pending|completed)$")
+    priority: Optional[str] = Field(None, pattern="^(low|medium|high)$")
+    due_after: Optional[date] = None
+    due_before: Optional[date] = None
+
+
+class TaskBulkSelector(BaseModel):
+    """
+    Selección de tareas para una operación masiva: lista de IDs o filtro.
+    
+    Atributos:
+        ids (list[int]): IDs de las tareas (excluyente con `filter`).
+        filter (TaskFilter): Criterios de selección (excluyente con `ids`).
+    """
+    ids: Optional[list[int]] = Field(None, min_length=1)
+    filter: Optional[TaskFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        """Exige exactamente un modo de selección y un filtro no vacío."""
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Indique 'ids' o 'filter', pero no ambos")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True):
+            raise ValueError("El filtro debe incluir al menos un criterio")
+        return self
+
+
+class TaskBulkUpdate(TaskBulkSelector):
+    """
+    Actualización masiva: selección de tareas y cambios a aplicar.
+    
+    Atributos:
+        changes (TaskUpdate): Campos a actualizar en todas las tareas seleccionadas.
+    """
+    changes: TaskUpdate
+
+
+class TaskBulkResult(BaseModel):
+    """
+    Resultado de una operación masiva.
+    
+    Atributos:
+        affected (int): Número de tareas modificadas.
+    """
+    affected: int
+
+
+class ImportLineError(BaseModel):
+    """
+    Línea rechazada durante una importación NDJSON.
+    
+    Atributos:
+        line (int): Número de línea en el archivo original (desde 0).
+        errors (list[dict]): Errores de validación (loc, msg, type).
+    """
+    line: int
+    errors: list[dict[str, Any]]
+
+
+class TaskImportResult(BaseModel):
+    """
+    Resultado de una petición de importación NDJSON.
+    
+    Atributos:
+        import_id (str): Identificador de la importación (si se indicó).
+        lines_read (int): Líneas recibidas en esta petición.
+        skipped (int): Líneas omitidas por estar ya confirmadas.
+        imported (int): Tareas insertadas en esta petición.
+        failed (int): Líneas rechazadas en esta petición.
+        errors (list[ImportLineError]): Primeros errores encontrados.
+        resume_offset (int): Línea desde la que reanudar si la carga se corta.
+        completed (bool): True si se procesó el cuerpo completo.
+    """
+    import_id: Optional[str]
+    lines_read: int
+    skipped: int
+    imported: int
+    failed: int
+    errors: list[ImportLineError]
+    resume_offset: int
+    completed: bool
+
+
+class ImportJobResponse(BaseModel):
+    """
+    Progreso registrado de una importación.
+    
+    Atributos:
+        id (str): Identificador de la importación.
+        lines_committed (int): Líneas confirmadas (offset para reanudar).
+        imported (int): Tareas insertadas en total.
+        failed (int): Líneas rechazadas en total.
+        status (str): 'running' o 'completed'.
+        updated_at (datetime): Última actualización.
+    """
+    id: str
+    lines_committed: int
+    imported: int
+    failed: int
+    status: str
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,137 @@
+"""
+search.py
+
+Búsqueda de texto completo sobre el título y la descripción de las tareas con
+una tabla virtual FTS5 de SQLite.
+
+`tasks_fts` es una tabla de contenido externo (`content='tasks'`): no duplica
+el texto, solo guarda el índice invertido. Se mantiene sincronizada con
+triggers, de modo que cualquier escritura (ORM, INSERT masivo, importación o
+UPDATE por lotes) actualiza el índice en la misma transacción. El trigger de
+UPDATE solo se dispara si cambian `title` o `description`.
+"""
+
+import html
+import re
+from sqlalchemy import column, func, inspect, literal_column, table, text
+
+# Tabla virtual como objeto Core (no forma parte de Base.metadata)
+tasks_fts = table("tasks_fts", column("rowid"), column("title"), column("description"))
+
+# Pesos de bm25 por columna (title, description): el título pesa más
+BM25_WEIGHTS = (10.0, 1.0)
+
+# Marcadores de los fragmentos: snippet() usa caracteres de control como
+# centinelas y `render_snippet` los cambia por <mark> tras escapar el texto
+SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS = "\x02", "\x03", "…"
+SNIPPET_TOKENS = 12
+MARK_START, MARK_END = "<mark>", "</mark>"
+
+FTS_DDL = (
+    # remove_diacritics 2: "canción" coincide con "cancion"
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description,
+        content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+_TERM = re.compile(r"\w+\*?")
+
+
+def create_search_index(engine):
+    """
+    Crea la tabla FTS5 y sus triggers si no existen.
+
+    Si la tabla se crea sobre una base con tareas, el índice se reconstruye
+    a partir del contenido de `tasks`.
+
+    Args:
+        engine (Engine): Engine síncrono de la base de datos.
+    """
+    existed = inspect(engine).has_table("tasks_fts")
+    with engine.begin() as conn:
+        for statement in FTS_DDL:
+            conn.execute(text(statement))
+        if not existed:
+            conn.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+
+
+def build_match_query(q: str) -> str:
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura.
+
+    Cada palabra se entrecomilla (los operadores y caracteres especiales de
+    FTS5 no se interpretan) y todas deben aparecer. Un `*` final se conserva
+    como búsqueda por prefijo (`infor*`).
+
+    Args:
+        q (str): Texto de búsqueda.
+
+    Returns:
+        str: Expresión para MATCH, vacía si no hay palabras.
+    """
+    terms = []
+    for term in _TERM.findall(q):
+        if term.endswith("*"):
+            terms.append(f'"{term[:-1]}"*')
+        else:
+            terms.append(f'"{term}"')
+    return " ".join(terms)
+
+
+def rank_column():
+    """Expresión bm25 (menor = más relevante) con los pesos por columna."""
+    return func.bm25(literal_column("tasks_fts"), *BM25_WEIGHTS)
+
+
+def snippet_column():
+    """Expresión snippet() con el fragmento más relevante de cualquier columna."""
+    return func.snippet(
+        literal_column("tasks_fts"), -1,
+        SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS,
+    )
+
+
+def render_snippet(raw: str) -> str:
+    """
+    Fragmento listo para mostrar como HTML.
+
+    `snippet()` devuelve el título o la descripción tal como se guardaron:
+    primero se escapa el texto y después los centinelas pasan a ser
+    `<mark>`/`</mark>`.
+
+    Args:
+        raw (str): Resultado de `snippet_column()`.
+
+    Returns:
+        str: Fragmento escapado con las coincidencias entre <mark> y </mark>.
+    """
+    return html.escape(raw).replace(SNIPPET_START, MARK_START).replace(SNIPPET_END, MARK_END)
+
+
+def match_condition(match_query: str):
+    """Condición `tasks_fts MATCH :q`."""
+    return literal_column("tasks_fts").op("MATCH")(match_query)
@@ -0,0 +1,599 @@
+#!/usr/bin/env python
+"""
+shards.py
+
+Almacenamiento repartido por inquilino: cada inquilino (cabecera
+`X-Tenant-ID`) vive en uno de varios archivos SQLite ("shards"), cada uno con
+sus propios engines, pools y escritor único. Se activa con
+`QUICKTASK_SHARD_COUNT` > 0.
+
+- Enrutado: un inquilino va al shard `crc32(inquilino) % QUICKTASK_SHARD_COUNT`
+  salvo que el directorio (`directory.db`) lo haya asignado a otro al
+  repartir un shard.
+- Los shards se crean al primer uso (archivo y migraciones, ver
+  `migrations.py`).
+- Aislamiento: varios inquilinos comparten shard; toda consulta ORM sobre
+  `Task` y `TaskCounter` se limita al inquilino actual (`with_loader_criteria`),
+  así que las funciones de `crud.py` no cambian.
+- `fan_out` ejecuta una consulta en todos los shards (listados de
+  administración).
+- `ShardRouter.write`: las mutaciones que llegan al shard de un inquilino
+  que ya se movió (resolvieron el shard antes del cambio) se repiten en el
+  nuevo.
+
+Repartir un shard con mucha carga (mueve inquilinos a un shard nuevo):
+    python shards.py list
+    python shards.py split 3 --fraction 0.5 [--dry-run]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import zlib
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import bindparam, create_engine, event, func, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, with_loader_criteria
+import changes
+import database
+import migrations
+from database import current_tenant
+from models import Task, TaskArchive, TaskCounter
+
+TENANT_HEADER = b"x-tenant-id"
+TENANT_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+_SHARD_FILE = re.compile(r"^shard_(\d+)\.db$")
+
+# Reintentos de una escritura cuyo inquilino acaba de cambiar de shard
+# (mientras el directorio todavía no refleja el cambio)
+MOVE_RETRIES = 5
+MOVE_RETRY_DELAY = 0.05
+
+# Cada cuánto se comprueba si `directory.db` cambió (segundos)
+DIRECTORY_CHECK_INTERVAL = 1.0
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _tenant_criteria(orm_execute_state):
+    """
+    Limita las consultas ORM al inquilino actual cuando hay sharding.
+
+    `current_tenant` a None (ver `fan_out`) desactiva el filtro.
+    """
+    tenant = current_tenant.get()
+    if database.shard_router is None or tenant is None:
+        return
+    if orm_execute_state.is_select or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            with_loader_criteria(Task, Task.tenant_id == tenant, include_aliases=True),
+            with_loader_criteria(TaskArchive, TaskArchive.tenant_id == tenant),
+            with_loader_criteria(TaskCounter, TaskCounter.tenant_id == tenant),
+        )
+
+
+class TenantMiddleware:
+    """
+    Middleware ASGI que fija `current_tenant` a partir de `X-Tenant-ID`.
+
+    Sin sharding la cabecera se ignora. Un identificador inválido (letras,
+    dígitos, `_`, `.`, `-`; hasta 64) se rechaza con 400.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or database.shard_router is None:
+            return await self.app(scope, receive, send)
+        raw = dict(scope["headers"]).get(TENANT_HEADER)
+        tenant = raw.decode("latin-1") if raw else database.DEFAULT_TENANT
+        if not TENANT_PATTERN.match(tenant):
+            response = JSONResponse({"detail": "X-Tenant-ID inválido"}, status_code=400)
+            return await response(scope, receive, send)
+        token = current_tenant.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+
+class Shard:
+    """
+    Un archivo SQLite con sus engines y fábricas de sesiones.
+
+    Atributos:
+        id (int): Número del shard.
+        path (str): Ruta del archivo.
+        engine (Engine): Engine síncrono (esquema, herramientas).
+        async_write_engine (AsyncEngine): Escritor único.
+        async_read_engine (AsyncEngine): Pool de lectura `query_only`.
+        AsyncWriteSession (async_sessionmaker): Sesiones de escritura.
+        AsyncReadSession (async_sessionmaker): Sesiones de lectura.
+        write_batcher (WriteBatcher): Agrupador de escrituras del shard o None.
+    """
+
+    def __init__(self, shard_id: int, path: str, engine, async_write_engine, async_read_engine):
+        self.id = shard_id
+        self.path = path
+        self.engine = engine
+        self.async_write_engine = async_write_engine
+        self.async_read_engine = async_read_engine
+        self.AsyncWriteSession, self.AsyncReadSession = database.create_sessionmakers(
+            async_write_engine, async_read_engine
+        )
+        self.write_batcher = None
+
+    @classmethod
+    def open(cls, shard_id: int, path: str):
+        """
+        Abre (o crea) el archivo del shard y le aplica las migraciones
+        pendientes.
+
+        Returns:
+            Shard: Shard listo para usar.
+        """
+        shard = cls(shard_id, path, *database.create_engines(f"sqlite:///{path}"))
+        migrations.migrate(shard.engine)
+        changes.notify_on_commit(shard.async_write_engine)
+        return shard
+
+    async def run_write(self, fn, *args, batched: bool = True, **kwargs):
+        """
+        Ejecuta una mutación de `crud.py` en este shard, con su agrupador de
+        escrituras si lo tiene (`batched`) o en una sesión propia.
+        """
+        if batched and self.write_batcher is not None:
+            return await self.write_batcher.submit(fn, *args, **kwargs)
+        async with self.AsyncWriteSession() as db:
+            return await db.run_sync(fn, *args, **kwargs)
+
+    async def has_moved(self, tenant: str) -> bool:
+        """True si `move_tenants` sacó al inquilino de este shard."""
+        async with self.AsyncReadSession() as db:
+            moved = await db.execute(text("SELECT 1 FROM moved_tenants WHERE tenant_id = :tenant"), {"tenant": tenant})
+            return moved.first() is not None
+
+    def size_bytes(self) -> int:
+        """Tamaño en disco del archivo y de su WAL."""
+        return sum(os.path.getsize(p) for p in (self.path, f"{self.path}-wal") if os.path.exists(p))
+
+    async def close(self):
+        """Confirma las escrituras agrupadas pendientes y cierra los pools."""
+        if self.write_batcher is not None:
+            await self.write_batcher.close()
+        await self.async_write_engine.dispose()
+        await self.async_read_engine.dispose()
+        self.engine.dispose()
+
+
+class ShardDirectory:
+    """
+    Asignaciones explícitas inquilino → shard (`directory.db`).
+
+    Solo contiene los inquilinos movidos al repartir un shard; el resto va
+    al shard de su hash. Se guarda en memoria y, como mucho cada
+    `check_interval` segundos, se relee si el archivo cambió (otro proceso,
+    p. ej. `python shards.py split`, lo modificó). `lookup` solo consulta la
+    memoria; `refresh` hace la E/S (el enrutador la lleva a un hilo).
+    """
+
+    def __init__(self, path: str, check_interval: float = DIRECTORY_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        # Journal por defecto (DELETE): cada commit cambia el archivo principal
+        self.engine = create_engine(f"sqlite:///{path}")
+        self._created = False
+        self._stamp = None
+        self._checked = None
+        self._assignments = {}
+
+    def _create(self):
+        """Crea la tabla en el primer uso (no al importar la aplicación)."""
+        if not self._created:
+            with self.engine.begin() as conn:
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS tenant_shards "
+                    "(tenant_id VARCHAR(64) PRIMARY KEY, shard_id INTEGER NOT NULL)"
+                ))
+            self._created = True
+
+    def stale(self) -> bool:
+        """True si toca comprobar de nuevo el archivo."""
+        return self._checked is None or time.monotonic() - self._checked >= self.check_interval
+
+    def refresh(self):
+        """Relee las asignaciones si el archivo cambió desde la última lectura."""
+        self._create()
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            with self.engine.connect() as conn:
+                self._assignments = dict(conn.execute(text("SELECT tenant_id, shard_id FROM tenant_shards")).all())
+            self._stamp = stamp
+        self._checked = time.monotonic()
+
+    def lookup(self, tenant: str):
+        """
+        Devuelve el shard asignado a un inquilino, o None si no tiene asignación.
+        """
+        return self._assignments.get(tenant)
+
+    def assign(self, tenants: list[str], shard_id: int):
+        """Asigna varios inquilinos a un shard."""
+        self._create()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO tenant_shards (tenant_id, shard_id) VALUES (:tenant, :shard) "
+                    "ON CONFLICT (tenant_id) DO UPDATE SET shard_id = excluded.shard_id"
+                ),
+                [{"tenant": tenant, "shard": shard_id} for tenant in tenants],
+            )
+        self._checked = None
+
+
+class ShardRouter:
+    """
+    Enruta cada inquilino a su shard y abre los shards bajo demanda.
+
+    Args:
+        shard_dir (str): Carpeta de los archivos `shard_<n>.db` y `directory.db`.
+        shard_count (int): Número de shards entre los que se reparte el hash.
+        batcher_factory (callable): Crea el agrupador de escrituras de un
+            shard a partir de su engine de escritura (None = sin agrupar).
+    """
+
+    def __init__(self, shard_dir: str, shard_count: int, batcher_factory=None):
+        os.makedirs(shard_dir, exist_ok=True)
+        self.shard_dir = shard_dir
+        self.shard_count = shard_count
+        self.batcher_factory = batcher_factory
+        self.directory = ShardDirectory(os.path.join(shard_dir, "directory.db"))
+        self._shards = {}
+        self._locks = {}
+
+    def path_for(self, shard_id: int) -> str:
+        return os.path.join(self.shard_dir, f"shard_{shard_id}.db")
+
+    def shard_id_for(self, tenant: str) -> int:
+        """
+        Shard de un inquilino: asignación del directorio o hash estable.
+
+        Si toca, relee el directorio en el propio hilo (herramientas de línea
+        de comandos); en la aplicación `current` ya lo hizo en otro hilo.
+        """
+        if self.directory.stale():
+            self.directory.refresh()
+        assigned = self.directory.lookup(tenant)
+        if assigned is not None:
+            return assigned
+        return zlib.crc32(tenant.encode("utf-8")) % self.shard_count
+
+    def existing_shard_ids(self) -> list[int]:
+        """Shards que ya tienen archivo (los no usados aún no existen)."""
+        ids = {int(m.group(1)) for m in map(_SHARD_FILE.match, os.listdir(self.shard_dir)) if m}
+        return sorted(ids | self._shards.keys())
+
+    def open_sync(self, shard_id: int) -> Shard:
+        """Abre un shard sin event loop (herramientas de línea de comandos)."""
+        if shard_id not in self._shards:
+            self._shards[shard_id] = Shard.open(shard_id, self.path_for(shard_id))
+        return self._shards[shard_id]
+
+    async def refresh_directory(self, force: bool = False):
+        """Relee el directorio en un hilo si pasó el intervalo (o `force`)."""
+        if force or self.directory.stale():
+            await asyncio.to_thread(self.directory.refresh)
+
+    async def get(self, shard_id: int) -> Shard:
+        """
+        Devuelve un shard, creándolo (archivo y esquema) si es su primer uso.
+
+        La apertura (engines y migraciones) se hace en un hilo, con un
+        bloqueo por shard: solo esperan las peticiones de ese shard. La
+        primera conexión de cada pool se abre aquí, una sola vez (ver
+        `main.warm_up_async_engines`).
+        """
+        shard = self._shards.get(shard_id)
+        if shard is not None:
+            return shard
+        async with self._locks.setdefault(shard_id, asyncio.Lock()):
+            if shard_id not in self._shards:
+                shard = await asyncio.to_thread(Shard.open, shard_id, self.path_for(shard_id))
+                for async_engine in (shard.async_write_engine, shard.async_read_engine):
+                    async with async_engine.connect():
+                        pass
+                if self.batcher_factory is not None:
+                    shard.write_batcher = self.batcher_factory(shard.async_write_engine)
+                self._shards[shard_id] = shard
+        return self._shards[shard_id]
+
+    async def current(self) -> Shard:
+        """Shard del inquilino de la petición en curso."""
+        await self.refresh_directory()
+        return await self.get(self.shard_id_for(current_tenant.get()))
+
+    async def write(self, fn, *args, batched: bool = True, **kwargs):
+        """
+        Ejecuta una mutación de `crud.py` en el shard del inquilino actual.
+
+        Si el inquilino se movió de shard entre la resolución y la escritura,
+        la mutación se repite en el nuevo: una alta la rechaza el trigger de
+        `moved_tenants` y una modificación que no encontró nada (None, 0,
+        False) se comprueba contra esa tabla.
+
+        Args:
+            fn (callable): Función de `crud.py` cuyo primer argumento es la sesión.
+            batched (bool): Usar el agrupador de escrituras del shard si lo tiene.
+
+        Returns:
+            Lo que devuelva `fn`.
+
+        Raises:
+            HTTPException: Si el directorio no refleja el cambio tras los
+                reintentos (503).
+        """
+        tenant = current_tenant.get()
+        for attempt in range(MOVE_RETRIES):
+            shard = await self.current()
+            try:
+                result = await shard.run_write(fn, *args, batched=batched, **kwargs)
+            except IntegrityError as exc:
+                if migrations.TENANT_MOVED not in str(exc.orig):
+                    raise
+            else:
+                if result or not await shard.has_moved(tenant):
+                    return result
+            await asyncio.sleep(MOVE_RETRY_DELAY * attempt)
+            await self.refresh_directory(force=True)
+        raise HTTPException(
+            status_code=503,
+            detail="El inquilino se está moviendo de shard; reintente la petición",
+            headers={"Retry-After": "1"},
+        )
+
+    async def all_shards(self) -> list[Shard]:
+        """Todos los shards existentes."""
+        return [await self.get(shard_id) for shard_id in self.existing_shard_ids()]
+
+    async def close(self):
+        """Cierra todos los shards abiertos."""
+        for shard in self._shards.values():
+            await shard.close()
+        self._shards.clear()
+
+
+async def fan_out(shards: list[Shard], fn, *args, **kwargs) -> list:
+    """
+    Ejecuta `fn(session, *args, **kwargs)` (función de `crud.py`) en todos los
+    shards a la vez, sin el filtro de inquilino.
+
+    Returns:
+        list: Resultado de cada shard, en el orden de `shards`.
+    """
+    async def run(shard: Shard):
+        async with shard.AsyncReadSession() as db:
+            return await db.run_sync(fn, *args, **kwargs)
+
+    with_all_tenants = current_tenant.set(None)
+    try:
+        return await asyncio.gather(*(run(shard) for shard in shards))
+    finally:
+        current_tenant.reset(with_all_tenants)
+
+
+# ============================================================================
+# REPARTO DE SHARDS
+# ============================================================================
+
+_MOVE_COLUMNS = ", ".join(c.name for c in Task.__table__.columns if c.name != "change_version")
+# El archivo no tiene triggers: conserva su versión de cambio
+_MOVE_ARCHIVE_COLUMNS = ", ".join(c.name for c in TaskArchive.__table__.columns)
+
+
+def tenant_sizes(shard: Shard) -> list[tuple]:
+    """(inquilino, tareas) de un shard, de mayor a menor."""
+    with shard.engine.connect() as conn:
+        stmt = select(Task.tenant_id, func.count()).group_by(Task.tenant_id).order_by(func.count().desc())
+        return [tuple(row) for row in conn.execute(stmt)]
+
+
+def _transfer(conn, source: str, target: str, selected: dict) -> int:
+    """
+    Copia las tareas (y las archivadas) de unos inquilinos del esquema
+    `source` al `target` y las borra del primero.
+
+    Returns:
+        int: Tareas copiadas.
+    """
+    in_tenants = bindparam("tenants", expanding=True)
+    moved = conn.execute(text(
+        f"INSERT INTO {target}.tasks ({_MOVE_COLUMNS}) "
+        f"SELECT {_MOVE_COLUMNS} FROM {source}.tasks WHERE tenant_id IN :tenants ORDER BY change_version"
+    ).bindparams(in_tenants), selected).rowcount
+    moved += conn.execute(text(
+        f"INSERT INTO {target}.tasks_archive ({_MOVE_ARCHIVE_COLUMNS}) "
+        f"SELECT {_MOVE_ARCHIVE_COLUMNS} FROM {source}.tasks_archive WHERE tenant_id IN :tenants"
+    ).bindparams(in_tenants), selected).rowcount
+    for table in ("tasks", "tasks_archive"):
+        conn.execute(
+            text(f"DELETE FROM {source}.{table} WHERE tenant_id IN :tenants").bindparams(in_tenants), selected
+        )
+    return moved
+
+
+def move_tenants(router: ShardRouter, source: Shard, target: Shard, tenants: list[str]) -> int:
+    """
+    Mueve todas las tareas de unos inquilinos de un shard a otro.
+
+    La copia (`INSERT ... SELECT` con el destino adjunto, de modo que sus
+    triggers de FTS, contadores y feed de cambios se ejecutan) y el borrado
+    en el origen son una transacción con el bloqueo de escritura del origen
+    (`BEGIN IMMEDIATE`). En ella los inquilinos quedan anotados en
+    `moved_tenants` del origen: las peticiones que resolvieron el shard
+    antes del cambio y esperaban al bloqueo no escriben en el origen, sino
+    que se repiten en el destino (ver `ShardRouter.write`).
+
+    El directorio se actualiza después de confirmar; si falla, las tareas
+    vuelven al origen. Las tareas archivadas se mueven igual. Los IDs y
+    versiones se conservan; si alguno ya existe en el destino no se mueve
+    nada.
+
+    Returns:
+        int: Tareas movidas (incluidas las archivadas).
+
+    Raises:
+        ValueError: Si algún ID ya existe en el destino.
+    """
+    selected = {"tenants": tenants}
+    in_tenants = bindparam("tenants", expanding=True)
+    with source.engine.connect() as conn:
+        conn.exec_driver_sql("ATTACH DATABASE ? AS target", (target.path,))
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            collisions = conn.execute(text(
+                "SELECT count(*) FROM (SELECT id FROM target.tasks UNION ALL SELECT id FROM target.tasks_archive) "
+                "WHERE id IN (SELECT id FROM main.tasks WHERE tenant_id IN :tenants "
+                "UNION ALL SELECT id FROM main.tasks_archive WHERE tenant_id IN :tenants)"
+            ).bindparams(in_tenants), selected).scalar()
+            if collisions:
+                raise ValueError(f"{collisions} IDs ya existen en el shard {target.id}")
+
+            # Un inquilino que vuelve a un shard del que salió ya no está movido
+            conn.execute(
+                text("DELETE FROM target.moved_tenants WHERE tenant_id IN :tenants").bindparams(in_tenants), selected
+            )
+            moved = _transfer(conn, "main", "target", selected)
+            conn.execute(
+                text(
+                    "INSERT INTO main.moved_tenants (tenant_id, shard_id) VALUES (:tenant, :shard) "
+                    "ON CONFLICT (tenant_id) DO UPDATE SET shard_id = excluded.shard_id"
+                ),
+                [{"tenant": tenant, "shard": target.id} for tenant in tenants],
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            conn.exec_driver_sql("DETACH DATABASE target")
+            raise
+
+        try:
+            router.directory.assign(tenants, target.id)
+        except Exception:
+            # El directorio sigue apuntando al origen: devolver las tareas
+            try:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                conn.execute(
+                    text("DELETE FROM main.moved_tenants WHERE tenant_id IN :tenants").bindparams(in_tenants), selected
+                )
+                _transfer(conn, "target", "main", selected)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            raise
+        finally:
+            conn.exec_driver_sql("DETACH DATABASE target")
+    return moved
+
+
+def split_shard(router: ShardRouter, shard_id: int, fraction: float = 0.5, dry_run: bool = False) -> dict:
+    """
+    Reparte un shard moviendo una parte de sus inquilinos a un shard nuevo.
+
+    Se eligen los inquilinos de mayor a menor número de tareas hasta acercarse
+    a `fraction` de las tareas del shard; al menos uno se queda. El shard
+    nuevo empieza su contador de versiones de cambio en el del origen, así
+    los clientes del feed que sigan con su `since` no se saltan nada (las
+    tareas movidas se reciben de nuevo).
+
+    Args:
+        router (ShardRouter): Enrutador.
+        shard_id (int): Shard a repartir.
+        fraction (float): Fracción de tareas a mover.
+        dry_run (bool): Solo calcular el plan.
+
+    Returns:
+        dict: source, target, tenants, tasks (planificadas o movidas).
+
+    Raises:
+        ValueError: Si el shard no existe o tiene un solo inquilino.
+    """
+    if shard_id not in router.existing_shard_ids():
+        raise ValueError(f"El shard {shard_id} no existe")
+    source = router.open_sync(shard_id)
+    sizes = tenant_sizes(source)
+    if len(sizes) < 2:
+        raise ValueError(f"El shard {shard_id} tiene un solo inquilino; no se puede repartir")
+
+    goal = sum(count for _, count in sizes) * fraction
+    tenants, planned = [], 0
+    for tenant, count in sizes[:-1]:
+        if planned + count <= goal or not tenants:
+            tenants.append(tenant)
+            planned += count
+
+    target_id = max(router.existing_shard_ids()) + 1
+    plan = {"source": shard_id, "target": target_id, "tenants": tenants, "tasks": planned}
+    if dry_run:
+        return plan
+
+    target = router.open_sync(target_id)
+    with source.engine.connect() as conn:
+        last_version = conn.execute(text("SELECT last_version FROM sync_state WHERE id = 1")).scalar()
+    with target.engine.begin() as conn:
+        conn.execute(text("UPDATE sync_state SET last_version = MAX(last_version, :v) WHERE id = 1"), {"v": last_version})
+    plan["tasks"] = move_tenants(router, source, target, tenants)
+    return plan
+
+
+def shard_report(router: ShardRouter) -> list[dict]:
+    """
+    Tareas e inquilinos por shard, con los inquilinos fuera de sitio (tareas
+    en un shard distinto del que les asigna el enrutador).
+    """
+    report = []
+    for shard_id in router.existing_shard_ids():
+        shard = router.open_sync(shard_id)
+        sizes = tenant_sizes(shard)
+        report.append({
+            "shard": shard_id,
+            "size_bytes": shard.size_bytes(),
+            "tasks": sum(count for _, count in sizes),
+            "tenants": len(sizes),
+            "misplaced": [tenant for tenant, _ in sizes if router.shard_id_for(tenant) != shard_id],
+        })
+    return report
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Administración de shards por inquilino")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Tareas, inquilinos y tamaño por shard")
+    split = commands.add_parser("split", help="Mover parte de los inquilinos de un shard a uno nuevo")
+    split.add_argument("shard_id", type=int)
+    split.add_argument("--fraction", type=float, default=0.5, help="Fracción de tareas a mover")
+    split.add_argument("--dry-run", action="store_true", help="Mostrar el plan sin mover nada")
+    args = parser.parse_args()
+
+    settings = database.settings
+    if settings.shard_count <= 0:
+        parser.error("El sharding no está activado (QUICKTASK_SHARD_COUNT)")
+    router = ShardRouter(settings.shard_dir, settings.shard_count)
+
+    if args.command == "list":
+        for entry in shard_report(router):
+            print(json.dumps(entry, ensure_ascii=False))
+    else:
+        try:
+            print(json.dumps(split_shard(router, args.shard_id, args.fraction, args.dry_run), ensure_ascii=False))
+        except ValueError as exc:
+            parser.exit(1, f"{exc}\n")
+
+
+if __name__ == "__main__":
+    main_cli()
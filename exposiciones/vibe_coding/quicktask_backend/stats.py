@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""
+stats.py
+
+Contadores de tareas mantenidos de forma incremental para `GET /tasks/stats`.
+
+`task_counters` guarda cuántas tareas no eliminadas hay por (inquilino,
+estado, prioridad, fecha de vencimiento). Los triggers de este módulo la actualizan
+en la misma transacción que cualquier escritura sobre `tasks` (ORM, INSERT
+masivo, importación o UPDATE por lotes), de modo que `crud.get_task_stats`
+suma unos pocos grupos en lugar de recorrer la tabla. La fecha
+forma parte del grupo porque "vencida" depende del día en que se consulta.
+
+Recalcular los contadores desde cero e informar de las desviaciones:
+    python stats.py            # solo comprobar
+    python stats.py --rebuild  # comprobar y corregir
+"""
+
+import argparse
+import json
+from sqlalchemy import String, func, inspect, select, text
+from models import Task, TaskCounter
+
+# Clave del grupo de una fila de `tasks` (NEW u OLD dentro de un trigger).
+# Sin fecha se usa '' porque SQLite no considera iguales dos NULL en la PK.
+_KEY = "{row}.tenant_id, {row}.status, {row}.priority, COALESCE({row}.due_date, '')"
+
+_INCREMENT = f"""
+    INSERT INTO task_counters (tenant_id, status, priority, due_date, count)
+    VALUES ({_KEY.format(row="new")}, 1)
+    ON CONFLICT (tenant_id, status, priority, due_date) DO UPDATE SET count = count + 1;
+"""
+
+_DECREMENT = """
+    UPDATE task_counters SET count = count - 1
+    WHERE tenant_id = old.tenant_id AND status = old.status AND priority = old.priority
+      AND due_date = COALESCE(old.due_date, '');
+"""
+
+_GROUP_FIELDS = ("tenant_id", "status", "priority", "due_date")
+_TRIGGERS = ("task_counters_ai", "task_counters_ad", "task_counters_au_old", "task_counters_au_new")
+
+STATS_DDL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_counters_ai AFTER INSERT ON tasks
+    WHEN NOT new.is_deleted BEGIN {_INCREMENT} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_counters_ad AFTER DELETE ON tasks
+    WHEN NOT old.is_deleted BEGIN {_DECREMENT} END
+    """,
+    # Un cambio de grupo (o un soft-delete/restore) resta en el grupo anterior
+    # y suma en el nuevo; si no cambia nada el efecto neto es cero.
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_counters_au_old AFTER UPDATE OF tenant_id, status, priority, due_date, is_deleted ON tasks
+    WHEN NOT old.is_deleted BEGIN {_DECREMENT} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_counters_au_new AFTER UPDATE OF tenant_id, status, priority, due_date, is_deleted ON tasks
+    WHEN NOT new.is_deleted BEGIN {_INCREMENT} END
+    """,
+)
+
+
+def create_stats_triggers(engine):
+    """
+    Crea los triggers de `task_counters` y, si los contadores están vacíos
+    pero hay tareas (base creada antes de esta tabla), los calcula.
+
+    Una tabla de contadores anterior a `tenant_id` se vuelve a crear con la
+    clave nueva (junto con sus triggers) y se recalcula.
+
+    Args:
+        engine (Engine): Engine síncrono de la base de datos.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns(TaskCounter.__tablename__)}
+    with engine.begin() as conn:
+        if "tenant_id" not in columns:
+            for trigger in _TRIGGERS:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            TaskCounter.__table__.drop(conn)
+            TaskCounter.__table__.create(conn)
+        for statement in STATS_DDL:
+            conn.execute(text(statement))
+        has_counters = conn.execute(select(TaskCounter.status).limit(1)).first() is not None
+        has_tasks = conn.execute(select(Task.id).where(Task.is_deleted == False).limit(1)).first() is not None
+    if has_tasks and not has_counters:
+        rebuild_counters(engine)
+
+
+def _actual_counts(conn) -> dict:
+    """Recuento real por grupo, recorriendo `tasks`."""
+    # Como en `task_counters`: texto ISO, "" sin fecha
+    due_date = func.coalesce(Task.due_date, "", type_=String)
+    stmt = (
+        select(Task.tenant_id, Task.status, Task.priority, due_date, func.count())
+        .where(Task.is_deleted == False)
+        .group_by(Task.tenant_id, Task.status, Task.priority, due_date)
+    )
+    return {tuple(row[:-1]): row[-1] for row in conn.execute(stmt)}
+
+
+def rebuild_counters(engine, apply: bool = True) -> list[dict]:
+    """
+    Recalcula los contadores desde `tasks` y compara con los guardados.
+
+    Se ejecuta con `BEGIN IMMEDIATE`: ninguna escritura puede colarse entre
+    el recuento y la sustitución de los contadores.
+
+    Args:
+        engine (Engine): Engine síncrono de la base de datos.
+        apply (bool): Si es False solo informa, sin modificar los contadores.
+
+    Returns:
+        list[dict]: Grupos con desviación (tenant_id, status, priority,
+            due_date, stored, actual).
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        stored = {
+            (row.tenant_id, row.status, row.priority, row.due_date): row.count
+            for row in conn.execute(select(TaskCounter))
+        }
+        actual = _actual_counts(conn)
+
+        drift = [
+            {**dict(zip(_GROUP_FIELDS, key)), "stored": stored.get(key, 0), "actual": actual.get(key, 0)}
+            for key in sorted(stored.keys() | actual.keys())
+            if stored.get(key, 0) != actual.get(key, 0)
+        ]
+
+        if apply:
+            conn.execute(TaskCounter.__table__.delete())
+            if actual:
+                conn.execute(TaskCounter.__table__.insert(), [
+                    {**dict(zip(_GROUP_FIELDS, key)), "count": count}
+                    for key, count in actual.items()
+                ])
+            conn.commit()
+        else:
+            conn.rollback()
+    return drift
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Recalcula los contadores de estadísticas de tareas")
+    parser.add_argument("--rebuild", action="store_true", help="Corregir los contadores (por defecto solo se comprueban)")
+    args = parser.parse_args()
+
+    import database
+
+    drift = rebuild_counters(database.engine, apply=args.rebuild)
+    for group in drift:
+        print(json.dumps(group, ensure_ascii=False))
+    action = "corregidos" if args.rebuild else "sin corregir"
+    print(f"{len(drift)} grupos con desviación ({action})")
+
+
+if __name__ == "__main__":
+    main_cli()